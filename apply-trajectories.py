@@ -0,0 +1,60 @@
+import math
+import os
+import sys
+
+import bpy
+
+# Make the swarm package importable when this script is run from Blender's
+# text editor, where it may live inside the .blend file
+for path in (
+    os.path.dirname(os.path.abspath(__file__)),
+    os.path.dirname(bpy.data.filepath),
+):
+    if os.path.isdir(os.path.join(path, "swarm")) and path not in sys.path:
+        sys.path.append(path)
+
+from swarm.blender import (  # noqa: E402
+    apply_trajectories,
+    attach_swarm,
+    clear_all_animation_data,
+    decimate_transforms,
+)
+from swarm.blender.scene import SwarmScene  # noqa: E402
+
+# Trajectory store written by generate-keyframes.py
+TRAJECTORY_PATH = "//swarm.trajectories"
+
+# Range of frames to apply. None applies every frame in the store
+START_FRAME = None
+END_FRAME = None
+
+# Number of frames read from the store at a time. None reads the whole
+# range at once
+CHUNK_SIZE = 250
+
+# Play the bees back as instances on a single "Swarm" object instead of
+# keying the bee objects, for stores baked with INSTANCED_BEE_COUNT
+INSTANCED = False
+
+# When set, bee location and rotation keys are decimated after they are
+# applied, dropping keys that linear interpolation reproduces to within
+# this many units and degrees
+LOCATION_TOLERANCE = None
+ROTATION_TOLERANCE = None
+
+clear_all_animation_data()
+apply_trajectories(
+    bpy.path.abspath(TRAJECTORY_PATH),
+    START_FRAME,
+    END_FRAME,
+    CHUNK_SIZE,
+    bees=not INSTANCED,
+)
+if INSTANCED:
+    attach_swarm(bpy.path.abspath(TRAJECTORY_PATH))
+else:
+    decimate_transforms(
+        SwarmScene().bees,
+        LOCATION_TOLERANCE,
+        ROTATION_TOLERANCE and math.radians(ROTATION_TOLERANCE),
+    )
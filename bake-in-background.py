@@ -0,0 +1,39 @@
+import os
+import sys
+
+import bpy
+
+# Make the swarm package importable when this script is run from Blender's
+# text editor, where it may live inside the .blend file
+for path in (
+    os.path.dirname(os.path.abspath(__file__)),
+    os.path.dirname(bpy.data.filepath),
+):
+    if os.path.isdir(os.path.join(path, "swarm")) and path not in sys.path:
+        sys.path.append(path)
+
+from swarm.blender import operators  # noqa: E402
+
+# Seed for the simulation's random number generator. None gives a
+# different swarm on every run
+SEED = None
+
+# Simulation engine: "python" or "numpy", as in generate-keyframes.py
+ENGINE = "python"
+
+# Number of frames simulated before they are keyframed. Smaller chunks show
+# up sooner, larger ones cost less to apply
+CHUNK_SIZE = 50
+
+# Register the background bake operators, which also appear in the 3D
+# viewport's Object > Animation menu, and start a bake. Blender stays
+# responsive while the swarm is simulated in a separate process, progress
+# is shown in the status bar, and Esc cancels. The frames keyframed so far
+# can be scrubbed while the rest is still being simulated
+operators.register()
+bpy.ops.swarm.bake_in_background(
+    "INVOKE_DEFAULT",
+    seed=-1 if SEED is None else SEED,
+    engine=ENGINE,
+    chunk_size=CHUNK_SIZE,
+)
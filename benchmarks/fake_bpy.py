@@ -0,0 +1,814 @@
+# Minimal stand-ins for Blender's bpy and mathutils modules, with just enough
+# of the API for the swarm scripts to run outside of Blender. Call install()
+# before importing anything that imports bpy, then build_scene() to create
+# the objects a .blend file would hold
+
+import math
+import os
+import random
+import sys
+import types
+
+from swarm.vector import Vector
+
+
+class Quaternion:
+    def __init__(self, axis_or_values=(1.0, 0.0, 0.0, 0.0), angle: float = None):
+        if angle is None:
+            self.w, self.x, self.y, self.z = axis_or_values
+        else:
+            axis = Vector(axis_or_values).normalized()
+            sin_half = math.sin(angle / 2)
+            self.w = math.cos(angle / 2)
+            self.x, self.y, self.z = (component * sin_half for component in axis)
+
+    def __iter__(self):
+        yield from (self.w, self.x, self.y, self.z)
+
+    def __matmul__(self, vector):
+        axis = Vector((self.x, self.y, self.z))
+        sin_half = axis.magnitude
+        if sin_half == 0:
+            return Vector(vector)
+        angle = 2 * math.atan2(sin_half, self.w)
+        return Vector(vector).rotated(axis * (1 / sin_half), angle)
+
+
+class Matrix:
+    def __init__(self):
+        self.translation = Vector()
+        self.rotation_z = 0.0
+
+
+class KeyframePoints:
+    def __init__(self):
+        self.co = []
+        self.interpolation = []
+
+    def __len__(self):
+        return len(self.co) // 2
+
+    def add(self, count: int):
+        self.co.extend([0.0] * (2 * count))
+        self.interpolation.extend([2] * count)
+
+    def clear(self):
+        self.co = []
+        self.interpolation = []
+
+    def insert(self, frame: float, value: float):
+        for index in range(len(self)):
+            if self.co[2 * index] == frame:
+                self.co[2 * index + 1] = value
+                return
+        self.add(1)
+        self.co[-2:] = [frame, value]
+
+    def foreach_get(self, attribute: str, sequence):
+        values = getattr(self, attribute)
+        if len(sequence) != len(values):
+            raise ValueError(f"foreach_get: wrong number of {attribute} values")
+        for index, value in enumerate(values):
+            sequence[index] = value
+
+    def foreach_set(self, attribute: str, sequence):
+        values = list(sequence)
+        if len(values) != len(getattr(self, attribute)):
+            raise ValueError(f"foreach_set: wrong number of {attribute} values")
+        setattr(self, attribute, values)
+
+
+class FCurve:
+    def __init__(self, data_path: str, index: int, group: str):
+        self.data_path = data_path
+        self.array_index = index
+        self.group = group
+        self.keyframe_points = KeyframePoints()
+
+    def update(self):
+        points = self.keyframe_points
+        pairs = sorted(
+            zip(points.co[0::2], points.co[1::2], points.interpolation),
+            key=lambda pair: pair[0],
+        )
+        points.co = [value for frame, value, _ in pairs for value in (frame, value)]
+        points.interpolation = [mode for _, _, mode in pairs]
+
+
+class FCurves(list):
+    def find(self, data_path: str, index: int = 0):
+        for fcurve in self:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+    def new(self, data_path: str, index: int = 0, action_group: str = ""):
+        if self.find(data_path, index) is not None:
+            raise RuntimeError(f"F-curve {data_path}[{index}] already exists")
+        fcurve = FCurve(data_path, index, action_group)
+        self.append(fcurve)
+        return fcurve
+
+
+class ID:
+    def __init__(self, name: str):
+        self.name = name
+        self.animation_data = None
+        self.users = 0
+        self.properties = {}
+
+    # Custom properties
+    def __contains__(self, key: str) -> bool:
+        return key in self.properties
+
+    def __getitem__(self, key: str):
+        return self.properties[key]
+
+    def __setitem__(self, key: str, value):
+        if hasattr(value, "__iter__") and not isinstance(value, str):
+            value = list(value)
+        self.properties[key] = value
+
+    def __delitem__(self, key: str):
+        del self.properties[key]
+
+    def id_properties_ui(self, key: str):
+        if key not in self.properties:
+            raise KeyError(key)
+        return types.SimpleNamespace(update=lambda **settings: None)
+
+    def __hash__(self):
+        return id(self)
+
+    @property
+    def id_data(self):
+        return self
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = types.SimpleNamespace(action=None)
+        return self.animation_data
+
+    def animation_data_clear(self):
+        self.animation_data = None
+
+    # Key the current value of a property, creating the action as needed
+    def keyframe_insert(self, data_path: str, index: int = -1, frame: float = None):
+        owner, attribute = resolve(self, data_path)
+        value = getattr(owner, attribute)
+        values = list(value) if hasattr(value, "__iter__") else [value]
+        indices = range(len(values)) if index == -1 else [index]
+        frame = bpy.context.scene.frame_current if frame is None else frame
+
+        animation_data = self.animation_data_create()
+        if animation_data.action is None:
+            animation_data.action = bpy.data.actions.new(f"{self.name}Action")
+        fcurves = animation_data.action.fcurves
+        for component in indices:
+            fcurve = fcurves.find(data_path, component) or fcurves.new(
+                data_path, component
+            )
+            fcurve.keyframe_points.insert(frame, values[component])
+        return True
+
+
+# Find the object and attribute a data path like
+# 'nodes["Principled BSDF"].inputs[0].default_value' points to
+def resolve(owner, data_path: str):
+    parts = data_path.replace("]", "").replace("[", ".").split(".")
+    for part in parts[:-1]:
+        if part.startswith('"'):
+            owner = owner[part.strip('"')]
+        elif part.isdigit():
+            owner = owner[int(part)]
+        else:
+            owner = getattr(owner, part)
+    return owner, parts[-1]
+
+
+class Action(ID):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.fcurves = FCurves()
+
+
+class Socket:
+    def __init__(self, node, name: str, index: int, default_value=None):
+        self.node = node
+        self.name = name
+        self.index = index
+        self.default_value = default_value
+
+    @property
+    def id_data(self):
+        return self.node.tree
+
+    def path_from_id(self, attribute: str) -> str:
+        return f'nodes["{self.node.name}"].inputs[{self.index}].{attribute}'
+
+    def keyframe_insert(self, data_path: str, index: int = -1, frame: float = None):
+        return self.id_data.keyframe_insert(self.path_from_id(data_path), index, frame)
+
+
+class Sockets(list):
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for socket in self:
+                if socket.name == key:
+                    return socket
+            raise KeyError(key)
+        return super().__getitem__(key)
+
+
+class Node:
+    def __init__(self, tree, type: str, name: str):
+        self.tree = tree
+        self.type = type
+        self._name = name
+        self.inputs = Sockets()
+        self.outputs = Sockets()
+        if type == "ShaderNodeBsdfPrincipled":
+            self.inputs.append(Socket(self, "Base Color", 0, (0.8, 0.8, 0.8, 1.0)))
+            self.outputs.append(Socket(self, "BSDF", 0))
+        elif type == "ShaderNodeOutputMaterial":
+            self.inputs.append(Socket(self, "Surface", 0))
+        elif type == "ShaderNodeAttribute":
+            self.attribute_type = "GEOMETRY"
+            self.attribute_name = ""
+            self.outputs.append(Socket(self, "Color", 0))
+        elif type in GEOMETRY_NODE_SOCKETS:
+            inputs, outputs = GEOMETRY_NODE_SOCKETS[type]
+            self.inputs.extend(Socket(self, name, i) for i, name in enumerate(inputs))
+            self.outputs.extend(Socket(self, name, i) for i, name in enumerate(outputs))
+
+    # Renaming a node renames its entry in the node tree
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        nodes = self.tree.nodes
+        if nodes.get(self._name) is self:
+            del nodes[self._name]
+        self._name = unique_name(value, nodes)
+        nodes[self._name] = self
+
+
+# Input and output sockets of the geometry nodes the swarm object uses
+GEOMETRY_NODE_SOCKETS = {
+    "NodeGroupInput": ((), ("Geometry",)),
+    "NodeGroupOutput": (("Geometry",), ()),
+    "GeometryNodeObjectInfo": (("Object", "As Instance"), ("Geometry",)),
+    "GeometryNodeInputNamedAttribute": (("Name",), ("Attribute",)),
+    "GeometryNodeInstanceOnPoints": (
+        ("Points", "Instance", "Rotation"),
+        ("Instances",),
+    ),
+}
+
+
+# Default names Blender gives new nodes of each type
+NODE_NAMES = {
+    "ShaderNodeBsdfPrincipled": "Principled BSDF",
+    "ShaderNodeOutputMaterial": "Material Output",
+    "ShaderNodeAttribute": "Attribute",
+    "NodeGroupInput": "Group Input",
+    "NodeGroupOutput": "Group Output",
+    "GeometryNodeObjectInfo": "Object Info",
+    "GeometryNodeInputNamedAttribute": "Named Attribute",
+    "GeometryNodeInstanceOnPoints": "Instance on Points",
+}
+
+
+class Nodes(dict):
+    def __init__(self, tree):
+        super().__init__()
+        self.tree = tree
+
+    def new(self, type: str):
+        name = unique_name(NODE_NAMES.get(type, type), self)
+        node = Node(self.tree, type, name)
+        self[name] = node
+        return node
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def remove(self, node):
+        del self[node.name]
+
+
+class NodeTree(ID):
+    def __init__(self, name: str = "Shader Nodetree", type: str = "ShaderNodeTree"):
+        super().__init__(name)
+        self.type = type
+        self.nodes = Nodes(self)
+        self.links = types.SimpleNamespace(new=lambda output, input: None)
+        self.interface = types.SimpleNamespace(new_socket=self.new_socket)
+        self.sockets = []
+
+    # Add a socket to the group's interface, as (name, in_out, socket_type)
+    def new_socket(self, name: str, in_out: str = "INPUT", socket_type: str = ""):
+        self.sockets.append((name, in_out, socket_type))
+
+
+class Material(ID):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.node_tree = None
+
+    @property
+    def use_nodes(self) -> bool:
+        return self.node_tree is not None
+
+    @use_nodes.setter
+    def use_nodes(self, value: bool):
+        if value and self.node_tree is None:
+            self.node_tree = NodeTree()
+            self.node_tree.nodes.new("ShaderNodeBsdfPrincipled")
+            self.node_tree.nodes.new("ShaderNodeOutputMaterial")
+
+    def copy(self):
+        material = bpy.data.materials.new(self.name)
+        material.use_nodes = self.use_nodes
+        return material
+
+
+# Values of a mesh's vertices, with width values each. Like Blender's,
+# foreach_set needs a value for every vertex
+class PointValues:
+    def __init__(self, attribute: str, width: int, count: int):
+        self.attribute = attribute
+        self.values = [0.0] * (width * count)
+
+    def foreach_set(self, attribute: str, sequence):
+        values = [float(value) for value in sequence]
+        if attribute != self.attribute or len(values) != len(self.values):
+            raise ValueError(f"foreach_set: wrong number of {attribute} values")
+        self.values = values
+
+    def foreach_get(self, attribute: str, sequence):
+        if attribute != self.attribute or len(sequence) != len(self.values):
+            raise ValueError(f"foreach_get: wrong number of {attribute} values")
+        for index, value in enumerate(self.values):
+            sequence[index] = value
+
+
+class MeshVertices:
+    def __init__(self):
+        self.count = 0
+        self.positions = PointValues("co", 3, 0)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, count: int):
+        self.count += count
+        self.positions.values.extend([0.0] * (3 * count))
+
+    def foreach_set(self, attribute: str, sequence):
+        self.positions.foreach_set(attribute, sequence)
+
+    def foreach_get(self, attribute: str, sequence):
+        self.positions.foreach_get(attribute, sequence)
+
+
+# Width of the values of each attribute data type
+ATTRIBUTE_WIDTHS = {"FLOAT": 1, "FLOAT_VECTOR": 3, "QUATERNION": 4}
+
+
+class Attributes(dict):
+    def __init__(self, mesh):
+        super().__init__()
+        self.mesh = mesh
+
+    def new(self, name: str, type: str, domain: str):
+        attribute = types.SimpleNamespace(
+            name=name,
+            data_type=type,
+            domain=domain,
+            data=PointValues("value", ATTRIBUTE_WIDTHS[type], len(self.mesh.vertices)),
+        )
+        self[name] = attribute
+        return attribute
+
+
+class Mesh(ID):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.materials = []
+        self.vertices = MeshVertices()
+        self.attributes = Attributes(self)
+
+    def update(self):
+        pass
+
+    def copy(self):
+        mesh = bpy.data.meshes.new(self.name)
+        mesh.materials = list(self.materials)
+        return mesh
+
+
+# Material slot of an object. Its material comes from the object's mesh
+# unless the slot is linked to the object
+class MaterialSlot:
+    def __init__(self, obj, index: int):
+        self.obj = obj
+        self.index = index
+
+    @property
+    def link(self) -> str:
+        return self.obj.slot_links.get(self.index, "DATA")
+
+    @link.setter
+    def link(self, value: str):
+        self.obj.slot_links[self.index] = value
+
+    @property
+    def material(self):
+        if self.link == "OBJECT":
+            return self.obj.object_materials.get(self.index)
+        return self.obj.data.materials[self.index]
+
+    @material.setter
+    def material(self, material):
+        if self.link == "OBJECT":
+            self.obj.object_materials[self.index] = material
+        else:
+            self.obj.data.materials[self.index] = material
+
+
+class Object(ID):
+    def __init__(self, name: str, data=None):
+        super().__init__(name)
+        self.data = data
+        self._parent = None
+        self.children = []
+        self.slot_links = {}
+        self.object_materials = {}
+        self._location = Vector()
+        self.rotation_euler = Vector()
+        self.rotation_mode = "XYZ"
+        self.rotation_quaternion = (1.0, 0.0, 0.0, 0.0)
+        self.matrix_world = Matrix()
+        self.selected = False
+        self.modifiers = Modifiers()
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        if self._parent is not None:
+            self._parent.children.remove(self)
+        self._parent = parent
+        if parent is not None:
+            parent.children.append(self)
+
+    @property
+    def location(self) -> Vector:
+        return self._location
+
+    @location.setter
+    def location(self, value):
+        self._location = Vector(value)
+
+    @property
+    def children_recursive(self) -> list:
+        found = []
+        for child in self.children:
+            found.append(child)
+            found.extend(child.children_recursive)
+        return found
+
+    @property
+    def material_slots(self) -> list:
+        count = len(self.data.materials) if self.data is not None else 0
+        return [MaterialSlot(self, index) for index in range(count)]
+
+    @property
+    def active_material(self):
+        slots = self.material_slots
+        return slots[0].material if slots else None
+
+    def select_set(self, state: bool):
+        self.selected = state
+
+    def select_get(self) -> bool:
+        return self.selected
+
+    def copy(self):
+        duplicate = bpy.data.objects.new(self.name, self.data)
+        duplicate.location = self.location
+        duplicate.rotation_euler = Vector(self.rotation_euler)
+        duplicate.parent = self.parent
+        duplicate.slot_links = dict(self.slot_links)
+        duplicate.object_materials = dict(self.object_materials)
+        duplicate.properties = {
+            key: list(value) if isinstance(value, list) else value
+            for key, value in self.properties.items()
+        }
+        return duplicate
+
+
+class Modifiers(list):
+    def new(self, name: str, type: str):
+        modifier = types.SimpleNamespace(name=name, type=type, node_group=None)
+        self.append(modifier)
+        return modifier
+
+
+# First free name of the form base, base.001, base.002, ... Numbers below
+# the one in numbers[stem] are known to be taken, which keeps naming many
+# copies of one object linear like Blender's name map does
+def unique_name(base: str, taken, numbers: dict = None) -> str:
+    if base not in taken:
+        return base
+    stem = base.rsplit(".", 1)[0] if base[-4:-3] == "." else base
+    number = 1 if numbers is None else numbers.get(stem, 1)
+    while f"{stem}.{number:03d}" in taken:
+        number += 1
+    if numbers is not None:
+        numbers[stem] = number + 1
+    return f"{stem}.{number:03d}"
+
+
+class IDCollection:
+    def __init__(self, factory):
+        self.factory = factory
+        self.items: dict[str, ID] = {}
+        self.numbers: dict[str, int] = {}
+
+    def __iter__(self):
+        return iter(list(self.items.values()))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, name):
+        return name in self.items
+
+    def __getitem__(self, name: str):
+        return self.items[name]
+
+    def get(self, name: str, default=None):
+        return self.items.get(name, default)
+
+    def new(self, name: str, *args):
+        item = self.factory(unique_name(name, self.items, self.numbers), *args)
+        self.items[item.name] = item
+        return item
+
+    def remove(self, item, do_unlink: bool = True):
+        if self.items.get(item.name) is not item:
+            raise ReferenceError(f"{item.name} was already removed")
+        del self.items[item.name]
+        self.numbers.clear()
+        if isinstance(item, Object):
+            item.parent = None
+            for collection in bpy.data.collections:
+                collection.objects.unlink(item)
+
+
+class CollectionObjects(dict):
+    def link(self, obj):
+        if obj.name in self:
+            raise RuntimeError(f"{obj.name} is already in the collection")
+        self[obj.name] = obj
+
+    def unlink(self, obj):
+        self.pop(obj.name, None)
+
+    def __iter__(self):
+        return iter(list(self.values()))
+
+
+class Collection(ID):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.objects = CollectionObjects()
+
+
+class ViewLayer:
+    # Recompute world matrices from the parent chain. Only rotation around Z
+    # is taken into account, which is all the swarm scenes use
+    def update(self):
+        def evaluate(obj, parent_translation, parent_rotation_z):
+            rotated = Vector(obj.location).rotated(Vector((0, 0, 1)), parent_rotation_z)
+            obj.matrix_world.translation = parent_translation + rotated
+            obj.matrix_world.rotation_z = parent_rotation_z + obj.rotation_euler[2]
+            for child in obj.children:
+                evaluate(
+                    child, obj.matrix_world.translation, obj.matrix_world.rotation_z
+                )
+
+        for obj in bpy.data.objects:
+            if obj.parent is None:
+                evaluate(obj, Vector(), 0.0)
+
+
+class Scene(ID):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.frame_current = 1
+        self.frame_start = 1
+        self.frame_end = 250
+
+    def frame_set(self, frame: int):
+        self.frame_current = frame
+        for handler in list(bpy.app.handlers.frame_change_pre):
+            handler(self, None)
+        bpy.context.view_layer.update()
+
+
+class Context(types.SimpleNamespace):
+    @property
+    def selected_objects(self) -> list:
+        return [obj for obj in bpy.data.objects if obj.select_get()]
+
+
+# Stand-ins for the object operators generate-bees-and-flowers.py uses. Like
+# the real operators, each call walks every object in the scene
+def select_all(action: str = "TOGGLE"):
+    for obj in bpy.data.objects:
+        obj.select_set(action == "SELECT")
+
+
+def duplicate_move(OBJECT_OT_duplicate=None, TRANSFORM_OT_translate=None):
+    linked = (OBJECT_OT_duplicate or {}).get("linked", False)
+    selected = [obj for obj in bpy.data.objects if obj.select_get()]
+    copies = {}
+    for obj in selected:
+        copies[obj] = obj.copy()
+        if not linked and obj.data is not None:
+            copies[obj].data = obj.data.copy()
+
+    for obj, copy in copies.items():
+        if obj.parent in copies:
+            copy.parent = copies[obj.parent]
+        for collection in bpy.data.collections:
+            if collection.objects.get(obj.name) is obj:
+                collection.objects.link(copy)
+        obj.select_set(False)
+        copy.select_set(True)
+
+
+# Remove datablocks of any type at once
+def batch_remove(ids):
+    collections = [
+        collection
+        for collection in vars(bpy.data).values()
+        if isinstance(collection, IDCollection)
+    ]
+    for item in ids:
+        for collection in collections:
+            if collection.get(item.name) is item:
+                collection.remove(item)
+                break
+
+
+# Functions registered with bpy.app.timers. Nothing calls them on its own,
+# run_timers calls each one until it asks not to be called again
+class Timers:
+    def __init__(self):
+        self.functions = []
+
+    def register(self, function, first_interval: float = 0):
+        self.functions.append(function)
+
+    def unregister(self, function):
+        self.functions.remove(function)
+
+    def is_registered(self, function) -> bool:
+        return function in self.functions
+
+    def run_timers(self):
+        while self.functions:
+            for function in list(self.functions):
+                if function() is None:
+                    self.functions.remove(function)
+
+
+# Mark a handler to stay registered when another file is loaded
+def persistent(function):
+    function._bpy_persistent = True
+    return function
+
+
+# Create fresh bpy and mathutils modules with empty data
+def create_modules() -> tuple[types.ModuleType, types.ModuleType]:
+    bpy = types.ModuleType("bpy")
+    bpy.data = types.SimpleNamespace(
+        objects=IDCollection(Object),
+        materials=IDCollection(Material),
+        meshes=IDCollection(Mesh),
+        node_groups=IDCollection(NodeTree),
+        actions=IDCollection(Action),
+        worlds=IDCollection(ID),
+        scenes=IDCollection(Scene),
+        collections=IDCollection(Collection),
+        filepath="",
+        batch_remove=batch_remove,
+    )
+    scene = bpy.data.scenes.new("Scene")
+    collection = bpy.data.collections.new("Collection")
+    bpy.context = Context(scene=scene, view_layer=ViewLayer(), collection=collection)
+    bpy.ops = types.SimpleNamespace(
+        object=types.SimpleNamespace(
+            select_all=select_all, duplicate_move=duplicate_move
+        )
+    )
+    bpy.app = types.SimpleNamespace(
+        handlers=types.SimpleNamespace(
+            persistent=persistent, frame_change_pre=[], load_pre=[]
+        ),
+        timers=Timers(),
+    )
+    bpy.path = types.SimpleNamespace(
+        abspath=lambda path: os.path.abspath(
+            path[2:] if path.startswith("//") else path
+        )
+    )
+
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Vector = Vector
+    mathutils.Quaternion = Quaternion
+    return bpy, mathutils
+
+
+bpy = None
+
+
+# Register the stand-ins as the bpy and mathutils modules. Installing them
+# again empties the installed bpy in place, so modules that imported it see
+# the new data
+def install():
+    global bpy
+    fresh, mathutils = create_modules()
+    if bpy is None:
+        bpy = fresh
+    else:
+        vars(bpy).update(vars(fresh))
+    sys.modules["bpy"] = bpy
+    sys.modules["mathutils"] = mathutils
+    return bpy
+
+
+# Load an empty file like File > New does: the load_pre handlers run, then
+# the data is replaced and only persistent handlers stay registered
+def load_file():
+    handlers = bpy.app.handlers
+    for handler in list(handlers.load_pre):
+        handler(bpy.data.filepath)
+    kept = {
+        name: [
+            handler
+            for handler in getattr(handlers, name)
+            if getattr(handler, "_bpy_persistent", False)
+        ]
+        for name in ("frame_change_pre", "load_pre")
+    }
+    install()
+    for name, functions in kept.items():
+        getattr(bpy.app.handlers, name).extend(functions)
+
+
+# Create an object with its own mesh, linked into the scene collection
+def add_object(name: str, location=(0, 0, 0), parent=None):
+    obj = bpy.data.objects.new(name, bpy.data.meshes.new(name))
+    obj.location = location
+    obj.parent = parent
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+
+# Flower with a pod that has its own Principled BSDF material
+def add_flower(name: str, location, material_name: str):
+    flower = add_object(name, location)
+    pod = add_object(name.replace("Flower", "Pod"), (0.5, 0, 3), flower)
+    material = bpy.data.materials.new(material_name)
+    material.use_nodes = True
+    material.node_tree.nodes["Principled BSDF"].inputs["Base Color"].default_value = (
+        0.0,
+        0.0,
+        1.0,
+        1.0,
+    )
+    pod.data.materials.append(material)
+    return flower
+
+
+# Build a scene like the one generate-bees-and-flowers.py produces: a hive,
+# bees and flowers with pods spread over the flower patch
+def build_scene(bee_count: int, flower_count: int, seed: int = 0):
+    rng = random.Random(seed)
+    add_object("Hive", (0, 0, 40))
+    for index in range(bee_count):
+        add_object("Bee" if index == 0 else f"Bee.{index:03d}", (0, 0, 40))
+    for index in range(flower_count):
+        name = "Flower" if index == 0 else f"Flower.{index:03d}"
+        location = (rng.uniform(-100, 100), rng.uniform(-100, 100), 0)
+        add_flower(name, location, "Pod" if index == 0 else f"Pod.{index:03d}")
+    bpy.context.view_layer.update()
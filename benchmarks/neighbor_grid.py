@@ -0,0 +1,121 @@
+# Benchmark of the bee neighbor search used by the social step. Run from the
+# repository root with: python -m benchmarks.neighbor_grid
+
+import argparse
+import math
+import random
+import time
+
+from swarm import Action, Simulation, config
+
+
+# Random flower pods spread over the flower patch
+def random_pods(count: int, rng: random.Random) -> list[tuple[float, float, float]]:
+    return [(rng.uniform(-100, 100), rng.uniform(-100, 100), 3) for _ in range(count)]
+
+
+# Swarm of bees scattered over a square field, each with a random personal
+# best flower, as they are while searching the flower patch
+def scattered_swarm(bee_count: int, seed: int, field_width: float) -> Simulation:
+    rng = random.Random(seed)
+    simulation = Simulation((0, 0, 40), random_pods(50, rng), bee_count, rng)
+    for bee in simulation.bees:
+        bee.action = Action.SWARMING
+        bee.pos.x = rng.uniform(-field_width, field_width)
+        bee.pos.y = rng.uniform(-field_width, field_width)
+        bee.pos.z = rng.uniform(*simulation.bounds["z"])
+        simulation.bee_grid.move(bee.id, bee.pos)
+        if rng.random() < 0.5:
+            bee.personal_best_flower = rng.choice(simulation.flowers)
+            bee.personal_best = rng.uniform(0, config.COGNITION_RANGE)
+    return simulation
+
+
+# Time the social step of every bee over a few frames, jittering the bees
+# between frames, and return the seconds per frame and the global best
+# flower of every bee after every frame
+def run(
+    bee_count: int, frames: int, seed: int, field_width: float, neighbor_grid: bool
+):
+    simulation = scattered_swarm(bee_count, seed, field_width)
+    grid = simulation.bee_grid
+    if not neighbor_grid:
+        simulation.bee_grid = None
+
+    rng = random.Random(seed)
+    history, elapsed = [], 0.0
+    for _ in range(frames):
+        for bee in simulation.bees:
+            bee.pos += simulation.random_velocity() * rng.random()
+            grid.move(bee.id, bee.pos)
+
+        start = time.perf_counter()
+        for bee in simulation.bees:
+            simulation.detect_nearby_bees(bee)
+        elapsed += time.perf_counter() - start
+
+        history.append(
+            [
+                bee.global_best_flower and bee.global_best_flower.id
+                for bee in simulation.bees
+            ]
+        )
+    return elapsed / frames, history
+
+
+# Slope of log(time) against log(bees): ~2 for quadratic, ~1 for linear
+def scaling_exponent(sizes: list[int], times: list[float]) -> float:
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(seconds) for seconds in times]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return covariance / sum((x - mean_x) ** 2 for x in xs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare pairwise and grid bee neighbor search"
+    )
+    parser.add_argument(
+        "--bees", type=int, nargs="+", default=[250, 500, 1000, 2000, 4000]
+    )
+    parser.add_argument("--frames", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--fixed-area",
+        action="store_true",
+        help="keep every swarm inside the flower patch instead of growing the"
+        " field with the swarm, so density rises with the number of bees",
+    )
+    args = parser.parse_args()
+
+    pairwise_times, grid_times = [], []
+    print(f"{'bees':>6} {'pairwise s/frame':>17} {'grid s/frame':>13} {'speedup':>8}")
+    for bee_count in args.bees:
+        field_width = config.FLOWER_PATCH_WIDTH
+        if not args.fixed_area:
+            field_width *= math.sqrt(bee_count / args.bees[0])
+
+        pairwise, pairwise_history = run(
+            bee_count, args.frames, args.seed, field_width, False
+        )
+        grid, grid_history = run(bee_count, args.frames, args.seed, field_width, True)
+        if pairwise_history != grid_history:
+            raise SystemExit(f"Grid and pairwise results differ with {bee_count} bees")
+
+        pairwise_times.append(pairwise)
+        grid_times.append(grid)
+        print(
+            f"{bee_count:>6} {pairwise:>17.4f} {grid:>13.4f} {pairwise / grid:>7.1f}x"
+        )
+
+    if len(args.bees) > 1:
+        print(
+            "scaling exponent:"
+            f" pairwise {scaling_exponent(args.bees, pairwise_times):.2f},"
+            f" grid {scaling_exponent(args.bees, grid_times):.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Benchmark of scene generation, comparing copying objects at the data level
+# with duplicating them through operators. Run from the repository root
+# against the stand-in bpy module with:
+#
+#   python -m benchmarks.scene_generation --bees 200 1000 5000 20000
+#
+# or inside Blender, on a scene holding the Bee and Flower templates:
+#
+#   blender scene.blend --background --python benchmarks/scene_generation.py -- --bees 200 1000
+#
+# The stand-in operators walk the whole scene like the real ones do, but
+# only Blender shows the cost of their redraws and undo pushes
+
+import argparse
+import os
+import sys
+import time
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+else:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+METHODS = ["copy", "operator"]
+
+
+# Place count copies of a template by one of the methods
+def generate(method: str, template, count: int):
+    collection = bpy.context.collection
+    if method == "copy":
+        copy_objects(template, collection, [template.location.copy()] * count)
+        return
+
+    for id in range(1, count + 1):
+        duplicate_hierarchy(template, collection, id)
+
+
+# Time generating bees and flowers with one method, then clearing them
+# again the way clear-bees-and-flowers.py does
+def run_case(method: str, bee_count: int, flower_count: int) -> dict:
+    seconds = {}
+    for name, count in (("Bee", bee_count), ("Flower", flower_count)):
+        start = time.perf_counter()
+        generate(method, bpy.data.objects.get(name), count)
+        seconds[name] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clear_generated(["Bee", "Flower"])
+    seconds["clear"] = time.perf_counter() - start
+    return seconds
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="Benchmark scene generation")
+    parser.add_argument("--bees", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument(
+        "--flowers-per-bee", type=float, default=0.25, help="flowers per bee placed"
+    )
+    parser.add_argument(
+        "--operator-max-bees",
+        type=int,
+        default=5000,
+        help="skip larger scenes on the operator path",
+    )
+    args = parser.parse_args(argv)
+
+    global bpy, clear_generated, copy_objects, duplicate_hierarchy
+    if bpy is None:
+        from benchmarks import fake_bpy
+
+        bpy = fake_bpy.install()
+        fake_bpy.build_scene(1, 1)
+
+    from swarm.blender.generate import (
+        clear_generated,
+        copy_objects,
+        duplicate_hierarchy,
+    )
+
+    print(
+        f"{'bees':>6} {'flowers':>7} {'method':>8} {'bees s':>8} {'flowers s':>9}"
+        f" {'clear s':>8}"
+    )
+    for bee_count in args.bees:
+        flower_count = int(bee_count * args.flowers_per_bee)
+        for method in METHODS:
+            if method == "operator" and bee_count > args.operator_max_bees:
+                continue
+            seconds = run_case(method, bee_count, flower_count)
+            print(
+                f"{bee_count:>6} {flower_count:>7} {method:>8}"
+                f" {seconds['Bee']:>8.3f} {seconds['Flower']:>9.3f}"
+                f" {seconds['clear']:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# Scaling benchmark of the full bake, run outside of Blender against the
+# stand-in bpy module. Every case runs in its own process so that peak
+# memory is measured per case. Run from the repository root with:
+#
+#   python -m benchmarks.suite --output results.json
+#   python -m benchmarks.suite --baseline results.json
+#
+# The second form exits with status 1 if any case got slower than the
+# baseline by more than the tolerance
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# (bees, flowers) of the default cases
+CASES = [(200, 50), (1000, 100), (5000, 500), (20000, 1000)]
+
+# Simulation engines to benchmark
+ENGINES = ["python", "numpy"]
+
+
+# Peak resident memory of this process in megabytes
+def peak_memory_mb() -> float:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** (2 if sys.platform == "darwin" else 1)
+
+
+# Number of keyframes on every F-curve in the scene
+def count_keyframes(bpy) -> int:
+    return sum(
+        len(fcurve.keyframe_points)
+        for action in bpy.data.actions
+        for fcurve in action.fcurves
+    )
+
+
+# Bake one scene and time each phase of it
+def run_case(bee_count: int, flower_count: int, engine: str, frames: int, seed: int):
+    from benchmarks import fake_bpy
+
+    bpy = fake_bpy.install()
+    fake_bpy.build_scene(bee_count, flower_count, seed)
+
+    from swarm import config
+    from swarm.blender.bake import SceneKeyframer, prepare
+    from swarm.blender.scene import SwarmScene
+
+    phases = {"prepare": 0.0, "simulate": 0.0, "record": 0.0, "write": 0.0}
+    start = time.perf_counter()
+    scene = SwarmScene()
+    simulation = prepare(scene, random.Random(seed), engine)
+    keyframer = SceneKeyframer(scene, simulation)
+    phases["prepare"] = time.perf_counter() - start
+
+    # The first frames of the full-length animation, so the swarm goes
+    # through the same phases it would in a real bake
+    simulated_frames = simulation.frames(stop=min(frames, config.FRAME_COUNT - 1) + 1)
+    for frame in simulated_frames:
+        start = time.perf_counter()
+        simulation.step(frame)
+        middle = time.perf_counter()
+        keyframer.record_frame(frame)
+        phases["record"] += time.perf_counter() - middle
+        phases["simulate"] += middle - start
+
+    start = time.perf_counter()
+    keyframer.write()
+    phases["write"] = time.perf_counter() - start
+
+    seconds = sum(phases.values())
+    return {
+        "bees": bee_count,
+        "flowers": flower_count,
+        "engine": engine,
+        "frames": len(simulated_frames),
+        "seconds": seconds,
+        "frames_per_second": len(simulated_frames) / seconds,
+        "phases": phases,
+        "peak_memory_mb": peak_memory_mb(),
+        "keyframes": count_keyframes(bpy),
+        "pollinated_flowers": sum(simulation.pollinated_flowers()),
+    }
+
+
+# Run a case in a fresh Python process and return its result
+def run_case_in_process(bees: int, flowers: int, engine: str, args) -> dict:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.suite",
+        "--case",
+        str(bees),
+        str(flowers),
+        engine,
+        "--frames",
+        str(args.frames),
+        "--seed",
+        str(args.seed),
+    ]
+    output = subprocess.run(command, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(
+            f"Case {bees} bees/{flowers} flowers failed:\n{output.stderr}"
+        )
+    return json.loads(output.stdout)
+
+
+def case_key(result: dict) -> tuple:
+    return (result["engine"], result["bees"], result["flowers"], result["frames"])
+
+
+# Cases that got slower than the baseline by more than the tolerance
+def find_regressions(results: list, baseline: list, tolerance: float) -> list[str]:
+    previous = {case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(case_key(result))
+        if before is None:
+            continue
+        limit = before["frames_per_second"] * (1 - tolerance)
+        if result["frames_per_second"] < limit:
+            regressions.append(
+                f"{result['engine']} {result['bees']} bees/{result['flowers']}"
+                f" flowers: {result['frames_per_second']:.2f} frames/s, baseline"
+                f" {before['frames_per_second']:.2f}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the swarm bake")
+    parser.add_argument(
+        "--bees", type=int, nargs="+", help="bee counts, instead of the default cases"
+    )
+    parser.add_argument("--flowers", type=int, default=None)
+    parser.add_argument("--engines", nargs="+", default=ENGINES, choices=ENGINES)
+    parser.add_argument(
+        "--frames", type=int, default=300, help="last frame of the animation to bake"
+    )
+    parser.add_argument(
+        "--python-max-bees",
+        type=int,
+        default=1000,
+        help="skip larger swarms on the pure-Python engine",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--case", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        bees, flowers, engine = args.case
+        result = run_case(int(bees), int(flowers), engine, args.frames, args.seed)
+        print(json.dumps(result))
+        return
+
+    cases = CASES
+    if args.bees:
+        cases = [(bees, args.flowers or 50) for bees in args.bees]
+    elif args.flowers:
+        cases = [(bees, args.flowers) for bees, _ in CASES]
+
+    results = []
+    for engine in args.engines:
+        for bees, flowers in cases:
+            if engine == "python" and bees > args.python_max_bees:
+                continue
+            result = run_case_in_process(bees, flowers, engine, args)
+            results.append(result)
+            phases = ", ".join(
+                f"{name} {seconds:.2f}s" for name, seconds in result["phases"].items()
+            )
+            print(
+                f"{engine:>6} {bees:>6} bees {flowers:>5} flowers:"
+                f" {result['frames_per_second']:8.2f} frames/s,"
+                f" {result['peak_memory_mb']:.0f} MB peak ({phases})"
+            )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"python": platform.python_version(), "results": results},
+                file,
+                indent=2,
+            )
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
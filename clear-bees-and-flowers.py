@@ -1,25 +1,19 @@
-import bpy
-
+import os
+import sys
 
-# Remove all objects that are duplicates of the keep_names objects
-def cleanup_objects(keep_names):
-    to_remove = []
-    for obj in bpy.data.objects:
-        base_name = obj.name.split(".")[0]  # Get the base name before the dot
-        if obj.name not in keep_names:
-            if any(base_name.startswith(name) for name in keep_names):
-                to_remove.extend([obj] + list(obj.children_recursive))
+import bpy
 
-    # Remove objects from scene and data blocks
-    while to_remove:
-        obj = to_remove.pop()
-        bpy.data.objects.remove(obj, do_unlink=True)
+# Make the swarm package importable when this script is run from Blender's
+# text editor, where it may live inside the .blend file
+for path in (
+    os.path.dirname(os.path.abspath(__file__)),
+    os.path.dirname(bpy.data.filepath),
+):
+    if os.path.isdir(os.path.join(path, "swarm")) and path not in sys.path:
+        sys.path.append(path)
 
+from swarm.blender.generate import clear_generated  # noqa: E402
 
-# Initial cleanup to remove existing duplicates
-cleanup_objects(["Bee", "Flower"])
-default_animated_items = ["Bee", "Flower", "Pod"]
-for item in default_animated_items:
-    obj = bpy.data.objects.get(item)
-    if obj.animation_data:
-        obj.animation_data_clear()
+# Remove the generated bees and flowers with their pod materials and
+# animation, leaving the Bee and Flower templates without animation
+clear_generated(["Bee", "Flower"])
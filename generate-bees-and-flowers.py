@@ -1,77 +1,63 @@
-import bpy
-from mathutils import Vector
+import os
 import random
+import sys
 
+import bpy
 
-START_IN_HIVE = False
-
-hive = bpy.data.objects.get("Hive")
-
-
-# Duplicate all children of an object
-def duplicate_hierarchy(obj, collection, id: int):
-    bpy.ops.object.select_all(action="DESELECT")
-
-    obj.select_set(True)
-    for child in obj.children_recursive:
-        child.select_set(True)
-
-    bpy.ops.object.duplicate_move(
-        OBJECT_OT_duplicate={"linked": False, "mode": "TRANSLATION"}
-    )
+# Make the swarm package importable when this script is run from Blender's
+# text editor, where it may live inside the .blend file
+for path in (
+    os.path.dirname(os.path.abspath(__file__)),
+    os.path.dirname(bpy.data.filepath),
+):
+    if os.path.isdir(os.path.join(path, "swarm")) and path not in sys.path:
+        sys.path.append(path)
+
+from swarm.blender.generate import (  # noqa: E402
+    copy_objects,
+    duplicate_hierarchy,
+    share_pod_material,
+)
+from swarm.blender.scene import find_child  # noqa: E402
+from swarm.placement import poisson_disk  # noqa: E402
 
-    # Set the correct parent on duplicate objects
-    duplicated_objects = [o for o in bpy.context.selected_objects if o.select_get()]
-    new_parent = None
-    for new_obj in duplicated_objects:
-        if new_obj.parent is None:
-            new_parent = new_obj
+START_IN_HIVE = False
 
-        # If it's a pod, create the pod's individual material. This allows
-        # the pod's color to be updated in isolation from other pods
-        elif new_obj.name.startswith("Pod"):
-            new_mat = bpy.data.materials.new(name=f"Pod.{str(id).rjust(3, '0')}")
-            new_mat.use_nodes = True
-            bsdf_node = new_mat.node_tree.nodes.new("ShaderNodeBsdfPrincipled")
-            output_node = new_mat.node_tree.nodes.new("ShaderNodeOutputMaterial")
-            new_mat.node_tree.links.new(
-                bsdf_node.outputs["BSDF"], output_node.inputs["Surface"]
-            )
-            new_obj.data.materials[0] = new_mat
-            bsdf_node.inputs["Base Color"].default_value = (0.0, 0.0, 1.0, 1.0)
+# Duplicate objects with the duplicate operator instead of copying them at
+# the data level. Much slower for large scenes, and gives every pod its own
+# mesh as well as its own material
+USE_OPERATORS = False
 
-        if new_obj.name not in collection.objects:
-            collection.objects.link(new_obj)
+# Give every pod one shared material that reads the pod's color from its
+# "pod_color" property, instead of a material per pod. The bake keys that
+# property, so there is one pod material however many flowers there are
+SHARED_POD_MATERIAL = False
 
-    bpy.ops.object.select_all(action="DESELECT")
+# Number of each object to place, and how far apart to place them
+FLOWER_COUNT = 50
+FLOWER_MIN_DISTANCE = 10
+BEE_COUNT = 200
+BEE_MIN_DISTANCE = 2
 
-    return new_parent
+hive = bpy.data.objects.get("Hive")
 
 
-# Check if an object is too close to any of the other objects based
-# on the min_distance
-def is_too_close(new_obj, other_objs, min_distance):
-    for obj in other_objs:
-        if (new_obj.location - obj.location).length < min_distance:
-            return True
-    return False
+# Place a certain number of objects by duplicating the obj variable. Each
+# object is at least min_distance from the others unless they start in
+# the hive
+def place_objects(obj, count, min_distance):
+    if START_IN_HIVE:
+        locations = [hive.location.copy() for _ in range(count)]
+    else:
+        locations = poisson_disk(count, min_distance, random)
 
+    if not USE_OPERATORS:
+        return copy_objects(obj, bpy.context.collection, locations)
 
-# Place a certain number of objects by duplicating the obj variable
-def place_objects(obj, count, min_distance):
     objects = []
-    for i in range(count):
+    for i, location in enumerate(locations):
         new_obj = duplicate_hierarchy(obj, bpy.context.collection, i + 1)
-        while True:
-            if START_IN_HIVE:
-                new_obj.location = hive.location.copy()
-                break
-            else:
-                new_obj.location = Vector(
-                    (random.uniform(-100, 100), random.uniform(-100, 100), 0)
-                )
-                if not is_too_close(new_obj, objects, min_distance):
-                    break
+        new_obj.location = location
         objects.append(new_obj)
     return objects
 
@@ -80,5 +66,6 @@ initial_bee = bpy.data.objects.get("Bee")
 initial_flower = bpy.data.objects.get("Flower")
 
 # Place flowers and bees
-place_objects(initial_flower, 50, 10)
-place_objects(initial_bee, 200, 2)
+share_pod_material(find_child(initial_flower, "Pod"), SHARED_POD_MATERIAL)
+place_objects(initial_flower, FLOWER_COUNT, FLOWER_MIN_DISTANCE)
+place_objects(initial_bee, BEE_COUNT, BEE_MIN_DISTANCE)
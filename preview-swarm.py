@@ -0,0 +1,36 @@
+import os
+import sys
+
+import bpy
+
+# Make the swarm package importable when this script is run from Blender's
+# text editor, where it may live inside the .blend file
+for path in (
+    os.path.dirname(os.path.abspath(__file__)),
+    os.path.dirname(bpy.data.filepath),
+):
+    if os.path.isdir(os.path.join(path, "swarm")) and path not in sys.path:
+        sys.path.append(path)
+
+from swarm.blender import clear_all_animation_data, start_preview  # noqa: E402
+
+# Seed for the simulation's random number generator. None gives a
+# different swarm on every run
+SEED = None
+
+# Simulation engine: "python" or "numpy", as in generate-keyframes.py
+ENGINE = "python"
+
+# Frames simulated between the snapshots kept for scrubbing back. Smaller
+# intervals scrub back faster and take more memory
+SNAPSHOT_INTERVAL = 50
+
+# Preview the swarm without baking it. Playing or scrubbing the timeline
+# simulates the swarm up to the current frame and moves the bees there, and
+# scrubbing back re-simulates from the last snapshot before the frame.
+# Constants changed in swarm.config, e.g. from the Python console, show up
+# from the next simulated frame. Call swarm.config.derive() after changing
+# one that others are derived from, like MIN_POLLINATION_TIME. Running
+# generate-keyframes.py or swarm.blender.stop_preview() ends the preview
+clear_all_animation_data()
+start_preview(SEED, ENGINE, SNAPSHOT_INTERVAL)
@@ -0,0 +1,5 @@
+from .simulation import Simulation
+from .state import Action, BeeState, FlowerState
+from .vector import Vector
+
+__all__ = ["Action", "BeeState", "FlowerState", "Simulation", "Vector"]
@@ -0,0 +1,23 @@
+from .background import BackgroundBake
+from .bake import bake, bake_cached, bake_chunked, bake_to_store
+from .fcurves import decimate_transforms
+from .instances import attach_swarm, bake_instanced
+from .preview import start_preview, stop_preview
+from .replay import apply_trajectories
+from .scene import SwarmScene, clear_all_animation_data
+
+__all__ = [
+    "BackgroundBake",
+    "SwarmScene",
+    "apply_trajectories",
+    "attach_swarm",
+    "bake",
+    "bake_cached",
+    "bake_chunked",
+    "bake_instanced",
+    "bake_to_store",
+    "clear_all_animation_data",
+    "decimate_transforms",
+    "start_preview",
+    "stop_preview",
+]
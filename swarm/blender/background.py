@@ -0,0 +1,190 @@
+import os
+import pickle
+import queue
+import random
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+import bpy
+
+from .. import config, stream
+from .bake import SceneKeyframer, check_engine, reset_objects
+from .scene import SwarmScene
+
+# Seconds between checks for frames from the background process
+POLL_INTERVAL = 0.1
+
+# Longest time in seconds spent applying frames per check, so the UI keeps
+# responding while a backlog of chunks is applied
+APPLY_BUDGET = 0.05
+
+# Chunks the background process may get ahead of the scene by
+QUEUE_SIZE = 8
+
+
+# Frames received from a background bake. A SceneKeyframer reads them like
+# a simulation, one frame at a time
+class StreamedFrames:
+    def __init__(self, pollinated: list[bool]):
+        self.pollinated = pollinated
+        self.transforms: list[tuple] = []
+        self.events: list[tuple[int, bool]] = []
+
+    def pollinated_flowers(self) -> list[bool]:
+        return self.pollinated
+
+    def bee_transforms(self) -> list[tuple]:
+        return self.transforms
+
+    def flower_events(self) -> list[tuple[int, bool]]:
+        return self.events
+
+
+# Bake that simulates the swarm in a background process while the keyframes
+# are applied on the main thread by a bpy.app.timers callback, a chunk of
+# frames at a time. Blender stays responsive, and the frames applied so far
+# can be scrubbed while the rest is still being simulated. The seed gives
+# the same swarm as bake
+class BackgroundBake:
+    def __init__(self, seed: int = None, engine: str = "python", chunk_size: int = 50):
+        check_engine(engine)
+        self.scene = SwarmScene()
+        rng = random.Random(seed)
+        reset_objects(self.scene, rng)
+
+        self.keyframer: Optional[SceneKeyframer] = None
+        self.frames: Optional[StreamedFrames] = None
+        self.frame_count = 0
+        self.frames_applied = 0
+        self.frames_written = 0
+        self.finished = False
+        self.cancelled = False
+        self.error: Optional[str] = None
+
+        # The simulation runs in a separate Python process, which pickles
+        # its messages to a pipe. A thread reads them into a queue, so the
+        # timer never waits on the pipe
+        constants = config.snapshot()
+        arguments = {
+            "engine": engine,
+            "hive_location": tuple(self.scene.hive.location),
+            "pod_positions": [tuple(pod) for pod in self.scene.pod_positions()],
+            "bee_count": len(self.scene.bees),
+            "rng": rng,
+            "chunk_size": chunk_size,
+        }
+        package_parent = os.path.dirname(os.path.dirname(stream.__file__))
+        environment = dict(os.environ)
+        environment["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [package_parent, environment.get("PYTHONPATH")])
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "swarm.stream"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=environment,
+        )
+        pickle.dump((constants, arguments), self.process.stdin)
+        self.process.stdin.close()
+
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.reader = threading.Thread(target=self.read_messages, daemon=True)
+        self.reader.start()
+        bpy.app.timers.register(self.poll, first_interval=POLL_INTERVAL)
+
+    # Move messages from the process to the queue until the process exits
+    def read_messages(self):
+        while True:
+            try:
+                message = pickle.load(self.process.stdout)
+            except (EOFError, OSError, pickle.UnpicklingError):
+                break
+            self.queue.put(message)
+        self.queue.put(None)
+
+    # Fraction of the frames applied so far
+    @property
+    def progress(self) -> float:
+        return self.frames_applied / self.frame_count if self.frame_count else 0.0
+
+    # Apply the frames received since the last call. Returns the time until
+    # the next call, or None once the bake has finished, which unregisters
+    # the timer
+    def poll(self) -> Optional[float]:
+        if self.finished:
+            return None
+
+        deadline = time.perf_counter() + APPLY_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                message = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if message is None:
+                self.finish("The background simulation stopped unexpectedly")
+                break
+            self.handle(message)
+            if self.finished:
+                break
+
+        if not self.finished:
+            self.write_keys()
+        return None if self.finished else POLL_INTERVAL
+
+    # Write the recorded keys to the F-curves. Writing rewrites every key
+    # already on them, so unless forced the keys are only written once the
+    # frames recorded since the last write are as many as the frames before
+    # it. Writing then costs time linear in the length of the bake, while
+    # the frames applied so far still show up as it goes
+    def write_keys(self, force: bool = False):
+        if self.keyframer is None:
+            return
+        pending = self.frames_applied - self.frames_written
+        if force or pending >= max(self.frames_written, 1):
+            self.keyframer.write()
+            self.frames_written = self.frames_applied
+
+    def handle(self, message: tuple):
+        kind = message[0]
+        if kind == "start":
+            _, locations, pollinated, self.frame_count = message
+            for location, obj in zip(locations, self.scene.bees):
+                obj.location = location
+            self.frames = StreamedFrames(pollinated)
+            self.keyframer = SceneKeyframer(self.scene, self.frames)
+        elif kind == "frames":
+            for frame, transforms, events in message[1]:
+                self.frames.transforms, self.frames.events = transforms, events
+                self.keyframer.record_frame(frame)
+            self.frames_applied += len(message[1])
+        elif kind == "done":
+            self.finish()
+        elif kind == "error":
+            self.finish(message[1])
+
+    # Stop the background process. Frames applied so far are kept
+    def cancel(self):
+        if not self.finished:
+            self.cancelled = True
+            self.finish()
+
+    # Stop the background process and apply what is left, recording the
+    # error that ended the bake, if any
+    def finish(self, error: str = None):
+        self.finished = True
+        self.error = error
+        self.write_keys(force=True)
+        if self.process.poll() is None:
+            self.process.terminate()
+        self.process.wait()
+
+        # Unblock the reader if it is waiting for room in the queue
+        while self.reader.is_alive():
+            try:
+                self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.process.stdout.close()
@@ -0,0 +1,295 @@
+import math
+import random
+
+import bpy
+
+from .. import config
+from ..cache import DEFAULT_CACHE_SIZE, BakeCache, cache_key
+from ..checkpoint import clear_checkpoints, load_checkpoint, save_checkpoint
+from ..simulation import create_engine, engine_class
+from ..store import TrajectoryWriter
+from ..telemetry import Telemetry
+from .fcurves import (
+    KeyframeRecorder,
+    decimate_transforms,
+    find_fcurve,
+    truncate_keyframes,
+)
+from .replay import apply_trajectories
+from .scene import (
+    BLUE,
+    YELLOW,
+    SwarmScene,
+    clear_all_animation_data,
+    pod_color_target,
+)
+
+# Engines a bake can use. The worker processes of the tiled engine would
+# re-run the Blender script that started them, so it only runs outside of
+# Blender, e.g. in parameter sweeps
+BAKE_ENGINES = ("python", "numpy")
+
+
+def check_engine(engine: str):
+    if engine not in BAKE_ENGINES:
+        raise ValueError(
+            f"Blender bakes can't use the {engine} engine, only"
+            f" {' or '.join(BAKE_ENGINES)}"
+        )
+
+
+# Reset the rotations of the scene objects. Flowers are turned randomly.
+# With a bee count, the bee objects are left alone
+def reset_objects(scene: SwarmScene, rng: random.Random, bee_count: int = None):
+    bees = scene.bees if bee_count is None else []
+    for obj in bees:
+        obj.rotation_euler = (0, 0, 0)
+        obj.rotation_mode = "QUATERNION"
+
+    for obj in scene.flowers:
+        obj.rotation_euler = (0, 0, rng.uniform(0, math.radians(90)))
+
+
+# Reset the scene objects and build a simulation from their initial state.
+# With a bee count, that many bees are simulated and the bee objects are
+# left alone, for swarms that are played back as instances
+def prepare(
+    scene: SwarmScene,
+    rng: random.Random,
+    engine: str = "python",
+    bee_count: int = None,
+):
+    check_engine(engine)
+    reset_objects(scene, rng, bee_count)
+    bees = scene.bees if bee_count is None else []
+    simulation = create_engine(
+        engine,
+        scene.hive.location,
+        scene.pod_positions(),
+        len(bees) if bee_count is None else bee_count,
+        rng,
+    )
+    for location, obj in zip(simulation.bee_locations(), bees):
+        obj.location = location
+
+    return simulation
+
+
+# Step through every frame of a simulation, calling record(frame) after each
+# step. With a telemetry path, the phases of the loop are timed and a row of
+# telemetry is streamed to that file after every frame
+def run_frames(simulation, record, telemetry_path: str = None, instrumented=()):
+    if telemetry_path is None:
+        for frame in simulation.run():
+            record(frame)
+        return None
+
+    with Telemetry(telemetry_path) as telemetry:
+        for obj in (simulation, *instrumented):
+            telemetry.instrument(obj)
+        for frame in simulation.run():
+            record(frame)
+            telemetry.end_frame(frame, simulation)
+    return telemetry
+
+
+# Simulate the swarm and write every frame to a trajectory store, which can
+# be applied to this or any copy of the scene later with apply_trajectories.
+# With a bee count, that many bees are simulated instead of the bee objects
+def bake_to_store(
+    path: str,
+    seed: int = None,
+    engine: str = "python",
+    telemetry_path: str = None,
+    bee_count: int = None,
+):
+    scene = SwarmScene()
+    simulation = prepare(scene, random.Random(seed), engine, bee_count)
+    metadata = {"flower_names": [obj.name for obj in scene.flowers]}
+    if bee_count is None:
+        metadata["bee_names"] = [obj.name for obj in scene.bees]
+    with TrajectoryWriter.for_simulation(path, simulation, metadata) as writer:
+        telemetry = run_frames(
+            simulation,
+            lambda frame: writer.write_frame(frame, simulation),
+            telemetry_path,
+        )
+
+    if telemetry is not None:
+        print(telemetry.summary())
+    return simulation
+
+
+# Records the keyframes of every simulated frame onto the scene objects and
+# writes them to F-curves in bulk when write is called. Unless
+# initial_colors is False, the pod colors are keyed at frame 1 first
+class SceneKeyframer:
+    def __init__(self, scene: SwarmScene, simulation, initial_colors: bool = True):
+        self.scene = scene
+        self.simulation = simulation
+        self.recorder = KeyframeRecorder()
+
+        # Pod colors only change when a flower's pollination flips, so they
+        # are keyed at the start and then only at those events, holding
+        # constant in between
+        self.color_targets = [pod_color_target(pod) for pod in scene.pods]
+        if initial_colors:
+            for flower_id, is_pollinated in enumerate(simulation.pollinated_flowers()):
+                self.record_color(flower_id, 1, is_pollinated)
+
+    def record_color(self, flower_id: int, frame: int, is_pollinated: bool):
+        target = self.color_targets[flower_id]
+        if target is not None:
+            color = YELLOW if is_pollinated else BLUE
+            self.recorder.record(*target, frame, color, interpolation="CONSTANT")
+
+    # Record the state of the simulation after it stepped to a frame
+    def record_frame(self, frame: int):
+
+        # Keyframe bees that moved
+        for (location, rotation), obj in zip(
+            self.simulation.bee_transforms(), self.scene.bees
+        ):
+            if location is not None:
+                self.recorder.record_location(obj, frame, location)
+            if rotation is not None:
+                self.recorder.record_rotation(obj, frame, rotation)
+
+        # Update the colors of pods whose pollination changed
+        for flower_id, is_pollinated in self.simulation.flower_events():
+            self.record_color(flower_id, frame, is_pollinated)
+
+    def write(self):
+        self.recorder.write()
+
+
+# Simulate the swarm and keyframe the result onto the scene. Keyframes are
+# recorded in memory with explicit frames and written to F-curves in bulk
+# once the simulation ends
+def bake(seed: int = None, engine: str = "python", telemetry_path: str = None):
+    scene = SwarmScene()
+    simulation = prepare(scene, random.Random(seed), engine)
+    keyframer = SceneKeyframer(scene, simulation)
+
+    # The simulation keeps its own frame counter, so the scene is never
+    # re-evaluated during the bake. Frames in the initial pause are skipped
+    telemetry = run_frames(
+        simulation, keyframer.record_frame, telemetry_path, [keyframer]
+    )
+    keyframer.write()
+
+    if telemetry is not None:
+        print(telemetry.summary())
+    return simulation
+
+
+# Like bake, but the trajectories are kept in a cache directory, keyed on the
+# swarm constants, the seed, the engine and the initial scene. When nothing
+# they depend on changed since an earlier bake, its trajectories are applied
+# instead of simulating the swarm again. The least recently used bakes are
+# deleted once the directory grows past max_size bytes. Unseeded bakes are
+# never cached
+def bake_cached(
+    directory: str,
+    seed: int = None,
+    engine: str = "python",
+    telemetry_path: str = None,
+    max_size: int = DEFAULT_CACHE_SIZE,
+):
+    # Pods are read after the flowers are turned, as prepare reads them
+    scene = SwarmScene()
+    reset_objects(scene, random.Random(seed))
+    key = cache_key(
+        seed,
+        engine,
+        scene.hive.location,
+        scene.pod_positions(),
+        [obj.name for obj in scene.bees],
+        [obj.name for obj in scene.flowers],
+    )
+    if key is None:
+        return bake(seed, engine, telemetry_path)
+
+    cache = BakeCache(directory, max_size)
+    path = cache.get(key)
+    if path is None:
+        path = cache.put(
+            key, lambda partial: bake_to_store(partial, seed, engine, telemetry_path)
+        )
+    else:
+        print(f"Reusing the cached bake {path}")
+    return apply_trajectories(path)
+
+
+# Delete the bee and pod color keys a bake made after a frame
+def truncate_animation(scene: SwarmScene, frame: int):
+    channels = []
+    for obj in scene.bees:
+        channels += [(obj, "location", 3), (obj, "rotation_quaternion", 4)]
+    for pod in scene.pods:
+        target = pod_color_target(pod)
+        if target is not None:
+            channels.append((*target, len(BLUE)))
+
+    for id_data, data_path, size in channels:
+        for index in range(size):
+            fcurve = find_fcurve(id_data, data_path, index)
+            if fcurve is not None:
+                truncate_keyframes(fcurve, frame)
+
+
+# Like bake, but the frames are simulated in chunks of chunk_size. After
+# each chunk its keyframes are written to the scene, the .blend file is
+# saved if it has a path, and the simulation state is checkpointed to a
+# directory. If the directory holds a checkpoint of the same scene and seed,
+# the bake resumes after it instead of starting over, including when only
+# the frame count grew since, so a longer animation only simulates the
+# frames it adds. With tolerances, the bee keys of each chunk are
+# decimated like decimate_transforms does before the file is saved, so the
+# keys of earlier chunks are never decimated twice
+def bake_chunked(
+    directory: str,
+    chunk_size: int = 250,
+    seed: int = None,
+    engine: str = "python",
+    location_tolerance: float = None,
+    rotation_tolerance: float = None,
+):
+    check_engine(engine)
+    scene = SwarmScene()
+    metadata = {
+        "seed": seed,
+        "bee_names": [obj.name for obj in scene.bees],
+        "flower_names": [obj.name for obj in scene.flowers],
+    }
+    checkpoint = load_checkpoint(directory, engine_class(engine), metadata)
+    if checkpoint is None:
+        clear_checkpoints(directory)
+        clear_all_animation_data()
+        simulation = prepare(scene, random.Random(seed), engine)
+        keyframer = SceneKeyframer(scene, simulation)
+        start = 1
+    else:
+        frame, simulation = checkpoint
+        print(f"Resuming the bake after frame {frame}")
+        clear_checkpoints(directory, after=frame)
+        truncate_animation(scene, frame)
+        keyframer = SceneKeyframer(scene, simulation, initial_colors=False)
+        start = frame + config.FRAME_STEP
+
+    frames = range(start, config.FRAME_COUNT, config.FRAME_STEP)
+    for first in range(0, len(frames), chunk_size):
+        chunk = frames[first : first + chunk_size]
+        for frame in simulation.run(chunk[0], chunk[-1] + 1):
+            keyframer.record_frame(frame)
+        keyframer.write()
+        decimate_transforms(
+            scene.bees, location_tolerance, rotation_tolerance, chunk[0]
+        )
+
+        # The checkpoint is saved last. If the bake stops before it, the
+        # keys written since the previous checkpoint are deleted on resume
+        if bpy.data.filepath:
+            bpy.ops.wm.save_mainfile()
+        save_checkpoint(directory, chunk[-1], simulation, metadata)
+    return simulation
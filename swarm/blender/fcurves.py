@@ -0,0 +1,212 @@
+import bisect
+from array import array
+from typing import Iterable
+
+import bpy
+
+from ..decimate import simplify_locations, simplify_rotations
+
+
+# Get or create the F-curve of one component of an animated property. Blender
+# 4.4 replaced Action.fcurves with slotted actions, so use the datablock-aware
+# call there
+def ensure_fcurve(id_data, data_path: str, index: int, group: str = None):
+    if id_data.animation_data is None:
+        id_data.animation_data_create()
+    animation_data = id_data.animation_data
+    if animation_data.action is None:
+        animation_data.action = bpy.data.actions.new(f"{id_data.name}Action")
+    action = animation_data.action
+
+    if hasattr(action, "fcurve_ensure_for_datablock"):
+        return action.fcurve_ensure_for_datablock(
+            id_data, data_path, index=index, group_name=group or ""
+        )
+
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group or "")
+    return fcurve
+
+
+# Existing F-curve of one component of an animated property, or None
+def find_fcurve(id_data, data_path: str, index: int):
+    animation_data = id_data.animation_data
+    if animation_data is None or animation_data.action is None:
+        return None
+    action = animation_data.action
+    if hasattr(action, "fcurves"):
+        return action.fcurves.find(data_path, index=index)
+
+    # Without the legacy API, F-curves live in the channelbag of the
+    # datablock's action slot
+    for layer in action.layers:
+        for strip in layer.strips:
+            channelbag = strip.channelbag(animation_data.action_slot)
+            if channelbag is not None:
+                return channelbag.fcurves.find(data_path, index=index)
+    return None
+
+
+# Values of the keyframe interpolation enum, for use with foreach_set
+INTERPOLATION_MODES = {"CONSTANT": 0, "LINEAR": 1, "BEZIER": 2}
+
+
+# Append keyframes to an F-curve in a few bulk calls instead of one
+# keyframe_insert per frame
+def add_keyframes(fcurve, frames: array, values: array, interpolation: str = None):
+    points = fcurve.keyframe_points
+    existing = len(points)
+    co = array("f", bytes(4 * 2 * (existing + len(frames))))
+    if existing:
+        old = array("f", bytes(4 * 2 * existing))
+        points.foreach_get("co", old)
+        co[: len(old)] = old
+    co[2 * existing :: 2] = frames
+    co[2 * existing + 1 :: 2] = values
+
+    points.add(len(frames))
+    points.foreach_set("co", co)
+    if interpolation is not None:
+        modes = array("i", [INTERPOLATION_MODES[interpolation]]) * len(points)
+        points.foreach_set("interpolation", modes)
+    fcurve.update()
+
+
+# Frames and values of every keyframe on an F-curve
+def read_keyframes(fcurve) -> tuple[array, array]:
+    points = fcurve.keyframe_points
+    co = array("f", bytes(4 * 2 * len(points)))
+    points.foreach_get("co", co)
+    return co[0::2], co[1::2]
+
+
+# Delete the keyframes of an F-curve that come after a frame, keeping the
+# interpolation of the rest
+def truncate_keyframes(fcurve, frame: float):
+    frames, values = read_keyframes(fcurve)
+    kept = bisect.bisect_right(frames, frame)
+    if kept == len(frames):
+        return
+
+    points = fcurve.keyframe_points
+    modes = array("i", bytes(4 * len(points)))
+    points.foreach_get("interpolation", modes)
+    co = array("f", bytes(4 * 2 * kept))
+    co[0::2] = frames[:kept]
+    co[1::2] = values[:kept]
+
+    points.clear()
+    points.add(kept)
+    points.foreach_set("co", co)
+    points.foreach_set("interpolation", modes[:kept])
+    fcurve.update()
+
+
+# Replace the keyframes of several F-curves of one property, which must all
+# be keyed on the same frames, with the keys simplify(frames, components)
+# keeps, interpolated linearly. simplify returns the indices to keep and the
+# components to take their values from. With a start frame, the keys before
+# the last one ahead of it are left alone, and simplification starts from
+# that key and keeps the last one
+def simplify_fcurves(fcurves: list, simplify, start: float = None):
+    tracks = [read_keyframes(fcurve) for fcurve in fcurves]
+    frames = tracks[0][0]
+    if any(track_frames != frames for track_frames, _ in tracks):
+        return
+    first = 0 if start is None else max(bisect.bisect_left(frames, start) - 1, 0)
+    kept, components = simplify(
+        frames[first:], [values[first:] for _, values in tracks]
+    )
+
+    # Keys added later follow on from the last key, so it stays even where
+    # the track held still
+    last = len(frames) - first - 1
+    if start is not None and kept == [0] and last > 0:
+        kept = [0, last]
+
+    kept_frames = frames[:first] + array("f", (frames[first + index] for index in kept))
+    modes = array("i", bytes(4 * len(frames)))
+    fcurves[0].keyframe_points.foreach_get("interpolation", modes)
+    modes = modes[:first] + array("i", [INTERPOLATION_MODES["LINEAR"]]) * len(kept)
+    for fcurve, (_, values), simplified in zip(fcurves, tracks, components):
+        kept_values = values[:first] + array("f", (simplified[index] for index in kept))
+        fcurve.keyframe_points.clear()
+        add_keyframes(fcurve, kept_frames, kept_values)
+        fcurve.keyframe_points.foreach_set("interpolation", modes)
+        fcurve.update()
+
+
+# Post-bake decimation of the location and rotation keys of objects. Keys
+# that linear interpolation reproduces within location_tolerance units and
+# rotation_tolerance radians are dropped, and stretches where an object
+# holds still collapse to single keys. Either tolerance may be None to
+# leave that property alone. With a start frame only the keys from the
+# last one before it on are decimated, e.g. the ones a chunk of a bake
+# added
+def decimate_transforms(
+    objects,
+    location_tolerance: float = None,
+    rotation_tolerance: float = None,
+    start: float = None,
+):
+    for obj in objects:
+        for data_path, size, tolerance, simplify in (
+            ("location", 3, location_tolerance, simplify_locations),
+            ("rotation_quaternion", 4, rotation_tolerance, simplify_rotations),
+        ):
+            if tolerance is None:
+                continue
+            fcurves = [find_fcurve(obj, data_path, index) for index in range(size)]
+            if any(fcurve is None or not fcurve.keyframe_points for fcurve in fcurves):
+                continue
+            simplify_fcurves(
+                fcurves,
+                lambda frames, components: simplify(frames, components, tolerance),
+                start,
+            )
+
+
+# Keyframes recorded in memory during a bake and written to F-curves at the
+# end, so writing the animation costs a few bulk calls per channel
+class KeyframeRecorder:
+    def __init__(self):
+        # (datablock, data path) -> [frames, values of each component,
+        # F-curve group, interpolation]
+        self.channels: dict[tuple, list] = {}
+
+    def record(
+        self,
+        id_data,
+        data_path: str,
+        frame: float,
+        values: Iterable[float],
+        group: str = None,
+        interpolation: str = None,
+    ):
+        values = tuple(values)
+        channel = self.channels.get((id_data, data_path))
+        if channel is None:
+            channel = [array("f"), [array("f") for _ in values], group, interpolation]
+            self.channels[(id_data, data_path)] = channel
+
+        channel[0].append(frame)
+        for component, value in zip(channel[1], values):
+            component.append(value)
+
+    # Record the location of an object
+    def record_location(self, obj, frame: float, location: Iterable[float]):
+        self.record(obj, "location", frame, location, "Object Transforms")
+
+    # Record the quaternion rotation of an object
+    def record_rotation(self, obj, frame: float, rotation: Iterable[float]):
+        self.record(obj, "rotation_quaternion", frame, rotation, "Object Transforms")
+
+    # Write every recorded channel to its F-curves and forget it
+    def write(self):
+        for (id_data, data_path), channel in self.channels.items():
+            frames, components, group, interpolation = channel
+            for index, values in enumerate(components):
+                fcurve = ensure_fcurve(id_data, data_path, index, group)
+                add_keyframes(fcurve, frames, values, interpolation)
+        self.channels.clear()
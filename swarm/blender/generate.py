@@ -0,0 +1,180 @@
+import bpy
+
+from .scene import BLUE, POD_COLOR_PROPERTY, pod_color_socket
+
+# Name of the Attribute node that feeds a shared pod material its color
+POD_COLOR_NODE = "Pod Color"
+
+
+# Make a pod's material take its color from the pod's color property through
+# an Attribute node, so one material serves every copy of the pod and only
+# the property is keyed. With shared False, the node and property are
+# removed again and copies of the pod each get a material of their own
+def share_pod_material(pod, shared: bool = True):
+    node_tree = pod.active_material.node_tree
+    attribute = node_tree.nodes.get(POD_COLOR_NODE)
+    if not shared:
+        if attribute is not None:
+            node_tree.nodes.remove(attribute)
+        if POD_COLOR_PROPERTY in pod:
+            del pod[POD_COLOR_PROPERTY]
+        return
+
+    if attribute is None:
+        attribute = node_tree.nodes.new("ShaderNodeAttribute")
+        attribute.name = POD_COLOR_NODE
+    attribute.attribute_type = "OBJECT"
+    attribute.attribute_name = POD_COLOR_PROPERTY
+    node_tree.links.new(attribute.outputs["Color"], pod_color_socket(pod))
+
+    pod[POD_COLOR_PROPERTY] = BLUE
+    pod.id_properties_ui(POD_COLOR_PROPERTY).update(subtype="COLOR", min=0, max=1)
+
+
+# Give a pod its own copy of its material, so that its color can be keyed
+# without changing any other pod. The copy is linked to the object rather
+# than the mesh, which the pod shares with the pod it was copied from
+def give_own_material(pod, name: str):
+    slot = pod.material_slots[0]
+    material = slot.material.copy()
+    material.name = name
+    slot.link = "OBJECT"
+    slot.material = material
+
+    socket = pod_color_socket(pod)
+    if socket is not None:
+        socket.default_value = BLUE
+
+
+# Copy an object and all of its descendants at the data level. Copies share
+# mesh data with the originals and children are parented to the copy of
+# their parent. Pods get a material of their own unless they share one. The
+# root copy comes first
+def copy_hierarchy(obj, id: int) -> list:
+    hierarchy = [obj, *obj.children_recursive]
+    copies = {original: original.copy() for original in hierarchy}
+    for original, copy in copies.items():
+        if original.parent in copies:
+            copy.parent = copies[original.parent]
+        if copy.name.startswith("Pod") and POD_COLOR_PROPERTY not in copy:
+            give_own_material(copy, f"Pod.{str(id).rjust(3, '0')}")
+    return list(copies.values())
+
+
+# Place a copy of an object's hierarchy at each location without going
+# through operators, which redraw and walk the whole scene on every call.
+# The copies are linked into the collection once they have all been made
+def copy_objects(obj, collection, locations) -> list:
+    roots = []
+    created = []
+    for id, location in enumerate(locations, 1):
+        copies = copy_hierarchy(obj, id)
+        copies[0].location = location
+        roots.append(copies[0])
+        created.extend(copies)
+
+    for copy in created:
+        collection.objects.link(copy)
+
+    return roots
+
+
+# Duplicate an object and all of its children with the duplicate operator,
+# giving each pod a new material of its own unless pods share one
+def duplicate_hierarchy(obj, collection, id: int):
+    bpy.ops.object.select_all(action="DESELECT")
+
+    obj.select_set(True)
+    for child in obj.children_recursive:
+        child.select_set(True)
+
+    bpy.ops.object.duplicate_move(
+        OBJECT_OT_duplicate={"linked": False, "mode": "TRANSLATION"}
+    )
+
+    # Set the correct parent on duplicate objects
+    duplicated_objects = [o for o in bpy.context.selected_objects if o.select_get()]
+    new_parent = None
+    for new_obj in duplicated_objects:
+        if new_obj.parent is None:
+            new_parent = new_obj
+
+        # If it's a pod, create the pod's individual material. This allows
+        # the pod's color to be updated in isolation from other pods
+        elif new_obj.name.startswith("Pod") and POD_COLOR_PROPERTY not in new_obj:
+            new_mat = bpy.data.materials.new(name=f"Pod.{str(id).rjust(3, '0')}")
+            new_mat.use_nodes = True
+            bsdf_node = new_mat.node_tree.nodes.new("ShaderNodeBsdfPrincipled")
+            output_node = new_mat.node_tree.nodes.new("ShaderNodeOutputMaterial")
+            new_mat.node_tree.links.new(
+                bsdf_node.outputs["BSDF"], output_node.inputs["Surface"]
+            )
+            new_obj.data.materials[0] = new_mat
+            bsdf_node.inputs["Base Color"].default_value = (0.0, 0.0, 1.0, 1.0)
+
+        if new_obj.name not in collection.objects:
+            collection.objects.link(new_obj)
+
+    bpy.ops.object.select_all(action="DESELECT")
+
+    return new_parent
+
+
+# Actions animating a datablock, including those of a material's node tree
+def actions_of(id_data) -> list:
+    actions = []
+    for owner in (id_data, getattr(id_data, "node_tree", None)):
+        animation_data = getattr(owner, "animation_data", None)
+        if animation_data is not None and animation_data.action is not None:
+            actions.append(animation_data.action)
+    return actions
+
+
+# Mesh, materials and actions an object uses
+def data_of(obj) -> list:
+    data = [obj.data, *actions_of(obj)]
+    for slot in obj.material_slots:
+        if slot.material is not None:
+            data.append(slot.material)
+            data.extend(actions_of(slot.material))
+    return [item for item in data if item is not None]
+
+
+# Remove every copy of the template objects, i.e. objects named like a
+# template but not the template itself, along with their children and any
+# mesh, material or action that nothing else uses. Animation is cleared
+# from the templates and their materials. Everything goes in a single
+# batch_remove call
+def clear_generated(template_names: list[str]):
+    generated = set()
+    for obj in bpy.data.objects:
+        base_name = obj.name.split(".")[0]
+        if obj.name not in template_names and any(
+            base_name.startswith(name) for name in template_names
+        ):
+            generated.add(obj)
+            generated.update(obj.children_recursive)
+
+    candidates = set(generated)
+    for obj in generated:
+        candidates.update(data_of(obj))
+
+    for name in template_names:
+        template = bpy.data.objects.get(name)
+        if template is None:
+            continue
+        for obj in (template, *template.children_recursive):
+            for owner in (obj, *(slot.material for slot in obj.material_slots)):
+                if owner is None:
+                    continue
+                candidates.update(actions_of(owner))
+                owner.animation_data_clear()
+                if getattr(owner, "node_tree", None) is not None:
+                    owner.node_tree.animation_data_clear()
+
+    used = set()
+    for obj in bpy.data.objects:
+        if obj not in generated:
+            used.update(data_of(obj))
+
+    bpy.data.batch_remove(candidates - used)
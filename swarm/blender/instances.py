@@ -0,0 +1,139 @@
+import bpy
+import numpy as np
+
+from ..store import TrajectoryStore
+from .bake import bake_to_store
+from .replay import apply_trajectories
+
+# Object holding an instanced swarm, the custom property on it naming the
+# trajectory store it plays back and the point attribute holding each
+# bee's rotation
+SWARM_OBJECT_NAME = "Swarm"
+TRAJECTORY_PROPERTY = "trajectory_path"
+ROTATION_ATTRIBUTE = "rotation"
+
+# Trajectory stores of the swarms being played back, by object name
+stores: dict[str, TrajectoryStore] = {}
+
+
+# Geometry nodes that place an instance of the bee model on every point,
+# turned by the point's rotation attribute
+def swarm_node_group(bee):
+    group = bpy.data.node_groups.new("Swarm Instances", "GeometryNodeTree")
+    for in_out in ("INPUT", "OUTPUT"):
+        group.interface.new_socket(
+            "Geometry", in_out=in_out, socket_type="NodeSocketGeometry"
+        )
+
+    nodes = group.nodes
+    group_input = nodes.new("NodeGroupInput")
+    group_output = nodes.new("NodeGroupOutput")
+    bee_info = nodes.new("GeometryNodeObjectInfo")
+    bee_info.inputs["Object"].default_value = bee
+    bee_info.inputs["As Instance"].default_value = True
+    rotation = nodes.new("GeometryNodeInputNamedAttribute")
+    rotation.data_type = "QUATERNION"
+    rotation.inputs["Name"].default_value = ROTATION_ATTRIBUTE
+    instance = nodes.new("GeometryNodeInstanceOnPoints")
+
+    links = group.links
+    links.new(group_input.outputs["Geometry"], instance.inputs["Points"])
+    links.new(bee_info.outputs["Geometry"], instance.inputs["Instance"])
+    links.new(rotation.outputs["Attribute"], instance.inputs["Rotation"])
+    links.new(instance.outputs["Instances"], group_output.inputs["Geometry"])
+    return group
+
+
+# Create an object with one vertex per bee, each showing an instance of the
+# bee model
+def create_swarm_object(bee_count: int, bee, name: str = SWARM_OBJECT_NAME):
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(bee_count)
+    mesh.attributes.new(ROTATION_ATTRIBUTE, "QUATERNION", "POINT")
+
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.collection.objects.link(obj)
+    modifier = obj.modifiers.new("Swarm Instances", "NODES")
+    modifier.node_group = swarm_node_group(bee)
+    return obj
+
+
+# Move the points of a swarm object to the bees of a frame. Frames before
+# the first stored frame show the first one, and frames after the last
+# stored frame show the last one
+def show_frame(obj, store: TrajectoryStore, frame: int):
+    if store.frame_count == 0:
+        return
+    row = max(int(np.searchsorted(store.frames, frame, side="right")) - 1, 0)
+    mesh = obj.data
+    mesh.vertices.foreach_set("co", np.ravel(store.positions[row]))
+    mesh.attributes[ROTATION_ATTRIBUTE].data.foreach_set(
+        "value", np.ravel(store.rotations[row])
+    )
+    mesh.update()
+
+
+# Show the current frame on every swarm being played back
+@bpy.app.handlers.persistent
+def update_swarms(scene, depsgraph=None):
+    for name, store in stores.items():
+        obj = bpy.data.objects.get(name)
+        if obj is not None:
+            show_frame(obj, store, scene.frame_current)
+
+
+# The swarm objects are freed when another file is opened, so their stores
+# are let go of before that happens
+@bpy.app.handlers.persistent
+def forget_swarms(*args):
+    stores.clear()
+
+
+# Play back a trajectory store on a swarm object, creating the object with
+# instances of the Bee model if the scene doesn't have one for this many
+# bees. The store is memory-mapped and read one frame at a time from a
+# frame change handler, so the swarm costs one object however many bees
+# it has
+def attach_swarm(path: str, name: str = SWARM_OBJECT_NAME):
+    store = TrajectoryStore(path)
+    obj = bpy.data.objects.get(name)
+    if obj is not None and len(obj.data.vertices) != store.bee_count:
+        bpy.data.batch_remove([obj, obj.data])
+        obj = None
+    if obj is None:
+        obj = create_swarm_object(store.bee_count, bpy.data.objects.get("Bee"), name)
+
+    obj[TRAJECTORY_PROPERTY] = path
+    stores[obj.name] = store
+
+    # Replace the handler of an earlier run of the script, if any
+    handlers = bpy.app.handlers.frame_change_pre
+    for handler in list(handlers):
+        if getattr(handler, "__name__", None) == update_swarms.__name__:
+            handlers.remove(handler)
+    handlers.append(update_swarms)
+    if forget_swarms.__name__ not in [
+        getattr(handler, "__name__", None) for handler in bpy.app.handlers.load_pre
+    ]:
+        bpy.app.handlers.load_pre.append(forget_swarms)
+
+    show_frame(obj, store, bpy.context.scene.frame_current)
+    return obj
+
+
+# Simulate bee_count bees from the hive and play them back as instances on
+# a single object. Their trajectories are written to a store at path, and
+# only the pod colors are keyframed
+def bake_instanced(
+    path: str,
+    bee_count: int,
+    seed: int = None,
+    engine: str = "numpy",
+    telemetry_path: str = None,
+):
+    # Let go of the store being played back before it is overwritten
+    stores.pop(SWARM_OBJECT_NAME, None)
+    simulation = bake_to_store(path, seed, engine, telemetry_path, bee_count)
+    apply_trajectories(path, bees=False)
+    attach_swarm(path)
+    return simulation
@@ -0,0 +1,131 @@
+from typing import Optional
+
+import bpy
+
+from .background import BackgroundBake
+from .scene import clear_all_animation_data
+
+# Background bake in progress, if any. Only one runs at a time
+running: Optional[BackgroundBake] = None
+
+
+# Operator that bakes the swarm in a background process, showing progress
+# in the status bar. Escape or the cancel operator stops it, keeping the
+# frames baked so far
+class SWARM_OT_bake_in_background(bpy.types.Operator):
+    bl_idname = "swarm.bake_in_background"
+    bl_label = "Bake Swarm in Background"
+    bl_description = (
+        "Simulate the bee swarm in a background process and keyframe it as "
+        "frames arrive, keeping Blender responsive"
+    )
+
+    seed: bpy.props.IntProperty(
+        name="Seed",
+        description="Simulation seed, or -1 for a different swarm every time",
+        default=-1,
+        min=-1,
+    )
+    engine: bpy.props.EnumProperty(
+        name="Engine",
+        items=[
+            ("python", "Python", "Step one bee at a time"),
+            ("numpy", "NumPy", "Step the whole swarm at once"),
+        ],
+        default="python",
+    )
+    chunk_size: bpy.props.IntProperty(
+        name="Chunk Size",
+        description="Number of frames simulated before they are keyframed",
+        default=50,
+        min=1,
+    )
+
+    def invoke(self, context, event):
+        global running
+        if running is not None and not running.finished:
+            self.report({"WARNING"}, "A swarm bake is already running")
+            return {"CANCELLED"}
+
+        clear_all_animation_data()
+        running = BackgroundBake(
+            None if self.seed < 0 else self.seed, self.engine, self.chunk_size
+        )
+        window_manager = context.window_manager
+        window_manager.progress_begin(0, 100)
+        self.timer = window_manager.event_timer_add(0.25, window=context.window)
+        window_manager.modal_handler_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        return self.invoke(context, None)
+
+    def modal(self, context, event):
+        if event.type == "ESC":
+            running.cancel()
+
+        if running.finished:
+            self.end(context)
+            if running.cancelled:
+                self.report({"WARNING"}, "Swarm bake cancelled")
+                return {"CANCELLED"}
+            if running.error is not None:
+                self.report({"ERROR"}, running.error)
+                return {"CANCELLED"}
+            self.report({"INFO"}, "Swarm bake finished")
+            return {"FINISHED"}
+
+        if event.type == "TIMER":
+            context.window_manager.progress_update(int(100 * running.progress))
+            context.workspace.status_text_set(
+                f"Baking swarm: {running.frames_applied} of "
+                f"{running.frame_count or '?'} frames. Esc to cancel"
+            )
+        return {"PASS_THROUGH"}
+
+    def end(self, context):
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self.timer)
+        window_manager.progress_end()
+        context.workspace.status_text_set(None)
+
+
+# Operator that cancels the background bake, keeping the frames baked so far
+class SWARM_OT_cancel_background_bake(bpy.types.Operator):
+    bl_idname = "swarm.cancel_background_bake"
+    bl_label = "Cancel Swarm Bake"
+    bl_description = "Stop the background swarm bake, keeping the baked frames"
+
+    @classmethod
+    def poll(cls, context):
+        return running is not None and not running.finished
+
+    def execute(self, context):
+        running.cancel()
+        return {"FINISHED"}
+
+
+classes = [SWARM_OT_bake_in_background, SWARM_OT_cancel_background_bake]
+
+
+def draw_menu(self, context):
+    self.layout.separator()
+    self.layout.operator(SWARM_OT_bake_in_background.bl_idname)
+    self.layout.operator(SWARM_OT_cancel_background_bake.bl_idname)
+
+
+# Register the operators and add them to the Object > Animation menu. Safe
+# to call again when the script is run twice
+def register():
+    for cls in classes:
+        if not cls.is_registered:
+            bpy.utils.register_class(cls)
+    bpy.types.VIEW3D_MT_object_animation.remove(draw_menu)
+    bpy.types.VIEW3D_MT_object_animation.append(draw_menu)
+
+
+def unregister():
+    bpy.types.VIEW3D_MT_object_animation.remove(draw_menu)
+    for cls in reversed(classes):
+        if cls.is_registered:
+            bpy.utils.unregister_class(cls)
@@ -0,0 +1,138 @@
+import pickle
+import random
+from typing import Optional
+
+import bpy
+
+from .. import config
+from ..checkpoint import restore_simulation, simulation_state
+from .bake import prepare
+from .scene import BLUE, POD_COLOR_PROPERTY, YELLOW, SwarmScene, pod_color_socket
+
+# Frames simulated between the snapshots a preview keeps for scrubbing back
+SNAPSHOT_INTERVAL = 50
+
+# Rotation shown for bees that haven't turned yet
+IDENTITY = (1.0, 0.0, 0.0, 0.0)
+
+# Preview being shown, if any
+running: Optional["LivePreview"] = None
+
+
+# Show a pod as pollinated or not, without keyframing its color
+def show_pod_color(pod, is_pollinated: bool):
+    color = YELLOW if is_pollinated else BLUE
+    if POD_COLOR_PROPERTY in pod:
+        pod[POD_COLOR_PROPERTY] = color
+        return
+    socket = pod_color_socket(pod)
+    if socket is not None:
+        socket.default_value = color
+
+
+# Simulation that follows playback instead of being baked. Each frame change
+# steps the swarm to the new frame and sets the bee transforms and pod
+# colors directly, without keyframes. The simulation state is snapshotted
+# every snapshot_interval frames, and going back in time restores the last
+# snapshot before the frame and simulates forward from there. Constants
+# changed in swarm.config apply from the next simulated frame
+class LivePreview:
+    def __init__(
+        self,
+        seed: int = None,
+        engine: str = "python",
+        snapshot_interval: int = SNAPSHOT_INTERVAL,
+    ):
+        self.scene = SwarmScene()
+        self.simulation = prepare(self.scene, random.Random(seed), engine)
+        self.snapshot_interval = snapshot_interval
+        self.snapshots = {0: self.snapshot()}
+        self.shown_pollinated: list[Optional[bool]] = [None] * len(self.scene.pods)
+
+    def snapshot(self) -> bytes:
+        return pickle.dumps(simulation_state(self.simulation), pickle.HIGHEST_PROTOCOL)
+
+    # Go back to the last snapshot at or before a frame. Later snapshots
+    # are dropped, since simulating forward again takes them anew
+    def rewind(self, frame: int):
+        latest = max(taken for taken in self.snapshots if taken <= frame)
+        self.simulation = restore_simulation(
+            type(self.simulation), pickle.loads(self.snapshots[latest])
+        )
+        for taken in [taken for taken in self.snapshots if taken > latest]:
+            del self.snapshots[taken]
+
+    # Step the simulation to a frame, snapshotting it along the way. Frames
+    # past the end of the simulation show its last frame
+    def advance(self, frame: int):
+        if frame < self.simulation.frame:
+            self.rewind(frame)
+
+        start = self.simulation.frame + config.FRAME_STEP
+        if self.simulation.frame == 0:
+            start = 1
+        for step in range(start, min(frame + 1, config.FRAME_COUNT), config.FRAME_STEP):
+            self.simulation.step(step)
+            if step >= max(self.snapshots) + self.snapshot_interval:
+                self.snapshots[step] = self.snapshot()
+
+    # Show the state of the simulation at a frame. Frames before the start
+    # show the swarm before its first step
+    def show(self, frame: int):
+        self.advance(max(frame, 0))
+
+        for obj, location, rotation in zip(
+            self.scene.bees,
+            self.simulation.bee_locations(),
+            self.simulation.bee_rotations(),
+        ):
+            obj.location = tuple(location)
+            obj.rotation_quaternion = IDENTITY if rotation is None else tuple(rotation)
+
+        for flower_id, is_pollinated in enumerate(self.simulation.pollinated_flowers()):
+            if self.shown_pollinated[flower_id] != is_pollinated:
+                show_pod_color(self.scene.pods[flower_id], is_pollinated)
+                self.shown_pollinated[flower_id] = is_pollinated
+
+
+def update_preview(scene, depsgraph=None):
+    if running is not None:
+        running.show(scene.frame_current)
+
+
+# The preview's objects are freed when another file is opened, so it stops
+# before that happens
+@bpy.app.handlers.persistent
+def stop_preview_on_load(*args):
+    stop_preview()
+
+
+# Start a live preview of the swarm, replacing any running one. The bees
+# and pods must not be keyframed, or their animation overrides the preview
+def start_preview(
+    seed: int = None,
+    engine: str = "python",
+    snapshot_interval: int = SNAPSHOT_INTERVAL,
+) -> LivePreview:
+    global running
+    stop_preview()
+    running = LivePreview(seed, engine, snapshot_interval)
+    bpy.app.handlers.frame_change_pre.append(update_preview)
+    if stop_preview_on_load.__name__ not in [
+        getattr(handler, "__name__", None) for handler in bpy.app.handlers.load_pre
+    ]:
+        bpy.app.handlers.load_pre.append(stop_preview_on_load)
+    running.show(bpy.context.scene.frame_current)
+    return running
+
+
+# Stop the live preview. The scene keeps showing its last frame
+def stop_preview():
+    global running
+    running = None
+
+    # Also remove the handler of an earlier run of the script, if any
+    handlers = bpy.app.handlers.frame_change_pre
+    for handler in list(handlers):
+        if getattr(handler, "__name__", None) == update_preview.__name__:
+            handlers.remove(handler)
@@ -0,0 +1,124 @@
+from array import array
+
+import numpy as np
+
+from ..store import MOVED, TURNED, TrajectoryStore
+from .fcurves import add_keyframes, ensure_fcurve
+from .scene import BLUE, YELLOW, SwarmScene, pod_color_target
+
+
+# Convert an array of numbers to the float array F-curves are written from
+def as_floats(values: np.ndarray) -> array:
+    return array("f", np.ascontiguousarray(values, dtype=np.float32).tobytes())
+
+
+# Scene objects in store order. Names recorded in the store are used when
+# the scene has all of them, otherwise objects are matched by id
+def match_objects(objects: list, ids: np.ndarray, names: list[str] = None) -> list:
+    if names:
+        by_name = {obj.name: obj for obj in objects}
+        if all(name in by_name for name in names):
+            return [by_name[name] for name in names]
+
+    if len(objects) <= ids.max(initial=-1):
+        raise ValueError(
+            f"The trajectory store needs {ids.max() + 1} objects but the scene"
+            f" only has {len(objects)}"
+        )
+    return [objects[id] for id in ids]
+
+
+# Key the color of every pod whose flower is marked changed on a frame, with
+# one row of frames, pollinated and changed per frame
+def key_pod_colors(
+    color_targets: list,
+    frames: np.ndarray,
+    pollinated: np.ndarray,
+    changed: np.ndarray,
+):
+    for flower, target in enumerate(color_targets):
+        keyed = changed[:, flower]
+        if target is None or not keyed.any():
+            continue
+        colors = np.where(pollinated[keyed, flower, None], YELLOW, BLUE)
+        keyed_frames = as_floats(frames[keyed])
+        id_data, data_path = target
+        for index in range(4):
+            fcurve = ensure_fcurve(id_data, data_path, index)
+            add_keyframes(fcurve, keyed_frames, as_floats(colors[:, index]), "CONSTANT")
+
+
+# Keyframe the frames of a trajectory store in [start, stop) onto the scene.
+# The store is memory-mapped and applied chunk_size frames at a time, so only
+# one chunk is ever read into memory. Locations and rotations are keyed on
+# the frames where the bake would have keyed them, and pod colors at the
+# first frame and wherever pollination changes. Like a bake, a replay from
+# the start of the store keys the colors of the unpollinated flowers at
+# frame 1. With bees False only the pods are keyed, e.g. when the bees are
+# played back as instances
+def apply_trajectories(
+    path: str,
+    start: int = None,
+    stop: int = None,
+    chunk_size: int = None,
+    bees: bool = True,
+):
+    store = TrajectoryStore(path)
+    scene = SwarmScene()
+    bee_objects = []
+    if bees:
+        bee_objects = match_objects(
+            scene.bees, store.bee_ids, store.metadata.get("bee_names")
+        )
+    flowers = match_objects(
+        scene.flowers, store.flower_ids, store.metadata.get("flower_names")
+    )
+    pods = {flower.name: pod for flower, pod in zip(scene.flowers, scene.pods)}
+    color_targets = [pod_color_target(pods[flower.name]) for flower in flowers]
+
+    for obj in bee_objects:
+        obj.rotation_mode = "QUATERNION"
+
+    rows = store.rows(start, stop)
+    chunk_size = chunk_size or max(rows.stop - rows.start, 1)
+    previous_pollinated = None
+    if rows.start == 0 and (len(store.frames) == 0 or store.frames[0] > 1):
+        previous_pollinated = np.zeros((1, len(flowers)), dtype=bool)
+        key_pod_colors(
+            color_targets,
+            np.ones(1),
+            previous_pollinated,
+            np.ones_like(previous_pollinated),
+        )
+    for first in range(rows.start, rows.stop, chunk_size):
+        chunk = slice(first, min(first + chunk_size, rows.stop))
+        frames = store.frames[chunk]
+        flags = np.asarray(store.flags[chunk]) if bee_objects else None
+
+        # Bee locations and rotations
+        for bee, obj in enumerate(bee_objects):
+            for bit, data_path, values in (
+                (MOVED, "location", store.positions),
+                (TURNED, "rotation_quaternion", store.rotations),
+            ):
+                keyed = (flags[:, bee] & bit) != 0
+                if not keyed.any():
+                    continue
+                keyed_frames = as_floats(frames[keyed])
+                channel = np.asarray(values[chunk, bee])[keyed]
+                for index in range(channel.shape[1]):
+                    fcurve = ensure_fcurve(obj, data_path, index, "Object Transforms")
+                    add_keyframes(fcurve, keyed_frames, as_floats(channel[:, index]))
+
+        # Pod colors, keyed at the first frame and at every change after it
+        pollinated = np.asarray(store.pollinated[chunk], dtype=bool)
+        if previous_pollinated is None:
+            changed = np.ones_like(pollinated)
+            changed[1:] = pollinated[1:] != pollinated[:-1]
+        else:
+            changed = pollinated != np.vstack((previous_pollinated, pollinated[:-1]))
+        previous_pollinated = pollinated[-1:]
+
+        key_pod_colors(color_targets, frames, pollinated, changed)
+
+    return store
@@ -0,0 +1,83 @@
+import bpy
+
+# Colors of an unpollinated and a pollinated pod
+BLUE = (0.0, 0.0, 1.0, 1.0)
+YELLOW = (1.0, 1.0, 0.0, 1.0)
+
+# Custom property holding a pod's color when all pods share one material,
+# which reads it through an Attribute node
+POD_COLOR_PROPERTY = "pod_color"
+
+
+# Find the first child with the given prefix
+def find_child(obj, prefix: str):
+    for child in obj.children_recursive:
+        if child.name.startswith(prefix):
+            return child
+    return None
+
+
+# Base Color input of the Principled BSDF in a pod's material, or None if
+# the pod's material has no node tree
+def pod_color_socket(pod):
+    material = pod.active_material
+    if material and material.use_nodes:
+        bsdf_node = material.node_tree.nodes.get("Principled BSDF")
+        return bsdf_node.inputs["Base Color"]
+    return None
+
+
+# Datablock and data path that a pod's color is keyed on. That is the pod's
+# color property when it has one, so pods sharing a material can still be
+# colored separately, and otherwise the Base Color of its own material.
+# None if the pod has neither
+def pod_color_target(pod):
+    if POD_COLOR_PROPERTY in pod:
+        return pod, f'["{POD_COLOR_PROPERTY}"]'
+    socket = pod_color_socket(pod)
+    if socket is not None:
+        return socket.id_data, socket.path_from_id("default_value")
+    return None
+
+
+# Blender objects the simulation reads from and writes to. Bees and flowers
+# keep the order of bpy.data.objects, so their indices are the simulation ids
+class SwarmScene:
+    def __init__(self):
+        self.hive = bpy.data.objects.get("Hive")
+        self.bees = [obj for obj in bpy.data.objects if obj.name.startswith("Bee")]
+        self.flowers = [
+            obj for obj in bpy.data.objects if obj.name.startswith("Flower")
+        ]
+        self.pods = [find_child(flower, "Pod") for flower in self.flowers]
+
+    # World positions of every pod. The view layer is updated first so that
+    # the matrices reflect any transforms set since the last evaluation
+    def pod_positions(self) -> list[tuple[float, float, float]]:
+        bpy.context.view_layer.update()
+        return [tuple(pod.matrix_world.translation) for pod in self.pods]
+
+
+# Clear all animation data from all objects
+def clear_all_animation_data():
+    # Clear animation data from all objects
+    for obj in bpy.data.objects:
+        obj.animation_data_clear()
+
+    # Clear animation data from all materials and their node trees, which
+    # hold the pod color keyframes
+    for mat in bpy.data.materials:
+        if mat.animation_data:
+            mat.animation_data_clear()
+        if mat.node_tree and mat.node_tree.animation_data:
+            mat.node_tree.animation_data_clear()
+
+    # Clear animation data from worlds
+    for world in bpy.data.worlds:
+        if world.animation_data:
+            world.animation_data_clear()
+
+    # Clear animation data from scenes
+    for scene in bpy.data.scenes:
+        if scene.animation_data:
+            scene.animation_data_clear()
@@ -0,0 +1,106 @@
+import glob
+import hashlib
+import json
+import os
+from typing import Callable, Optional
+
+from . import config
+
+# File name extension of a cached bake
+CACHE_EXTENSION = ".trajectories"
+
+# Disk space a cache directory may use by default, in bytes
+DEFAULT_CACHE_SIZE = 2 * 1024**3
+
+
+# Hash of the source of the simulation modules, so a change to how the swarm
+# is simulated never reuses a bake made before it
+def source_digest() -> str:
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(directory, "*.py"))):
+        with open(path, "rb") as file:
+            digest.update(os.path.basename(path).encode())
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+# Key of a bake: a hash of everything its result depends on, which is the
+# swarm constants, the engine, the seed and the initial scene. Only seeded
+# bakes have a key, since an unseeded one differs on every run
+def cache_key(
+    seed: Optional[int],
+    engine: str,
+    hive_location,
+    pod_positions: list,
+    bee_names: list[str],
+    flower_names: list[str],
+) -> Optional[str]:
+    if seed is None:
+        return None
+
+    inputs = {
+        "constants": config.snapshot(),
+        "engine": engine,
+        "seed": seed,
+        "hive_location": [float(value) for value in hive_location],
+        "pod_positions": [[float(value) for value in pod] for pod in pod_positions],
+        "bee_names": list(bee_names),
+        "flower_names": list(flower_names),
+        "source": source_digest(),
+    }
+    encoded = json.dumps(inputs, sort_keys=True, default=list).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# Directory of cached bakes, one trajectory store per key. Reading a bake
+# marks it as recently used, and after every new bake the least recently
+# used ones are deleted until the directory fits in max_size bytes
+class BakeCache:
+    def __init__(self, directory: str, max_size: int = DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_EXTENSION)
+
+    # Path of the cached bake with a key, or None if there is none
+    def get(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    # Cache a bake by calling write with the path to write it to. The bake
+    # is only moved into place once write returns, so a failed or
+    # interrupted bake never ends up in the cache
+    def put(self, key: str, write: Callable[[str], None]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        partial = path + ".tmp"
+        try:
+            write(partial)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        self.evict(keep=path)
+        return path
+
+    # Delete the least recently used bakes until the cache fits in its size,
+    # except for the bake at keep
+    def evict(self, keep: str = None):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*" + CACHE_EXTENSION)):
+            status = os.stat(path)
+            entries.append((status.st_mtime, status.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path != keep:
+                os.remove(path)
+                total -= size
@@ -0,0 +1,105 @@
+import os
+import pickle
+
+from . import config
+
+# File name of the checkpoint taken after a frame
+CHECKPOINT_NAME = "frame-{:06d}.pickle"
+
+# Constants that only move the end of the animation. Checkpoints taken
+# before the bees start returning to the hive stay valid when they change
+FRAME_COUNT_CONSTANTS = {"MINIMUM_FRAME_COUNT", "FRAME_COUNT"}
+
+
+# Frame in which the bees start returning to the hive for a frame count
+def return_frame(frame_count: int) -> float:
+    return frame_count - config.RETURN_TO_HIVE_FRAME_REMAINDER
+
+
+# Attributes of a simulation that make up its state. Methods replaced on
+# the instance, e.g. by telemetry, are left out
+def simulation_state(simulation) -> dict:
+    return {
+        name: value for name, value in vars(simulation).items() if not callable(value)
+    }
+
+
+# Simulation of an engine class with the state simulation_state returned
+def restore_simulation(engine: type, state: dict):
+    simulation = engine.__new__(engine)
+    simulation.__dict__.update(state)
+    return simulation
+
+
+# Save the state of a simulation after it stepped to a frame, along with the
+# constants it ran with and metadata that must match for it to be resumed.
+# The RNG is part of the state, so a simulation resumed from a checkpoint
+# continues exactly as it would have
+def save_checkpoint(directory: str, frame: int, simulation, metadata: dict = None):
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = {
+        "frame": frame,
+        "engine": type(simulation),
+        "state": simulation_state(simulation),
+        "constants": config.snapshot(),
+        "metadata": metadata or {},
+    }
+
+    # Written to a temporary file first, so a crash never leaves a partial
+    # checkpoint behind
+    path = os.path.join(directory, CHECKPOINT_NAME.format(frame))
+    try:
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(checkpoint, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    finally:
+        if os.path.exists(path + ".tmp"):
+            os.remove(path + ".tmp")
+
+
+# Whether a checkpoint can be resumed under the current constants. Only the
+# frame count may differ, and only if the checkpoint was taken before the
+# bees started returning to the hive under both the old and new counts
+def resumable(checkpoint: dict) -> bool:
+    saved, current = checkpoint["constants"], config.snapshot()
+    changed = {
+        name
+        for name in saved.keys() | current.keys()
+        if saved.get(name) != current.get(name)
+    }
+    if not changed:
+        return True
+    return changed <= FRAME_COUNT_CONSTANTS and checkpoint["frame"] < min(
+        return_frame(saved["FRAME_COUNT"]), return_frame(current["FRAME_COUNT"])
+    )
+
+
+# Frame and simulation of the latest checkpoint in a directory that can be
+# resumed with the given engine class and metadata under the current
+# constants, or None
+def load_checkpoint(directory: str, engine: type, metadata: dict = None):
+    if not os.path.isdir(directory):
+        return None
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(".pickle"):
+            continue
+        with open(os.path.join(directory, name), "rb") as file:
+            checkpoint = pickle.load(file)
+        if (
+            checkpoint["engine"] is engine
+            and checkpoint["metadata"] == (metadata or {})
+            and resumable(checkpoint)
+        ):
+            return checkpoint["frame"], restore_simulation(engine, checkpoint["state"])
+    return None
+
+
+# Delete the checkpoints in a directory, or only those taken after a frame
+def clear_checkpoints(directory: str, after: int = None):
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if not name.endswith((".pickle", ".pickle.tmp")):
+            continue
+        if after is None or int(name.split("-")[1].split(".")[0]) > after:
+            os.remove(os.path.join(directory, name))
@@ -0,0 +1,138 @@
+import math
+from contextlib import contextmanager
+
+# Number of frames to pause before animating objects
+INITIAL_PAUSE_FRAMES = 50
+
+# Number of frames to animate objects for
+MINIMUM_FRAME_COUNT = 1500
+
+# Number of frames to step by
+FRAME_STEP = 1
+
+# Bee speed
+BEE_SPEED = 1
+
+# Range in which flowers can be detected by bees
+COGNITION_RANGE = 20
+
+# Range in which other bees can be detected by bees
+SOCIAL_RANGE = 15
+
+# Cognition weight
+COGNITION = 2
+
+# Social weight
+SOCIAL = 2
+
+# Inertia weight
+INERTIA = 1
+
+# Scalar that is multiplied by the personal best score of an adjacent bee
+SOCIAL_SCENT_COEFFICIENT = 1
+
+# How close a bee must be to a flower to pollinate it
+FLOWER_POLLINATION_PROXIMITY = 10
+
+# Width of flower patch that Bees have access to
+FLOWER_PATCH_WIDTH = 120
+
+# Max number of bees that can attach to the flower
+MAX_NEARBY_BEES = 5
+
+# Minimum amount of time it takes in seconds to pollinate
+# a flower
+MIN_POLLINATION_TIME = 12
+
+# Frames per second
+FRAME_RATE = 24
+
+# Max Bee turning radius
+MAX_TURNING_RADIUS = 30
+
+# Distance from the hive at which a returning bee counts as home
+HIVE_ARRIVAL_DISTANCE = 5
+
+# Lowest altitude a bee may fly at
+MIN_BEE_ALTITUDE = 5
+
+# Update every bee from the state of the swarm at the start of the frame
+# instead of one bee after another, so that the result doesn't depend on
+# the order of the bees. Bees competing for the last free spots around a
+# flower are admitted in order of their index. The numpy engine always
+# updates this way
+SYNCHRONOUS_UPDATE = False
+
+# Let bees hear each other through scents instead of checking every bee in
+# SOCIAL_RANGE. At the start of each frame every bee that knows an open
+# flower leaves a scent scored by its personal best, or its global best if
+# its personal best flower isn't open, and each bee adopts the lowest score
+# left within SOCIAL_RANGE of it, like the numpy engine does. Social updates
+# then cost in proportion to the bees leaving scents rather than to pairs
+# of bees. Off, bees read each other's current bests directly
+SCENT_BROADCAST = False
+
+
+# Compute the constants that depend on other constants
+def derive():
+    global FRAME_COUNT, POLLINATION_THRESHOLD
+    global START_SWARMING_FRAME, RETURN_TO_HIVE_FRAME_REMAINDER
+
+    # Total number of frames
+    FRAME_COUNT = MINIMUM_FRAME_COUNT + INITIAL_PAUSE_FRAMES
+
+    # Number of pollinations that must occur in order for a flower
+    # to be marked pollinated
+    POLLINATION_THRESHOLD = (FRAME_RATE * MIN_POLLINATION_TIME) * MAX_NEARBY_BEES
+
+    # Frame in which the Bees begin swarming instead of just leaving the bee hive
+    START_SWARMING_FRAME = 50 + INITIAL_PAUSE_FRAMES
+
+    # Frames remaining cutoff at which the bees will return to their nest
+    RETURN_TO_HIVE_FRAME_REMAINDER = (
+        int(math.sqrt(2) * FLOWER_PATCH_WIDTH) / BEE_SPEED + 100
+    )
+
+
+derive()
+
+
+# Current value of every constant, derived ones included. This is the whole
+# configuration of a simulation: copying it into another process, or
+# comparing it to a saved one, tells whether two runs are set up alike
+def snapshot() -> dict:
+    return {
+        name: value
+        for name, value in globals().items()
+        if name.isupper() and not callable(value)
+    }
+
+
+# Temporarily change constants, e.g. to run a shorter simulation or try
+# other PSO weights. Derived constants follow the new values unless they
+# are overridden themselves
+@contextmanager
+def overridden(**values):
+    constants = globals()
+    unknown = [name for name in values if not name.isupper() or name not in constants]
+    if unknown:
+        raise KeyError(f"Unknown swarm constants: {', '.join(unknown)}")
+
+    saved = {name: value for name, value in constants.items() if name.isupper()}
+    try:
+        constants.update(values)
+        derive()
+        constants.update(values)
+        yield
+    finally:
+        constants.update(saved)
+
+
+# Bounds of bee positioning by axis. The ceiling is the hive's altitude,
+# which is only known once the scene has been read
+def bee_position_bounds(hive_z: float) -> dict[str, list[float]]:
+    return {
+        "x": [-1 * FLOWER_PATCH_WIDTH, FLOWER_PATCH_WIDTH],
+        "y": [-1 * FLOWER_PATCH_WIDTH, FLOWER_PATCH_WIDTH],
+        "z": [MIN_BEE_ALTITUDE, hive_z],
+    }
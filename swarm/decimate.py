@@ -0,0 +1,114 @@
+import math
+from typing import Callable, Sequence
+
+
+# Indices of the samples to keep so that linear interpolation between kept
+# samples stays within tolerance of every sample, by Ramer-Douglas-Peucker.
+# error(i, first, last) is how far sample i is from the interpolation
+# between samples first and last. A track that never strays from its first
+# sample by more than the tolerance collapses to that one sample
+def simplify(
+    count: int, error: Callable[[int, int, int], float], tolerance: float
+) -> list[int]:
+    if count < 2:
+        return list(range(count))
+
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        worst, worst_error = None, tolerance
+        for index in range(first + 1, last):
+            sample_error = error(index, first, last)
+            if sample_error > worst_error:
+                worst, worst_error = index, sample_error
+        if worst is not None:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+
+    # Interpolating between a sample and itself gives that sample, so
+    # error(index, 0, 0) is how far a sample is from the first one
+    kept = [index for index in range(count) if keep[index]]
+    if len(kept) == 2 and all(
+        error(index, 0, 0) <= tolerance for index in range(1, count)
+    ):
+        return [0]
+    return kept
+
+
+# Where between two samples a frame lies, 0 at the first and 1 at the last
+def blend(frames: Sequence[float], index: int, first: int, last: int) -> float:
+    if frames[last] == frames[first]:
+        return 0.0
+    return (frames[index] - frames[first]) / (frames[last] - frames[first])
+
+
+# Keys to keep of a location track, so that it stays within tolerance
+# units of every baked location when interpolated linearly. Returns the
+# kept indices and the components, unchanged
+def simplify_locations(
+    frames: Sequence[float], components: Sequence[Sequence[float]], tolerance: float
+) -> tuple[list[int], Sequence[Sequence[float]]]:
+    xs, ys, zs = components
+
+    def error(index: int, first: int, last: int) -> float:
+        t = blend(frames, index, first, last)
+        return math.sqrt(
+            sum(
+                (values[index] - values[first] - t * (values[last] - values[first]))
+                ** 2
+                for values in (xs, ys, zs)
+            )
+        )
+
+    return simplify(len(frames), error, tolerance), components
+
+
+# Flip quaternions that point the opposite way from the one before them.
+# Both describe the same rotation, but interpolating between them would
+# spin the bee the long way around
+def continuous_quaternions(
+    components: Sequence[Sequence[float]],
+) -> list[list[float]]:
+    ws, xs, ys, zs = (list(values) for values in components)
+    for index in range(1, len(ws)):
+        dot = (
+            ws[index] * ws[index - 1]
+            + xs[index] * xs[index - 1]
+            + ys[index] * ys[index - 1]
+            + zs[index] * zs[index - 1]
+        )
+        if dot < 0:
+            ws[index], xs[index], ys[index], zs[index] = (
+                -ws[index],
+                -xs[index],
+                -ys[index],
+                -zs[index],
+            )
+    return [ws, xs, ys, zs]
+
+
+# Keys to keep of a quaternion track, so that it stays within tolerance
+# radians of every baked rotation when its components are interpolated
+# linearly. Returns the kept indices and the components made continuous
+def simplify_rotations(
+    frames: Sequence[float], components: Sequence[Sequence[float]], tolerance: float
+) -> tuple[list[int], list[list[float]]]:
+    components = continuous_quaternions(components)
+
+    def error(index: int, first: int, last: int) -> float:
+        t = blend(frames, index, first, last)
+        interpolated = [
+            values[first] + t * (values[last] - values[first]) for values in components
+        ]
+        length = math.sqrt(sum(value * value for value in interpolated))
+        if length == 0:
+            return math.pi
+        dot = sum(
+            values[index] * value for values, value in zip(components, interpolated)
+        )
+        return 2 * math.acos(min(abs(dot) / length, 1.0))
+
+    return simplify(len(frames), error, tolerance), components
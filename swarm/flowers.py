@@ -0,0 +1,60 @@
+import math
+from typing import Iterable, Optional
+
+from . import config
+from .spatial import SpatialHashGrid
+from .state import FlowerState
+
+
+# Lookup structure over the flowers, built once since flowers never move.
+# Pod positions are cached in a flat list, bucketed into a grid sized to
+# COGNITION_RANGE, and paired with masks of which flowers are pollinated or
+# full, so finding the nearest available flower only touches flowers near
+# the bee
+class FlowerIndex:
+    def __init__(self, flowers: list[FlowerState], radius: float = None):
+        self.flowers = flowers
+        self.radius = config.COGNITION_RANGE if radius is None else radius
+        self.pods = [tuple(flower.pod) for flower in flowers]
+        self.grid = SpatialHashGrid(self.radius)
+        for flower, pod in zip(flowers, self.pods):
+            self.grid.insert(flower.id, pod)
+
+        self.pollinated = bytearray(len(flowers))
+        self.full = bytearray(len(flowers))
+        for flower in flowers:
+            self.update(flower)
+
+    # Refresh the masks of a flower after its state changed
+    def update(self, flower: FlowerState):
+        self.pollinated[flower.id] = flower.is_pollinated
+        self.full[flower.id] = flower.nearby_bees_count >= config.MAX_NEARBY_BEES
+
+    def is_available(self, id: int) -> bool:
+        return not (self.pollinated[id] or self.full[id])
+
+    # Ids and distances of every flower within the index radius of a
+    # position, in flower order
+    def within(self, position: Iterable[float]) -> list[tuple[int, float]]:
+        x, y, z = position
+        found = []
+        for id in self.grid.candidates(position):
+            px, py, pz = self.pods[id]
+            dx, dy, dz = x - px, y - py, z - pz
+            distance = math.sqrt(dx * dx + dy * dy + dz * dz)
+            if distance <= self.radius:
+                found.append((id, distance))
+        return found
+
+    # Nearest flower within the index radius that is neither pollinated nor
+    # full, and its distance. Ties go to the first flower, like a linear scan
+    def nearest_available(
+        self, position: Iterable[float]
+    ) -> tuple[Optional[FlowerState], Optional[float]]:
+        nearest, nearest_distance = None, None
+        for id, distance in self.within(position):
+            if not self.is_available(id):
+                continue
+            if nearest_distance is None or distance < nearest_distance:
+                nearest, nearest_distance = self.flowers[id], distance
+        return nearest, nearest_distance
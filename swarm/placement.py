@@ -0,0 +1,183 @@
+import math
+import random
+from typing import Optional
+
+# Hive location and pod offset from its flower in the default scene, used
+# when a swarm is simulated without a .blend file
+HIVE_LOCATION = (0, 0, 40)
+POD_OFFSET = (0.5, 0, 3)
+
+# Half the width of the square that objects are scattered over
+PLACEMENT_HALF_WIDTH = 100
+
+
+# Number of candidates tried around a point before it stops growing the
+# sample, the k of Bridson's algorithm
+POISSON_ATTEMPTS = 30
+
+# Background grid cells per requested point above which points are thrown
+# at random instead of filling the square. So few points cover at most a
+# tenth of the square with their minimum distance, so nearly every throw
+# lands, and the cost follows the count instead of the size of the grid
+SPARSE_CELLS_PER_POINT = 64
+
+
+# Place count points at random, skipping those closer than min_distance to
+# one placed before. The grid only holds the cells that have a point, so
+# its size follows the count. Returns None if POISSON_ATTEMPTS throws per
+# point weren't enough
+def dart_throwing(
+    count: int, min_distance: float, rng: random.Random, half_width: float
+) -> Optional[list[tuple[float, float, float]]]:
+    cell_size = min_distance / math.sqrt(2)
+    squared_distance = min_distance * min_distance
+    grid: dict[tuple[int, int], tuple[float, float]] = {}
+    points: list[tuple[float, float, float]] = []
+    for _ in range(count * POISSON_ATTEMPTS):
+        x = rng.uniform(-half_width, half_width)
+        y = rng.uniform(-half_width, half_width)
+        column, row = math.floor(x / cell_size), math.floor(y / cell_size)
+        if any(
+            (x - other[0]) ** 2 + (y - other[1]) ** 2 < squared_distance
+            for other in (
+                grid.get((column + dx, row + dy))
+                for dx in range(-2, 3)
+                for dy in range(-2, 3)
+                if abs(dx) + abs(dy) < 4
+            )
+            if other is not None
+        ):
+            continue
+
+        grid[column, row] = (x, y)
+        points.append((x, y, 0.0))
+        if len(points) == count:
+            return points
+    return None
+
+
+# Place points over the ground at least min_distance apart with Bridson's
+# Poisson-disk sampling. The square is filled until no more points fit, then
+# count of them are picked at random, so they spread over the whole square.
+# A background grid with room for one point per cell keeps this linear in
+# the number of points that fit. When the count is small for the grid,
+# points are thrown at random instead, see dart_throwing. Raises ValueError
+# when fewer than count points fit at that distance
+def poisson_disk(
+    count: int,
+    min_distance: float,
+    rng: random.Random,
+    half_width: float = PLACEMENT_HALF_WIDTH,
+) -> list[tuple[float, float, float]]:
+    if count == 0:
+        return []
+    if min_distance <= 0:
+        return [
+            (
+                rng.uniform(-half_width, half_width),
+                rng.uniform(-half_width, half_width),
+                0.0,
+            )
+            for _ in range(count)
+        ]
+
+    cell_size = min_distance / math.sqrt(2)
+    columns = math.ceil(2 * half_width / cell_size)
+    if columns * columns > SPARSE_CELLS_PER_POINT * count:
+        points = dart_throwing(count, min_distance, rng, half_width)
+        if points is not None:
+            return points
+
+    # Cells are padded with two empty ones on every side so that the block of
+    # cells around any point can be read without bounds checks. Each cell
+    # holds the coordinates of its point, or None
+    stride = columns + 4
+    grid_x: list[Optional[float]] = [None] * (stride * stride)
+    grid_y: list[Optional[float]] = [None] * (stride * stride)
+
+    # Only the cells within two of a point's cell, corners excluded, can hold
+    # points closer than min_distance
+    neighbors = [
+        row * stride + column
+        for row in range(-2, 3)
+        for column in range(-2, 3)
+        if abs(row) + abs(column) < 4
+    ]
+
+    def cell(x: float, y: float) -> int:
+        column = min(int((x + half_width) / cell_size), columns - 1)
+        row = min(int((y + half_width) / cell_size), columns - 1)
+        return (row + 2) * stride + column + 2
+
+    points: list[tuple[float, float, float]] = []
+    active: list[int] = []
+    squared_distance = min_distance * min_distance
+
+    def add(x: float, y: float):
+        index = cell(x, y)
+        grid_x[index] = x
+        grid_y[index] = y
+        active.append(len(points))
+        points.append((x, y, 0.0))
+
+    add(rng.uniform(-half_width, half_width), rng.uniform(-half_width, half_width))
+    while active:
+        slot = rng.randrange(len(active))
+        x, y, _ = points[active[slot]]
+        for _ in range(POISSON_ATTEMPTS):
+            # Candidates come from the ring between one and two times the
+            # minimum distance around the point
+            angle = 2 * math.pi * rng.random()
+            distance = min_distance * (1 + rng.random())
+            candidate_x = x + distance * math.cos(angle)
+            candidate_y = y + distance * math.sin(angle)
+            if not (
+                -half_width <= candidate_x <= half_width
+                and -half_width <= candidate_y <= half_width
+            ):
+                continue
+
+            index = cell(candidate_x, candidate_y)
+            for offset in neighbors:
+                other_x = grid_x[index + offset]
+                if other_x is not None:
+                    dx = candidate_x - other_x
+                    dy = candidate_y - grid_y[index + offset]
+                    if dx * dx + dy * dy < squared_distance:
+                        break
+            else:
+                add(candidate_x, candidate_y)
+                break
+        else:
+            # Nothing fits around this point anymore
+            active[slot] = active[-1]
+            active.pop()
+
+    if len(points) < count:
+        raise ValueError(
+            f"Only {len(points)} points fit at least {min_distance} apart in a"
+            f" {2 * half_width:g} x {2 * half_width:g} square, but {count} were"
+            " requested. Lower the count or the minimum distance"
+        )
+    return rng.sample(points, count)
+
+
+# Hive location and pod positions of a randomly generated scene, placed like
+# generate-bees-and-flowers.py places flowers and rotated like the bake
+# rotates them
+def headless_scene(
+    flower_count: int, rng: Optional[random.Random] = None, min_distance: float = 10
+):
+    rng = rng if rng is not None else random.Random()
+    pods = []
+    for x, y, z in poisson_disk(flower_count, min_distance, rng):
+        angle = rng.uniform(0, math.radians(90))
+        offset_x, offset_y, offset_z = POD_OFFSET
+        pods.append(
+            (
+                x + offset_x * math.cos(angle) - offset_y * math.sin(angle),
+                y + offset_x * math.sin(angle) + offset_y * math.cos(angle),
+                z + offset_z,
+            )
+        )
+    return HIVE_LOCATION, pods
@@ -0,0 +1,617 @@
+import math
+import random
+from typing import Iterable, Optional
+
+from . import config
+from .flowers import FlowerIndex
+from .spatial import ScentGrid, SpatialHashGrid
+from .state import (
+    LEAVING_HIVE,
+    RETURNING_TO_HIVE,
+    SWARMING,
+    BeeSnapshot,
+    BeeState,
+    FlowerState,
+)
+from .vector import Vector
+
+# Direction the bee model faces when it has no rotation
+FORWARD = Vector((1, 0, 0))
+
+
+# Pure-Python bee swarm simulation. Holds the state of every bee and flower
+# and advances it one frame at a time using Particle Swarm Optimization (PSO),
+# without touching Blender. Unless neighbor_grid is False, bees find each
+# other through a spatial hash grid instead of scanning the whole swarm,
+# which gives the same result in near-linear time. Bees are updated one
+# after another unless config.SYNCHRONOUS_UPDATE is set, see
+# update_synchronous, and hear each other through scents when
+# config.SCENT_BROADCAST is set, see leave_scents
+class Simulation:
+    def __init__(
+        self,
+        hive_location: Iterable[float],
+        pod_positions: Iterable[Iterable[float]],
+        bee_count: int,
+        rng: Optional[random.Random] = None,
+        neighbor_grid: bool = True,
+    ):
+        self.rng = rng if rng is not None else random.Random()
+        self.hive = Vector(hive_location)
+        self.bounds = config.bee_position_bounds(self.hive.z)
+        self.flowers = [
+            FlowerState(id, Vector(pod)) for id, pod in enumerate(pod_positions)
+        ]
+        self.flower_index = FlowerIndex(self.flowers)
+        self.bees = [self.spawn_bee(id) for id in range(bee_count)]
+        self.frame = 0
+
+        # Number of bee to bee distance checks made in the current step
+        self.neighbor_checks = 0
+
+        # Flowers whose state changed during the current step, and the
+        # pollination state last reported for each flower
+        self.dirty_flowers: set[int] = set()
+        self.reported_pollination = self.pollinated_flowers()
+        self.events: list[tuple[int, bool]] = []
+
+        # What bees saw of each other at the start of the frame, while a
+        # synchronous update reads it
+        self.front: Optional[list[BeeSnapshot]] = None
+
+        # Scents left at the start of the frame, with config.SCENT_BROADCAST
+        self.scents: Optional[ScentGrid] = None
+
+        self.bee_grid = None
+        if neighbor_grid:
+            self.build_bee_grid()
+
+    def build_bee_grid(self):
+        self.bee_grid = SpatialHashGrid(config.SOCIAL_RANGE)
+        for bee in self.bees:
+            self.bee_grid.insert(bee.id, bee.pos)
+
+    # Rebuild what was sized from the constants if they changed since, e.g.
+    # in a live preview, so that new values apply from the next frame
+    def follow_constants(self):
+        self.bounds = config.bee_position_bounds(self.hive.z)
+        if self.flower_index.radius != config.COGNITION_RANGE:
+            self.flower_index = FlowerIndex(self.flowers)
+        if self.bee_grid is not None and self.bee_grid.cell_size != config.SOCIAL_RANGE:
+            self.build_bee_grid()
+
+    # Helper function to generate random velocity
+    def random_velocity(self) -> Vector:
+        return Vector(
+            (
+                self.rng.uniform(-1, 1),
+                self.rng.uniform(-1, 1),
+                self.rng.uniform(-1, 1),
+            )
+        ).normalized()
+
+    # Create a bee just outside the hive, heading down and away from it
+    def spawn_bee(self, id: int) -> BeeState:
+        pos = self.hive + self.random_velocity()
+        velocity = Vector(
+            (
+                self.rng.uniform(-0.5, 0.5),
+                self.rng.uniform(-0.5, 0.5),
+                self.rng.uniform(-1, -0.5),
+            )
+        ).normalized()
+        return BeeState(id, pos, velocity)
+
+    # Advance the swarm to the given frame. Returns False while the swarm is
+    # still in its initial pause and nothing changed
+    def step(self, frame: int) -> bool:
+        self.frame = frame
+        self.neighbor_checks = 0
+
+        # Don't do anything if within the initial pause
+        if frame <= config.INITIAL_PAUSE_FRAMES:
+            return False
+
+        self.follow_constants()
+        self.scents = None
+        if config.SCENT_BROADCAST:
+            self.leave_scents()
+
+        # Update bees
+        if config.SYNCHRONOUS_UPDATE:
+            self.update_synchronous()
+            for bee in self.bees:
+                self.transition_if_due(bee, frame)
+        else:
+            for bee in self.bees:
+                self.update(bee)
+                self.transition_if_due(bee, frame)
+
+        self.collect_flower_events()
+        return True
+
+    # Transition bee state if necessary
+    def transition_if_due(self, bee: BeeState, frame: int):
+        if frame >= config.START_SWARMING_FRAME and bee.action != SWARMING:
+            self.transition_action(bee)
+        elif (
+            config.FRAME_COUNT - frame <= config.RETURN_TO_HIVE_FRAME_REMAINDER
+            and bee.action != RETURNING_TO_HIVE
+        ):
+            self.transition_action(bee)
+
+    # Step through every frame of the animation, yielding each frame in which
+    # the swarm changed
+    def run(self, start: int = 1, stop: int = None):
+        stop = config.FRAME_COUNT if stop is None else stop
+        for frame in range(start, stop, config.FRAME_STEP):
+            if self.step(frame):
+                yield frame
+
+    # Frames that run() will yield, i.e. every frame after the initial pause
+    def frames(self, start: int = 1, stop: int = None) -> list[int]:
+        stop = config.FRAME_COUNT if stop is None else stop
+        return [
+            frame
+            for frame in range(start, stop, config.FRAME_STEP)
+            if frame > config.INITIAL_PAUSE_FRAMES
+        ]
+
+    # Current location of every bee
+    def bee_locations(self) -> list[Vector]:
+        return [bee.pos for bee in self.bees]
+
+    # Current rotation of every bee, None for bees that haven't turned yet
+    def bee_rotations(self) -> list[Optional[tuple]]:
+        return [bee.rotation for bee in self.bees]
+
+    # Location and rotation to keyframe for every bee in the last step, None
+    # where the bee did not move or turn
+    def bee_transforms(self):
+        for bee in self.bees:
+            yield (
+                bee.pos if bee.moved else None,
+                bee.rotation if bee.turned else None,
+            )
+
+    # Pollination state of every flower
+    def pollinated_flowers(self) -> list[bool]:
+        return [flower.is_pollinated for flower in self.flowers]
+
+    # Counts describing the state of the swarm after the last step
+    def counters(self) -> dict[str, int]:
+        return {
+            "bees_swarming": sum(bee.action == SWARMING for bee in self.bees),
+            "bees_attached": sum(bee.is_attached for bee in self.bees),
+            "bees_returned": sum(bee.is_returned_to_hive for bee in self.bees),
+            "flowers_pollinated": sum(self.pollinated_flowers()),
+            "neighbor_checks": self.neighbor_checks,
+        }
+
+    # Flowers whose pollination state flipped in the last step, as
+    # (flower id, is_pollinated) pairs in flower order
+    def flower_events(self) -> list[tuple[int, bool]]:
+        return self.events
+
+    # Mark a flower whose state just changed
+    def touch_flower(self, flower: FlowerState):
+        self.flower_index.update(flower)
+        self.dirty_flowers.add(flower.id)
+
+    # Turn the flowers changed during the step into pollination events,
+    # skipping every flower that wasn't touched
+    def collect_flower_events(self):
+        self.events = []
+        for id in sorted(self.dirty_flowers):
+            is_pollinated = self.flowers[id].is_pollinated
+            if is_pollinated != self.reported_pollination[id]:
+                self.reported_pollination[id] = is_pollinated
+                self.events.append((id, is_pollinated))
+        self.dirty_flowers.clear()
+
+    def transition_action(self, bee: BeeState):
+        if bee.action == LEAVING_HIVE:
+            self.reset_motive(bee)
+            bee.action = SWARMING
+        elif bee.action == SWARMING:
+            bee.reset_personal_best()
+            bee.reset_global_best()
+            bee.velocity = (self.hive - bee.pos).normalized()
+            bee.action = RETURNING_TO_HIVE
+
+    # Update positioning using Particle Swarm Optimization (PSO)
+    def update(self, bee: BeeState):
+        bee.moved = bee.turned = False
+
+        # If swarming, detect nearby flowers and bees
+        if bee.action == SWARMING:
+            self.pollinate_nearby_flowers(bee)
+            self.detect_nearby_bees(bee)
+
+        # If returning to hive, stop the bee if it has reached the hive
+        elif bee.action == RETURNING_TO_HIVE:
+            if bee.is_returned_to_hive:
+                return
+
+            if bee.dist(self.hive) < config.HIVE_ARRIVAL_DISTANCE:
+                bee.is_returned_to_hive = True
+
+        self.move(bee)
+
+    # Update location and rotation
+    def move(self, bee: BeeState):
+        self.calculate_position(bee)
+        self.handle_boundaries(bee)
+        bee.moved = True
+        if self.bee_grid is not None:
+            self.bee_grid.move(bee.id, bee.pos)
+
+        # Fix rotation if moving
+        if bee.velocity.magnitude > 0:
+            bee.rotation = FORWARD.rotation_difference(bee.velocity)
+            bee.turned = True
+
+    # Update every bee at once, so that the result doesn't depend on the
+    # order of the bees. Bees first pick their flowers and listen to each
+    # other, reading the swarm as it was at the start of the frame: other
+    # bees through snapshots, and flowers because nothing changes them yet.
+    # Conflicts over the free spots around flowers are then settled in order
+    # of bee id, and only then do the bees move
+    def update_synchronous(self):
+        self.front = [BeeSnapshot.of(bee) for bee in self.bees]
+        plans = []
+        for bee in self.bees:
+            bee.moved = bee.turned = False
+            if bee.action == SWARMING:
+                plan = self.plan_pollination(bee)
+                if plan is not None:
+                    plans.append(plan)
+                self.detect_nearby_bees(bee)
+        self.front = None
+
+        self.arbitrate_flowers(plans)
+
+        for bee in self.bees:
+            # If returning to hive, stop the bee if it has reached the hive
+            if bee.action == RETURNING_TO_HIVE:
+                if bee.is_returned_to_hive:
+                    continue
+
+                if bee.dist(self.hive) < config.HIVE_ARRIVAL_DISTANCE:
+                    bee.is_returned_to_hive = True
+
+            self.move(bee)
+
+    # Bounce off of walls based on Bee position bounds
+    def handle_boundaries(self, bee: BeeState):
+        for axis in ["x", "y", "z"]:
+            min_pos, max_pos = self.bounds[axis]
+            pos = getattr(bee.pos, axis)
+            if pos <= min_pos:
+                setattr(bee.pos, axis, min_pos)
+                setattr(bee.velocity, axis, -1 * getattr(bee.velocity, axis))
+            elif pos >= max_pos:
+                setattr(bee.pos, axis, max_pos)
+                setattr(bee.velocity, axis, -1 * getattr(bee.velocity, axis))
+
+    # Set position to the right spot based on PSO behavior
+    def calculate_position(self, bee: BeeState):
+        if bee.velocity.magnitude == 0:
+            return
+
+        r1, r2 = (
+            self.rng.random(),
+            self.rng.random(),
+        )
+        new_velocity = bee.velocity * config.INERTIA
+
+        # Add cognitive component
+        if bee.personal_best_flower is not None:
+            new_velocity += (
+                config.COGNITION * r1 * (bee.personal_best_flower.pod - bee.pos)
+            )
+
+        # Add social component
+        if bee.global_best_flower is not None:
+            new_velocity += config.SOCIAL * r2 * (bee.global_best_flower.pod - bee.pos)
+
+        # Calculate the turning radius
+        if config.MAX_TURNING_RADIUS is not None:
+            turning_radius_radians = math.radians(config.MAX_TURNING_RADIUS)
+            current_direction = bee.velocity.normalized()
+            desired_direction = new_velocity.normalized()
+
+            # Compute the angle between the current and desired directions
+            angle_between = math.acos(
+                max(min(current_direction.dot(desired_direction), 1), -1)
+            )
+
+            if angle_between > turning_radius_radians:
+                rotation_axis = current_direction.cross(desired_direction).normalized()
+                limited_direction = current_direction.rotated(
+                    rotation_axis, turning_radius_radians
+                )
+                current_speed = min(new_velocity.magnitude, config.BEE_SPEED)
+                new_velocity = limited_direction * current_speed
+
+        bee.velocity = new_velocity.normalized()
+        bee.pos += bee.velocity * config.BEE_SPEED
+
+    # Reset the current target of the bee
+    def reset_motive(self, bee: BeeState):
+        bee.reset_personal_best()
+        bee.velocity = self.random_velocity()
+
+    # Attempt to pollinate nearby flowers
+    def pollinate_nearby_flowers(self, bee: BeeState):
+
+        # Search for the nearest flower
+        bee.previous_personal_best_flower = bee.personal_best_flower
+        cognition_flower, cognition = self.flower_index.nearest_available(bee.pos)
+
+        # Update personal best if necessary
+        if cognition is not None and cognition < bee.personal_best:
+            bee.personal_best = cognition
+            bee.personal_best_flower = cognition_flower
+
+        # No need to continue if there's no personal best
+        if bee.personal_best_flower is None:
+            return
+
+        # If a new best flower has been found, detach from the previous one if necessary
+        if (
+            bee.previous_personal_best_flower is not None
+            and bee.personal_best_flower.id != bee.previous_personal_best_flower.id
+            and bee.is_attached
+        ):
+            bee.is_attached = False
+            bee.previous_personal_best_flower.nearby_bees_count -= 1
+            self.touch_flower(bee.previous_personal_best_flower)
+
+        # Handle pollinating a personal best
+        if (
+            bee.personal_best <= config.FLOWER_POLLINATION_PROXIMITY
+            and not bee.personal_best_flower.is_pollinated
+        ):
+
+            # If the bee is attached already or there's room around the flower for
+            # the bee, pollinate it
+            if (
+                bee.is_attached
+                or bee.personal_best_flower.nearby_bees_count < config.MAX_NEARBY_BEES
+            ):
+
+                # Attach the bee if it wasn't attached already
+                if not bee.is_attached:
+                    bee.personal_best_flower.nearby_bees_count += 1
+                    bee.is_attached = True
+
+                bee.personal_best_flower.pollinate()
+                self.touch_flower(bee.personal_best_flower)
+
+            # If the flower is full and the bee wasn't attached to it, find
+            # a new flower
+            else:
+                self.reset_motive(bee)
+                return
+
+        # Reset the bee's motive if the flower becomes pollinated or its
+        # personal best flower is full
+        if bee.personal_best_flower.is_pollinated or (
+            not bee.is_attached
+            and bee.personal_best_flower.nearby_bees_count >= config.MAX_NEARBY_BEES
+        ):
+            self.reset_motive(bee)
+
+    # Synchronous counterpart of pollinate_nearby_flowers, which leaves the
+    # flowers alone. Updates the personal best of the bee and returns the
+    # bee, the flower it let go of and the flower it wants to pollinate, or
+    # None if the bee has no personal best
+    def plan_pollination(
+        self, bee: BeeState
+    ) -> Optional[tuple[BeeState, Optional[FlowerState], Optional[FlowerState]]]:
+
+        # Search for the nearest flower
+        bee.previous_personal_best_flower = bee.personal_best_flower
+        cognition_flower, cognition = self.flower_index.nearest_available(bee.pos)
+
+        # Update personal best if necessary
+        if cognition is not None and cognition < bee.personal_best:
+            bee.personal_best = cognition
+            bee.personal_best_flower = cognition_flower
+
+        # No need to continue if there's no personal best
+        if bee.personal_best_flower is None:
+            return None
+
+        # If a new best flower has been found, detach from the previous one
+        detached = None
+        if (
+            bee.previous_personal_best_flower is not None
+            and bee.personal_best_flower.id != bee.previous_personal_best_flower.id
+            and bee.is_attached
+        ):
+            bee.is_attached = False
+            detached = bee.previous_personal_best_flower
+
+        wanted = None
+        if (
+            bee.personal_best <= config.FLOWER_POLLINATION_PROXIMITY
+            and not bee.personal_best_flower.is_pollinated
+        ):
+            wanted = bee.personal_best_flower
+        return bee, detached, wanted
+
+    # Apply the plans of a synchronous update, given in bee order. Bees that
+    # let go of a flower free their spots first. Attached bees keep theirs,
+    # and the other bees take the free spots around their flower in order of
+    # their id. Bees that find no room must find a new flower
+    def arbitrate_flowers(self, plans: list[tuple]):
+        for _, detached, _ in plans:
+            if detached is not None:
+                detached.nearby_bees_count -= 1
+                self.touch_flower(detached)
+
+        rejected = set()
+        for bee, _, flower in plans:
+            if flower is None:
+                continue
+            if not bee.is_attached:
+                if flower.nearby_bees_count >= config.MAX_NEARBY_BEES:
+                    rejected.add(bee.id)
+                    self.reset_motive(bee)
+                    continue
+                flower.nearby_bees_count += 1
+                bee.is_attached = True
+
+            flower.pollinate()
+            self.touch_flower(flower)
+
+        # Reset the bee's motive if the flower became pollinated or its
+        # personal best flower is full
+        for bee, _, _ in plans:
+            if bee.id in rejected:
+                continue
+            if bee.personal_best_flower.is_pollinated or (
+                not bee.is_attached
+                and bee.personal_best_flower.nearby_bees_count >= config.MAX_NEARBY_BEES
+            ):
+                self.reset_motive(bee)
+
+    # Bees that may be within SOCIAL_RANGE of a bee, in swarm order. During
+    # a synchronous update these are the snapshots taken at the start of
+    # the frame
+    def nearby_bees(self, bee: BeeState) -> list:
+        bees = self.bees if self.front is None else self.front
+        if self.bee_grid is None:
+            return bees
+        return [bees[id] for id in self.bee_grid.candidates(bee.pos)]
+
+    # Whether bees may still head for a flower
+    def is_open(self, flower: Optional[FlowerState]) -> bool:
+        return (
+            flower is not None
+            and not flower.is_pollinated
+            and flower.nearby_bees_count < config.MAX_NEARBY_BEES
+        )
+
+    # Let every bee that knows an open flower leave a scent for the others,
+    # scored by its personal best, or its global best if its personal best
+    # flower isn't open. Bees smell these for the rest of the frame instead
+    # of reading each other
+    def leave_scents(self):
+        self.scents = ScentGrid(config.SOCIAL_RANGE)
+        for bee in self.bees:
+            if self.is_open(bee.personal_best_flower):
+                best, flower = bee.personal_best, bee.personal_best_flower
+            elif self.is_open(bee.global_best_flower):
+                best, flower = bee.global_best, bee.global_best_flower
+            else:
+                continue
+            score = config.SOCIAL_SCENT_COEFFICIENT * best
+            self.scents.leave(bee.id, bee.pos, score, flower)
+        self.scents.settle()
+
+    # Process communication from nearby bees
+    def detect_nearby_bees(self, bee: BeeState):
+        if self.scents is None:
+            social, social_flower = self.listen_to_nearby_bees(bee)
+        else:
+            social, social_flower, checks = self.scents.lowest(bee.id, bee.pos)
+            self.neighbor_checks += checks
+
+        # Update global best if necessary
+        if social is not None and social < bee.global_best:
+            bee.global_best = social
+            bee.global_best_flower = social_flower
+
+        # No need to continue if there's no global best
+        if bee.global_best_flower is None:
+            return
+
+        # Reset the bee's velocity if the global best flower becomes pollinated
+        if bee.global_best_flower.is_pollinated or (
+            bee.global_best_flower.nearby_bees_count >= config.MAX_NEARBY_BEES
+            and not bee.is_attached
+        ):
+            bee.reset_global_best()
+
+    # Best score and flower the bees within SOCIAL_RANGE of a bee tell it of,
+    # reading their current bests
+    def listen_to_nearby_bees(self, bee: BeeState) -> tuple:
+        # Search for the nearest bee
+        social = None
+        social_flower = None
+        nearby = self.nearby_bees(bee)
+        self.neighbor_checks += len(nearby)
+        for other in nearby:
+
+            # Ignore the bee if it's the current bee
+            if bee.id == other.id:
+                continue
+
+            distance = bee.dist(other.pos)
+            if distance > config.SOCIAL_RANGE:
+                continue
+
+            # If the bee is in range, get the best of its personal best or global best
+            # flowers
+            if (
+                social is None or (config.SOCIAL_SCENT_COEFFICIENT * distance) < social
+            ) and (
+                other.personal_best_flower
+                and not other.personal_best_flower.is_pollinated
+                and other.personal_best_flower.nearby_bees_count
+                < config.MAX_NEARBY_BEES
+            ):
+                social = config.SOCIAL_SCENT_COEFFICIENT * other.personal_best
+                social_flower = other.personal_best_flower
+
+            if (
+                social is None
+                or (
+                    other.personal_best_flower is None
+                    and (config.SOCIAL_SCENT_COEFFICIENT * distance) < social
+                )
+            ) and (
+                other.global_best_flower
+                and not other.global_best_flower.is_pollinated
+                and other.global_best_flower.nearby_bees_count < config.MAX_NEARBY_BEES
+            ):
+                social = config.SOCIAL_SCENT_COEFFICIENT * other.global_best
+                social_flower = other.global_best_flower
+
+        return social, social_flower
+
+
+# Look up a simulation engine by name. The NumPy engines are only imported
+# when asked for, since the pure-Python one must work without NumPy
+def engine_class(engine: str):
+    if engine == "python":
+        return Simulation
+    if engine == "numpy":
+        from .vectorized import VectorizedSimulation
+
+        return VectorizedSimulation
+    if engine == "tiled":
+        from .tiled import TiledSimulation
+
+        return TiledSimulation
+    raise ValueError(f"Unknown simulation engine '{engine}'")
+
+
+# Build a simulation with an engine by name. The pure-Python engine draws
+# from rng itself, the NumPy engines are seeded from it
+def create_engine(
+    engine: str,
+    hive_location: Iterable[float],
+    pod_positions: Iterable[Iterable[float]],
+    bee_count: int,
+    rng: random.Random,
+):
+    return engine_class(engine)(
+        hive_location,
+        pod_positions,
+        bee_count,
+        rng if engine == "python" else rng.getrandbits(64),
+    )
@@ -0,0 +1,116 @@
+import math
+from typing import Any, Iterable, Optional
+
+Cell = tuple[int, int, int]
+
+
+# Cell of a grid of cubes of a size that a position falls in
+def grid_cell(position: Iterable[float], size: float) -> Cell:
+    x, y, z = position
+    return (math.floor(x / size), math.floor(y / size), math.floor(z / size))
+
+
+# Uniform grid that buckets points by cell so that radius queries only look
+# at the cells around the query point. With cells at least as wide as the
+# query radius, every point in range is in the 3 x 3 x 3 block of cells
+# around the query point
+class SpatialHashGrid:
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: dict[Cell, set[int]] = {}
+        self.point_cells: dict[int, Cell] = {}
+
+    def cell(self, position: Iterable[float]) -> Cell:
+        return grid_cell(position, self.cell_size)
+
+    def insert(self, id: int, position: Iterable[float]):
+        cell = self.cell(position)
+        self.point_cells[id] = cell
+        self.cells.setdefault(cell, set()).add(id)
+
+    def remove(self, id: int):
+        cell = self.point_cells.pop(id)
+        members = self.cells[cell]
+        members.discard(id)
+        if not members:
+            del self.cells[cell]
+
+    # Move a point to a new position. Cheap when it stays in the same cell,
+    # which is almost always the case for a bee moving BEE_SPEED per frame
+    def move(self, id: int, position: Iterable[float]):
+        cell = self.cell(position)
+        if self.point_cells.get(id) == cell:
+            return
+        if id in self.point_cells:
+            self.remove(id)
+        self.point_cells[id] = cell
+        self.cells.setdefault(cell, set()).add(id)
+
+    # Ids of every point in the cells around a position, in ascending order.
+    # Callers still need to check the exact distance
+    def candidates(self, position: Iterable[float]) -> list[int]:
+        cx, cy, cz = self.cell(position)
+        found = []
+        for x in (cx - 1, cx, cx + 1):
+            for y in (cy - 1, cy, cy + 1):
+                for z in (cz - 1, cz, cz + 1):
+                    members = self.cells.get((x, y, z))
+                    if members:
+                        found.extend(members)
+        found.sort()
+        return found
+
+
+# Scents bees leave for each other once per frame. Every scent is left in
+# its cell of a grid of radius-sized cells, and each cell keeps its scents
+# sorted by score. To find the lowest score within the radius of a position,
+# the 3 x 3 x 3 block of cells around it is walked in score order, stopping
+# in each cell at the first scent in range or at the first score that can't
+# beat the best so far. The cost of a query depends on the scents around it
+# rather than on the number of bees
+class ScentGrid:
+    def __init__(self, radius: float):
+        self.radius = radius
+        self.cells: dict[Cell, list[tuple]] = {}
+
+    # Leave a scent with a score and a payload. The id is that of the bee
+    # leaving it, so the bee doesn't smell its own scent
+    def leave(self, id: int, position: Iterable[float], score: float, payload: Any):
+        x, y, z = position
+        self.cells.setdefault(grid_cell((x, y, z), self.radius), []).append(
+            (score, id, x, y, z, payload)
+        )
+
+    # Sort the scents of every cell. Called once every scent has been left
+    def settle(self):
+        for scents in self.cells.values():
+            scents.sort(key=lambda scent: scent[:2])
+
+    # Lowest score and its payload among the scents within the radius of a
+    # position, leaving out those of a bee, and the number of scents checked.
+    # The score is None if there is no scent in range
+    def lowest(
+        self, id: int, position: Iterable[float]
+    ) -> tuple[Optional[float], Any, int]:
+        x, y, z = position
+        cx, cy, cz = grid_cell((x, y, z), self.radius)
+        radius_squared = self.radius * self.radius
+        best = None
+        best_payload = None
+        checks = 0
+        for cell in (
+            (cx + dx, cy + dy, cz + dz)
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+            for dz in (-1, 0, 1)
+        ):
+            for score, other, sx, sy, sz, payload in self.cells.get(cell, ()):
+                checks += 1
+                if best is not None and score >= best:
+                    break
+                if other == id:
+                    continue
+                if (sx - x) ** 2 + (sy - y) ** 2 + (sz - z) ** 2 <= radius_squared:
+                    best, best_payload = score, payload
+                    break
+        return best, best_payload, checks
@@ -0,0 +1,124 @@
+from enum import IntEnum
+from typing import NamedTuple, Optional
+
+from . import config
+from .vector import Vector
+
+
+# What a bee is doing. Bees leave the hive, swarm the flowers and then
+# return to the hive, in that order
+class Action(IntEnum):
+    LEAVING_HIVE = 0
+    SWARMING = 1
+    RETURNING_TO_HIVE = 2
+
+
+# The actions as module constants, which the per-bee loop looks up several
+# times faster than attributes of Action
+LEAVING_HIVE, SWARMING, RETURNING_TO_HIVE = Action
+
+
+# Simulation state of a single bee. The PSO rules that move it live on
+# Simulation so that they can see the rest of the swarm. Slots keep large
+# swarms small on the object engine
+class BeeState:
+    __slots__ = (
+        "id",
+        "pos",
+        "velocity",
+        "rotation",
+        "personal_best",
+        "personal_best_flower",
+        "previous_personal_best_flower",
+        "global_best",
+        "global_best_flower",
+        "is_attached",
+        "action",
+        "is_returned_to_hive",
+        "moved",
+        "turned",
+    )
+
+    def __init__(self, id: int, pos: Vector, velocity: Vector):
+        self.id = id
+        self.pos = pos
+        self.velocity = velocity
+        self.rotation: Optional[tuple[float, float, float, float]] = None
+
+        self.reset_personal_best()
+        self.reset_global_best()
+
+        self.is_attached: bool = False
+        self.action: Action = LEAVING_HIVE
+        self.is_returned_to_hive: bool = False
+
+        # Whether the last step moved or turned the bee, i.e. whether
+        # the location or rotation needs a keyframe for that frame
+        self.moved: bool = False
+        self.turned: bool = False
+
+    # Calculate distance from a position
+    def dist(self, other_position) -> float:
+        return (self.pos - other_position).magnitude
+
+    # Set personal best to default value
+    def reset_personal_best(self):
+        self.is_attached = False
+        self.personal_best = float("inf")
+        self.personal_best_flower: Optional["FlowerState"] = None
+        self.previous_personal_best_flower: Optional["FlowerState"] = None
+
+    # Set global best to default value
+    def reset_global_best(self):
+        self.is_attached = False
+        self.global_best = float("inf")
+        self.global_best_flower: Optional["FlowerState"] = None
+
+
+# Simulation state of a single flower. Flowers never move, so only the
+# world position of the pod is kept
+class FlowerState:
+    __slots__ = ("id", "pod", "is_pollinated", "pollination_count", "nearby_bees_count")
+
+    def __init__(self, id: int, pod: Vector):
+        self.id = id
+        self.pod = pod
+        self.is_pollinated: bool = False
+        self.pollination_count: int = 0
+        self.nearby_bees_count: int = 0
+
+    # Iterate the flower's pollination count and set it to pollinated
+    # if its pollination count reaches the threshold
+    def pollinate(self):
+        if self.is_pollinated:
+            return
+
+        self.pollination_count += 1
+        self.is_pollinated = self.pollination_count >= config.POLLINATION_THRESHOLD
+
+    # Set the pollination to false
+    def depollinate(self):
+        self.is_pollinated = False
+
+
+# What the rest of the swarm can see of a bee at the start of a frame.
+# Synchronous updates let bees read these instead of each other, so no bee
+# sees a change made by another bee during the same frame
+class BeeSnapshot(NamedTuple):
+    id: int
+    pos: Vector
+    personal_best: float
+    personal_best_flower: Optional[FlowerState]
+    global_best: float
+    global_best_flower: Optional[FlowerState]
+
+    @classmethod
+    def of(cls, bee: BeeState) -> "BeeSnapshot":
+        return cls(
+            bee.id,
+            bee.pos.copy(),
+            bee.personal_best,
+            bee.personal_best_flower,
+            bee.global_best,
+            bee.global_best_flower,
+        )
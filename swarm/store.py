@@ -0,0 +1,199 @@
+import json
+import struct
+from typing import Iterable
+
+import numpy as np
+
+# File signature and layout version
+MAGIC = b"BEESWARM"
+VERSION = 1
+
+# Signature, version, metadata size, frame capacity, frames written, bees
+# and flowers
+HEADER = struct.Struct("<8sIIQQQQ")
+
+# Bits of the per-bee flags, mirroring the keyframes a bake would insert
+MOVED = 1
+TURNED = 2
+
+# Arrays stored after the header, with their dtype and trailing shape. The
+# leading dimension is the frame capacity, the bee count or the flower count
+SECTIONS = [
+    ("frames", np.int32, "frames", ()),
+    ("bee_ids", np.int32, "bees", ()),
+    ("flower_ids", np.int32, "flowers", ()),
+    ("positions", np.float32, "frames", ("bees", 3)),
+    ("rotations", np.float32, "frames", ("bees", 4)),
+    ("flags", np.uint8, "frames", ("bees",)),
+    ("pollinated", np.uint8, "frames", ("flowers",)),
+]
+
+
+# Round an offset up to the next multiple of 8 bytes
+def align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+# Offsets and shapes of every section for the given sizes, and the offset
+# of the end of the file
+def layout(metadata_size: int, sizes: dict[str, int]) -> tuple[dict, int]:
+    offset = align(HEADER.size + metadata_size)
+    sections = {}
+    for name, dtype, leading, trailing in SECTIONS:
+        shape = (sizes[leading],) + tuple(
+            sizes[dim] if isinstance(dim, str) else dim for dim in trailing
+        )
+        sections[name] = (offset, dtype, shape)
+        offset = align(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    return sections, offset
+
+
+# Writes a simulation to a trajectory store one frame at a time. The file is
+# sized for frame_capacity frames up front and memory-mapped, so rows go
+# straight to disk and are never all held in memory
+class TrajectoryWriter:
+    def __init__(
+        self,
+        path: str,
+        frame_capacity: int,
+        bee_ids: Iterable[int],
+        flower_ids: Iterable[int],
+        metadata: dict = None,
+    ):
+        bee_ids, flower_ids = list(bee_ids), list(flower_ids)
+        self.path = path
+        self.metadata = json.dumps(metadata or {}).encode()
+        self.sizes = {
+            "frames": frame_capacity,
+            "bees": len(bee_ids),
+            "flowers": len(flower_ids),
+        }
+        self.frame_count = 0
+
+        sections, end = layout(len(self.metadata), self.sizes)
+        with open(path, "wb") as file:
+            file.truncate(end)
+        self.write_header()
+
+        self.arrays = {
+            name: np.memmap(path, dtype, "r+", offset, shape)
+            for name, (offset, dtype, shape) in sections.items()
+        }
+        self.arrays["bee_ids"][:] = bee_ids
+        self.arrays["flower_ids"][:] = flower_ids
+        self.last_rotations = np.tile(
+            np.array((1, 0, 0, 0), dtype=np.float32), (len(bee_ids), 1)
+        )
+
+    # Writer for a simulation, with room for every frame it will step through
+    @classmethod
+    def for_simulation(cls, path: str, simulation, metadata: dict = None):
+        frames = len(simulation.frames())
+        bee_count = len(simulation.bee_locations())
+        flower_count = len(simulation.pollinated_flowers())
+        return cls(path, frames, range(bee_count), range(flower_count), metadata)
+
+    def write_header(self):
+        with open(self.path, "r+b") as file:
+            file.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    len(self.metadata),
+                    self.sizes["frames"],
+                    self.frame_count,
+                    self.sizes["bees"],
+                    self.sizes["flowers"],
+                )
+            )
+            file.write(self.metadata)
+
+    # Append the state of the simulation after it stepped to a frame
+    def write_frame(self, frame: int, simulation):
+        if self.frame_count >= self.sizes["frames"]:
+            raise ValueError(f"Trajectory store {self.path} is full")
+
+        row = self.frame_count
+        flags = self.arrays["flags"][row]
+        flags[:] = 0
+        for bee, (location, rotation) in enumerate(simulation.bee_transforms()):
+            if location is not None:
+                flags[bee] |= MOVED
+            if rotation is not None:
+                flags[bee] |= TURNED
+                self.last_rotations[bee] = rotation
+
+        self.arrays["frames"][row] = frame
+        self.arrays["positions"][row] = np.asarray(
+            simulation.bee_locations(), dtype=np.float32
+        ).reshape(-1, 3)
+        self.arrays["rotations"][row] = self.last_rotations
+        self.arrays["pollinated"][row] = simulation.pollinated_flowers()
+        self.frame_count += 1
+
+    # Flush the arrays and record how many frames were written
+    def close(self):
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays.clear()
+        self.write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Read-only, memory-mapped view of a trajectory store. Arrays are only paged
+# in from disk as they are sliced, so a frame range can be replayed without
+# loading the whole file
+class TrajectoryStore:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+            (
+                magic,
+                version,
+                metadata_size,
+                frame_capacity,
+                self.frame_count,
+                bee_count,
+                flower_count,
+            ) = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a trajectory store")
+            if version != VERSION:
+                raise ValueError(
+                    f"{path} has store version {version}, expected {VERSION}"
+                )
+            self.metadata = json.loads(file.read(metadata_size))
+
+        # Per-frame arrays are cut down to the frames actually written
+        sizes = {"frames": frame_capacity, "bees": bee_count, "flowers": flower_count}
+        sections, _ = layout(metadata_size, sizes)
+        for name, _, leading, _ in SECTIONS:
+            offset, dtype, shape = sections[name]
+            array = np.memmap(path, dtype, "r", offset, shape)
+            if leading == "frames":
+                array = array[: self.frame_count]
+            setattr(self, name, array)
+
+    @property
+    def bee_count(self) -> int:
+        return len(self.bee_ids)
+
+    @property
+    def flower_count(self) -> int:
+        return len(self.flower_ids)
+
+    # Rows of the frames in [start, stop)
+    def rows(self, start: int = None, stop: int = None) -> slice:
+        first = 0 if start is None else np.searchsorted(self.frames, start, "left")
+        last = (
+            self.frame_count
+            if stop is None
+            else np.searchsorted(self.frames, stop, "left")
+        )
+        return slice(int(first), int(last))
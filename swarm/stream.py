@@ -0,0 +1,82 @@
+import pickle
+import random
+import sys
+import traceback
+from typing import Callable, Iterable
+
+from . import config
+from .simulation import create_engine
+
+
+# Run a simulation and send its frames with send, a chunk of frames at a
+# time. Messages are tuples starting with their kind:
+#
+#   ("start", bee locations, pollination of each flower, number of frames)
+#   ("frames", [(frame, [(location, rotation) per bee], flower events)])
+#   ("done",)
+#   ("error", traceback)
+#
+# Locations and rotations are None where the bee didn't move or turn, like
+# in Simulation.bee_transforms
+def stream_frames(
+    send: Callable[[tuple], None],
+    engine: str,
+    hive_location: Iterable[float],
+    pod_positions: list,
+    bee_count: int,
+    rng: random.Random,
+    chunk_size: int,
+):
+    try:
+        simulation = create_engine(engine, hive_location, pod_positions, bee_count, rng)
+        send(
+            (
+                "start",
+                [
+                    tuple(map(float, location))
+                    for location in simulation.bee_locations()
+                ],
+                simulation.pollinated_flowers(),
+                len(simulation.frames()),
+            )
+        )
+
+        chunk = []
+        for frame in simulation.run():
+            transforms = [
+                (
+                    location if location is None else tuple(map(float, location)),
+                    rotation if rotation is None else tuple(map(float, rotation)),
+                )
+                for location, rotation in simulation.bee_transforms()
+            ]
+            chunk.append((frame, transforms, list(simulation.flower_events())))
+            if len(chunk) >= chunk_size:
+                send(("frames", chunk))
+                chunk = []
+
+        if chunk:
+            send(("frames", chunk))
+        send(("done",))
+    except Exception:
+        send(("error", traceback.format_exc()))
+
+
+# Entry point of a background bake, run as python -m swarm.stream. Reads the
+# swarm constants and the arguments of stream_frames pickled on stdin, and
+# writes the pickled messages to stdout
+def main():
+    output = sys.stdout.buffer
+    sys.stdout = sys.stderr
+    constants, arguments = pickle.load(sys.stdin.buffer)
+    vars(config).update(constants)
+
+    def send(message: tuple):
+        pickle.dump(message, output, pickle.HIGHEST_PROTOCOL)
+        output.flush()
+
+    stream_frames(send, **arguments)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# Parameter sweeps over the swarm constants. Every point of a grid or random
+# search is simulated headless for every seed across a pool of processes,
+# and the metrics of each run are collected into one results table. Run
+# from the repository root with:
+#
+#   python -m swarm.sweep COGNITION=1,2,3 SOCIAL=1,2 --seeds 0 1 2
+#   python -m swarm.sweep COGNITION=0.5:4 SOCIAL_RANGE=5:30 --samples 200
+#
+# A grid takes comma separated values for each constant. With --samples,
+# points are drawn at random, uniformly from low:high ranges or from the
+# listed values
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import config
+from .placement import headless_scene
+from .simulation import create_engine
+
+
+# Parse a constant's value from the command line
+def parse_value(text: str):
+    if text.lower() == "none":
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+# Parse NAME=a,b,c or NAME=low:high into the name and either a list of values
+# or a (low, high) range
+def parse_spec(spec: str):
+    name, separator, values = spec.partition("=")
+    if not separator or not values:
+        raise ValueError(f"Expected NAME=a,b,c or NAME=low:high, got '{spec}'")
+    if ":" in values:
+        low, high = values.split(":")
+        return name, (float(low), float(high))
+    return name, [parse_value(value) for value in values.split(",")]
+
+
+# Every combination of the listed values
+def grid_points(specs: dict) -> list[dict]:
+    ranges = [name for name, values in specs.items() if isinstance(values, tuple)]
+    if ranges:
+        raise ValueError(f"Ranges need --samples: {', '.join(ranges)}")
+    names = list(specs)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(specs[name] for name in names))
+    ]
+
+
+# Points drawn at random, uniformly from each range or from each list
+def random_points(specs: dict, samples: int, rng: random.Random) -> list[dict]:
+    points = []
+    for _ in range(samples):
+        point = {}
+        for name, values in specs.items():
+            if isinstance(values, tuple):
+                point[name] = rng.uniform(*values)
+            else:
+                point[name] = rng.choice(values)
+        points.append(point)
+    return points
+
+
+# Simulate one point of the sweep with one seed, up to the frame the bees
+# start returning to the hive, and measure how well the swarm foraged
+def run_point(
+    point: dict, seed: int, bee_count: int, flower_count: int, engine: str
+) -> dict:
+    start = time.perf_counter()
+    with config.overridden(**point):
+        rng = random.Random(seed)
+        hive, pods = headless_scene(flower_count, rng)
+        simulation = create_engine(engine, hive, pods, bee_count, rng)
+
+        # Frame in which the bees start returning to the hive
+        return_frame = math.ceil(
+            config.FRAME_COUNT - config.RETURN_TO_HIVE_FRAME_REMAINDER
+        )
+
+        full_pollination_frames = None
+        pollinated = 0
+        idle_frames = 0
+        for frame in simulation.run(stop=return_frame):
+            counters = simulation.counters()
+            pollinated = counters["flowers_pollinated"]
+            idle_frames += counters["bees_swarming"] - counters["bees_attached"]
+            if full_pollination_frames is None and pollinated == flower_count:
+                full_pollination_frames = frame - config.INITIAL_PAUSE_FRAMES
+
+    return {
+        **point,
+        "seed": seed,
+        "full_pollination_frames": full_pollination_frames,
+        "pollinated_at_return": pollinated,
+        "mean_idle_frames": idle_frames / bee_count if bee_count else 0.0,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# Run every point with every seed across a pool of processes, returning the
+# results in the order of the points and seeds
+def sweep(
+    points: list[dict],
+    seeds: list[int],
+    bee_count: int = 200,
+    flower_count: int = 50,
+    engine: str = "python",
+    workers: int = None,
+    progress=None,
+) -> list[dict]:
+    jobs = [(point, seed) for point in points for seed in seeds]
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_point, point, seed, bee_count, flower_count, engine): i
+            for i, (point, seed) in enumerate(jobs)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(jobs))
+    return results
+
+
+# Average the metrics of each point over its seeds. Frames to full
+# pollination are averaged over the seeds that reached it
+def summarize(results: list[dict], names: list[str]) -> list[dict]:
+    groups = {}
+    for result in results:
+        key = tuple(result[name] for name in names)
+        groups.setdefault(key, []).append(result)
+
+    rows = []
+    for key, group in groups.items():
+        reached = [
+            result["full_pollination_frames"]
+            for result in group
+            if result["full_pollination_frames"] is not None
+        ]
+        rows.append(
+            {
+                **dict(zip(names, key)),
+                "runs": len(group),
+                "fully_pollinated": len(reached),
+                "full_pollination_frames": (
+                    sum(reached) / len(reached) if reached else None
+                ),
+                "pollinated_at_return": sum(
+                    result["pollinated_at_return"] for result in group
+                )
+                / len(group),
+                "mean_idle_frames": sum(result["mean_idle_frames"] for result in group)
+                / len(group),
+            }
+        )
+
+    # Best first: most flowers pollinated, then fastest to full pollination
+    rows.sort(
+        key=lambda row: (
+            -row["pollinated_at_return"],
+            (
+                math.inf
+                if row["full_pollination_frames"] is None
+                else row["full_pollination_frames"]
+            ),
+        )
+    )
+    return rows
+
+
+# Write the results as CSV for a .csv path and JSON lines otherwise
+def write_results(path: str, results: list[dict]):
+    with open(path, "w", newline="") as file:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        else:
+            for result in results:
+                file.write(json.dumps(result) + "\n")
+
+
+def format_value(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3g}"
+    return str(value)
+
+
+def print_table(rows: list[dict]):
+    columns = list(rows[0])
+    cells = [[format_value(row[column]) for column in columns] for row in rows]
+    widths = [
+        max(len(column), *(len(row[i]) for row in cells))
+        for i, column in enumerate(columns)
+    ]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep the swarm constants")
+    parser.add_argument(
+        "specs", nargs="+", help="NAME=a,b,c values or NAME=low:high ranges"
+    )
+    parser.add_argument(
+        "--samples", type=int, help="random search with this many points"
+    )
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument(
+        "--search-seed", type=int, default=0, help="seed of the random search"
+    )
+    parser.add_argument("--bees", type=int, default=200)
+    parser.add_argument("--flowers", type=int, default=50)
+    parser.add_argument(
+        "--engine", default="python", choices=["python", "numpy", "tiled"]
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="write every run to this .csv or .jsonl")
+    parser.add_argument("--top", type=int, default=20, help="points to print")
+    args = parser.parse_intermixed_args()
+
+    try:
+        specs = dict(parse_spec(spec) for spec in args.specs)
+        if args.samples is None:
+            points = grid_points(specs)
+        else:
+            points = random_points(specs, args.samples, random.Random(args.search_seed))
+    except ValueError as error:
+        parser.error(str(error))
+
+    unknown = [
+        name for name in specs if not name.isupper() or not hasattr(config, name)
+    ]
+    if unknown:
+        parser.error(f"Unknown swarm constants: {', '.join(unknown)}")
+
+    runs = len(points) * len(args.seeds)
+    print(f"{len(points)} points x {len(args.seeds)} seeds on {args.workers} workers")
+    start = time.perf_counter()
+    results = sweep(
+        points,
+        args.seeds,
+        args.bees,
+        args.flowers,
+        args.engine,
+        args.workers,
+        lambda done, total: print(f"\r{done}/{total} runs", end="", flush=True),
+    )
+    print(f"\r{runs} runs in {time.perf_counter() - start:.1f}s")
+
+    if args.output:
+        write_results(args.output, results)
+    print_table(summarize(results, list(specs))[: args.top])
+
+
+if __name__ == "__main__":
+    main()
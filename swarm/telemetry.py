@@ -0,0 +1,101 @@
+import csv
+import json
+import time
+from typing import Callable
+
+# Phase each instrumented method is timed under. Methods that an object
+# doesn't have are skipped, so the same table covers both engines and the
+# Blender keyframer
+PHASES = {
+    "pollinate_nearby_flowers": "perception",
+    "plan_pollination": "perception",
+    "leave_scents": "social",
+    "detect_nearby_bees": "social",
+    "calculate_position": "integration",
+    "calculate_positions": "integration",
+    "handle_boundaries": "integration",
+    "arbitrate_flowers": "flowers",
+    "collect_flower_events": "flowers",
+    "record_frame": "keyframes",
+    "write": "keyframes",
+}
+
+
+# Per-phase timers and a per-frame telemetry stream for the frame loop.
+# Instrumenting an object replaces its methods with timed wrappers on that
+# instance only, so nothing is paid when telemetry is off. After each frame,
+# end_frame() appends a row with the time spent in each phase during the
+# frame and the simulation's counters. Rows are written as they come, as
+# CSV if the path ends in .csv and as JSON lines otherwise
+class Telemetry:
+    def __init__(self, path: str = None):
+        self.totals: dict[str, float] = {}
+        self.frame_times: dict[str, float] = {}
+        self.frame_count = 0
+
+        self.file = None
+        self.csv_writer = None
+        if path is not None:
+            self.file = open(path, "w", newline="")
+            self.format = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+    # Time the methods of an object that appear in the phase table
+    def instrument(self, obj, phases: dict[str, str] = PHASES):
+        for name, phase in phases.items():
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.timed(phase, method))
+                self.totals.setdefault(phase, 0.0)
+        return obj
+
+    def timed(self, phase: str, function: Callable) -> Callable:
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.totals[phase] += elapsed
+                self.frame_times[phase] = self.frame_times.get(phase, 0.0) + elapsed
+
+        return timed_function
+
+    # Record the phase times and counters of a finished frame
+    def end_frame(self, frame: int, simulation):
+        row = {"frame": frame}
+        for phase in self.totals:
+            row[f"{phase}_ms"] = round(self.frame_times.get(phase, 0.0) * 1000, 4)
+        row.update(simulation.counters())
+        self.frame_times.clear()
+        self.frame_count += 1
+
+        if self.file is None:
+            return
+        if self.format == "jsonl":
+            self.file.write(json.dumps(row) + "\n")
+        else:
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.file, fieldnames=list(row))
+                self.csv_writer.writeheader()
+            self.csv_writer.writerow(row)
+
+    # Total seconds per phase, slowest first, as printable lines
+    def summary(self) -> str:
+        total = sum(self.totals.values()) or 1.0
+        lines = [f"{self.frame_count} frames"]
+        for phase, seconds in sorted(self.totals.items(), key=lambda item: -item[1]):
+            lines.append(
+                f"{phase:>12}: {seconds:8.3f}s ({100 * seconds / total:5.1f}%)"
+            )
+        return "\n".join(lines)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
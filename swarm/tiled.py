@@ -0,0 +1,584 @@
+import math
+import multiprocessing
+import os
+import threading
+import weakref
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from . import config
+from .vectorized import (
+    LEAVING_HIVE,
+    NO_FLOWER,
+    RETURNING_TO_HIVE,
+    SWARMING,
+    VectorizedSimulation,
+    forward_rotations,
+    lowest_score_within,
+    normalize_rows,
+)
+
+# Seconds between checks that the workers are still running while the main
+# process waits for them to finish a frame
+WORKER_POLL_INTERVAL = 0.5
+
+# Longest time in seconds a frame may take before the simulation gives up
+FRAME_TIMEOUT = 600
+
+
+# Width of the band around each tile in which a worker also sees the bees and
+# flowers of its neighbours. Everything a bee in the tile can sense is within
+# this distance of it
+def ghost_width() -> float:
+    return max(config.COGNITION_RANGE, config.SOCIAL_RANGE)
+
+
+# Columns and rows of tiles for a number of workers, as close to square as
+# the count allows
+def tile_grid(workers: int) -> tuple[int, int]:
+    columns = max(
+        divisor
+        for divisor in range(1, math.isqrt(workers) + 1)
+        if workers % divisor == 0
+    )
+    return columns, workers // columns
+
+
+# Dtype and shape of every array the tiles share, for the given numbers of
+# bees, flowers and tiles
+def shared_fields(bees: int, flowers: int, tiles: int) -> dict[str, tuple]:
+    return {
+        # Bee state, as in VectorizedSimulation, plus the hive of each bee and
+        # the tile that owns it
+        "positions": (np.float64, (bees, 3)),
+        "velocities": (np.float64, (bees, 3)),
+        "rotations": (np.float64, (bees, 4)),
+        "homes": (np.float64, (bees, 3)),
+        "actions": (np.int8, (bees,)),
+        "is_attached": (np.bool_, (bees,)),
+        "is_returned_to_hive": (np.bool_, (bees,)),
+        "personal_best": (np.float64, (bees,)),
+        "personal_best_flower": (np.int64, (bees,)),
+        "global_best": (np.float64, (bees,)),
+        "global_best_flower": (np.int64, (bees,)),
+        "moved": (np.bool_, (bees,)),
+        "turned": (np.bool_, (bees,)),
+        "owners": (np.int64, (bees,)),
+        # Back buffer the tiles write during a frame while every tile reads
+        # the state above, and the flower requests they settle
+        "next_personal_best": (np.float64, (bees,)),
+        "next_personal_best_flower": (np.int64, (bees,)),
+        "next_global_best": (np.float64, (bees,)),
+        "next_global_best_flower": (np.int64, (bees,)),
+        "next_attached": (np.bool_, (bees,)),
+        "detached_flowers": (np.int64, (bees,)),
+        "wanted_flowers": (np.int64, (bees,)),
+        "admitted": (np.bool_, (bees,)),
+        "rejected": (np.bool_, (bees,)),
+        # Flower state and the tile that owns each flower
+        "pods": (np.float64, (flowers, 3)),
+        "pollinated": (np.bool_, (flowers,)),
+        "pollination_counts": (np.int64, (flowers,)),
+        "nearby_bees_counts": (np.int64, (flowers,)),
+        "flower_owners": (np.int64, (flowers,)),
+        # Distance checks each tile made in the last frame
+        "tile_neighbor_checks": (np.int64, (tiles,)),
+    }
+
+
+# Lay arrays out back to back in a block of shared memory, 8-byte aligned.
+# Returns the arrays by name
+def shared_arrays(memory: SharedMemory, fields: dict[str, tuple]) -> dict:
+    arrays, offset = {}, 0
+    for name, (dtype, shape) in fields.items():
+        arrays[name] = np.ndarray(shape, dtype, buffer=memory.buf, offset=offset)
+        offset = (offset + arrays[name].nbytes + 7) // 8 * 8
+    return arrays
+
+
+# Bytes of shared memory the arrays need
+def shared_size(fields: dict[str, tuple]) -> int:
+    size = 0
+    for dtype, shape in fields.values():
+        size = (size + int(np.prod(shape)) * np.dtype(dtype).itemsize + 7) // 8 * 8
+    return max(size, 1)
+
+
+# Spatial tiling of the x-y extent of the bee position bounds
+class Tiling:
+    def __init__(self, lower: np.ndarray, upper: np.ndarray, workers: int):
+        self.columns, self.rows = tile_grid(workers)
+        self.lower = lower[:2]
+        self.size = (upper[:2] - lower[:2]) / (self.columns, self.rows)
+
+    @property
+    def count(self) -> int:
+        return self.columns * self.rows
+
+    # Tile that owns each of a set of positions
+    def tile_of(self, positions: np.ndarray) -> np.ndarray:
+        cells = np.floor((positions[:, :2] - self.lower) / self.size).astype(np.int64)
+        columns = np.clip(cells[:, 0], 0, self.columns - 1)
+        rows = np.clip(cells[:, 1], 0, self.rows - 1)
+        return rows * self.columns + columns
+
+    # Which of a set of positions lie in a tile or within margin of it
+    def near(self, tile: int, positions: np.ndarray, margin: float) -> np.ndarray:
+        low = self.lower + self.size * (tile % self.columns, tile // self.columns)
+        high = low + self.size
+        xy = positions[:, :2]
+        return np.all((xy >= low - margin) & (xy <= high + margin), axis=1)
+
+
+# Multi-process bee swarm simulation for fields far bigger than one process
+# can step. The field is split into tiles, each stepped by a worker process
+# with the NumPy rules of VectorizedSimulation. The swarm state lives in
+# shared memory, so nothing is pickled per frame: every worker reads the
+# bees and flowers in a ghost band around its tile straight from the shared
+# arrays, and a bee migrates by having its owning tile rewritten when it
+# crosses a border. All bees read the swarm as it was at the start of the
+# frame, and each flower's owner admits bees to it in order of their index,
+# so the result doesn't depend on the number of workers apart from the
+# random numbers each tile draws. Several hives may be given, and the bees
+# are spread over them. The workers are stopped by close(), or when the
+# simulation is garbage collected
+class TiledSimulation(VectorizedSimulation):
+    def __init__(
+        self,
+        hive_location: Iterable,
+        pod_positions: Iterable[Iterable[float]],
+        bee_count: int,
+        rng: Optional[Union[np.random.Generator, int]] = None,
+        workers: int = None,
+    ):
+        self.rng = np.random.default_rng(rng)
+        hives = np.asarray(hive_location, dtype=float).reshape(-1, 3)
+        self.hive = hives[0]
+        bounds = config.bee_position_bounds(hives[:, 2].max())
+        self.lower = np.array([bounds[axis][0] for axis in "xyz"], dtype=float)
+        self.upper = np.array([bounds[axis][1] for axis in "xyz"], dtype=float)
+        self.tiling = Tiling(self.lower, self.upper, workers or os.cpu_count() or 1)
+        self.frame = 0
+
+        pods = np.asarray(pod_positions, dtype=float).reshape(-1, 3)
+        fields = shared_fields(bee_count, len(pods), self.tiling.count)
+        self.memory = SharedMemory(create=True, size=shared_size(fields))
+        self.__dict__.update(shared_arrays(self.memory, fields))
+
+        # Flower state
+        self.pods[:] = pods
+        self.flower_owners[:] = self.tiling.tile_of(pods)
+        self.reported_pollination = self.pollinated.copy()
+        self.events: list[tuple[int, bool]] = []
+
+        # Bee state
+        self.homes[:] = hives[np.arange(bee_count) % len(hives)]
+        self.positions[:] = self.homes + self.random_velocities(bee_count)
+        velocities = self.rng.uniform(
+            (-0.5, -0.5, -1), (0.5, 0.5, -0.5), size=(bee_count, 3)
+        )
+        self.velocities[:] = normalize_rows(velocities)[0]
+        self.rotations[:] = (1.0, 0.0, 0.0, 0.0)
+        self.actions[:] = LEAVING_HIVE
+        self.personal_best[:] = np.inf
+        self.personal_best_flower[:] = NO_FLOWER
+        self.global_best[:] = np.inf
+        self.global_best_flower[:] = NO_FLOWER
+        self.owners[:] = self.tiling.tile_of(self.positions)
+        self.neighbor_checks = 0
+
+        # Workers wait at the frame barrier for the main process to set the
+        # frame, and meet there again once it is done. A negative frame
+        # stops them
+        context = multiprocessing.get_context("spawn")
+        self.next_frame = context.Value("q", 0, lock=False)
+        self.frame_barrier = context.Barrier(self.tiling.count + 1)
+        self.phase_barrier = context.Barrier(self.tiling.count)
+        constants = config.snapshot()
+        seed = int(self.rng.integers(2**63))
+        self.workers = [
+            context.Process(
+                target=run_tile,
+                args=(
+                    self.memory.name,
+                    fields,
+                    tile,
+                    (self.lower, self.upper, self.tiling.count),
+                    seed,
+                    constants,
+                    self.next_frame,
+                    self.frame_barrier,
+                    self.phase_barrier,
+                ),
+                daemon=True,
+            )
+            for tile in range(self.tiling.count)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.finalizer = weakref.finalize(
+            self,
+            stop_workers,
+            self.workers,
+            self.next_frame,
+            self.frame_barrier,
+            self.memory,
+        )
+
+    # Advance the swarm to the given frame. Returns False while the swarm is
+    # still in its initial pause and nothing changed
+    def step(self, frame: int) -> bool:
+        self.frame = frame
+        self.neighbor_checks = 0
+
+        # Don't do anything if within the initial pause
+        if frame <= config.INITIAL_PAUSE_FRAMES:
+            return False
+
+        self.next_frame.value = frame
+        try:
+            self.wait_for_workers()
+            self.wait_for_workers()
+        except threading.BrokenBarrierError:
+            raise RuntimeError("A tile worker of the simulation failed") from None
+
+        self.neighbor_checks = int(self.tile_neighbor_checks.sum())
+        self.collect_flower_events()
+        return True
+
+    # Meet the workers at the frame barrier. The barrier is broken if a
+    # worker exits, e.g. because it failed to start or was killed, or if
+    # the frame takes longer than FRAME_TIMEOUT, so the main process never
+    # waits for a worker that is gone
+    def wait_for_workers(self):
+        done = threading.Event()
+
+        def watch():
+            while not done.wait(WORKER_POLL_INTERVAL):
+                if not all(worker.is_alive() for worker in self.workers):
+                    self.frame_barrier.abort()
+                    return
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        try:
+            self.frame_barrier.wait(FRAME_TIMEOUT)
+        finally:
+            done.set()
+            watcher.join()
+
+    # Stop the workers and free the shared memory. The state of the swarm
+    # is copied out first, so it can still be read afterwards
+    def close(self):
+        if not self.finalizer.alive:
+            return
+        fields = shared_fields(0, 0, 0)
+        for name in fields:
+            setattr(self, name, np.array(getattr(self, name)))
+        self.finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Stop the workers of a tiled simulation and free its shared memory
+def stop_workers(workers, next_frame, frame_barrier, memory: SharedMemory):
+    next_frame.value = -1
+    try:
+        frame_barrier.wait(timeout=10)
+    except threading.BrokenBarrierError:
+        pass
+    for worker in workers:
+        worker.join(timeout=10)
+        if worker.is_alive():
+            worker.terminate()
+
+    try:
+        memory.close()
+    except BufferError:
+        # Views of the arrays are still held somewhere. They stay valid
+        # until they are released, and unlinking only drops the name
+        pass
+    memory.unlink()
+
+
+# Entry point of a worker process, which steps one tile every frame until
+# the main process asks it to stop
+def run_tile(
+    memory_name: str,
+    fields: dict,
+    tile: int,
+    tiling: tuple,
+    seed: int,
+    constants: dict,
+    next_frame,
+    frame_barrier,
+    phase_barrier,
+):
+    vars(config).update(constants)
+    memory = SharedMemory(name=memory_name)
+    worker = None
+    try:
+        worker = TileWorker(memory, fields, tile, tiling, seed, phase_barrier)
+        while True:
+            frame_barrier.wait()
+            frame = next_frame.value
+            if frame < 0:
+                break
+            worker.step(frame)
+            frame_barrier.wait()
+    except BaseException:
+        # Wake up the main process and the other workers instead of leaving
+        # them waiting for this one
+        frame_barrier.abort()
+        phase_barrier.abort()
+        raise
+    finally:
+        worker = None
+        try:
+            memory.close()
+        except BufferError:
+            pass
+
+
+# One tile of a TiledSimulation, stepped in a worker process. Works on the
+# shared arrays with the rules of VectorizedSimulation, but only ever writes
+# the bees and flowers its tile owns, plus the answers to flower requests
+# made to its flowers. Phases are separated by a barrier between the tiles,
+# so no tile reads state that another tile is writing
+class TileWorker(VectorizedSimulation):
+    def __init__(
+        self,
+        memory: SharedMemory,
+        fields: dict,
+        tile: int,
+        tiling: tuple,
+        seed: int,
+        phase_barrier,
+    ):
+        self.__dict__.update(shared_arrays(memory, fields))
+        self.lower, self.upper, workers = tiling
+        self.tiling = Tiling(self.lower, self.upper, workers)
+        self.tile = tile
+        self.seed = seed
+        self.phase_barrier = phase_barrier
+
+        # Flowers the tile owns, and the flowers its bees can sense
+        self.owned_flowers = self.flower_owners == tile
+        self.local_flowers = self.tiling.near(tile, self.pods, ghost_width())
+
+    # Advance the tile to the given frame
+    def step(self, frame: int):
+        self.frame = frame
+        self.rng = np.random.default_rng([self.seed, frame, self.tile])
+        owned = np.flatnonzero(self.owners == self.tile)
+
+        self.perceive(owned)
+        self.phase_barrier.wait()
+        self.arbitrate()
+        self.phase_barrier.wait()
+        self.commit(owned)
+        self.move(owned)
+        self.transition_actions(frame, owned)
+
+        # Bees that crossed a border migrate to the tile they are now in
+        self.owners[owned] = self.tiling.tile_of(self.positions[owned])
+
+    # Pick the flowers of the swarming bees the tile owns and let them
+    # listen to the bees around them, writing the results to the back buffer
+    def perceive(self, owned: np.ndarray):
+        max_bees = config.MAX_NEARBY_BEES
+        self.next_personal_best[owned] = self.personal_best[owned]
+        self.next_personal_best_flower[owned] = self.personal_best_flower[owned]
+        self.next_global_best[owned] = self.global_best[owned]
+        self.next_global_best_flower[owned] = self.global_best_flower[owned]
+        self.next_attached[owned] = self.is_attached[owned]
+        self.detached_flowers[owned] = NO_FLOWER
+        self.wanted_flowers[owned] = NO_FLOWER
+        self.admitted[owned] = False
+        self.rejected[owned] = False
+        self.tile_neighbor_checks[self.tile] = 0
+
+        bees = owned[self.actions[owned] == SWARMING]
+        if len(bees) == 0:
+            return
+
+        # Search for the nearest flower and update personal bests
+        open_flowers = ~self.pollinated & (self.nearby_bees_counts < max_bees)
+        previous = self.personal_best_flower[bees]
+        cognition_flower, cognition = self.nearest_flowers(
+            self.positions[bees], open_flowers & self.local_flowers
+        )
+        improved = cognition < self.personal_best[bees]
+        self.next_personal_best[bees[improved]] = cognition[improved]
+        self.next_personal_best_flower[bees[improved]] = cognition_flower[improved]
+
+        # If a new best flower has been found, detach from the previous one.
+        # Bees close to a flower that isn't pollinated ask to pollinate it
+        best = self.next_personal_best_flower[bees]
+        has_best = best != NO_FLOWER
+        detaching = (
+            has_best
+            & (previous != NO_FLOWER)
+            & (best != previous)
+            & self.is_attached[bees]
+        )
+        self.next_attached[bees[detaching]] = False
+        self.detached_flowers[bees[detaching]] = previous[detaching]
+        wanting = (
+            has_best
+            & (self.next_personal_best[bees] <= config.FLOWER_POLLINATION_PROXIMITY)
+            & ~np.append(self.pollinated, True)[best]
+        )
+        self.wanted_flowers[bees[wanting]] = best[wanting]
+
+        # Score and flower each bee in or around the tile advertises, as in
+        # VectorizedSimulation.detect_nearby_bees
+        nearby = np.flatnonzero(
+            self.tiling.near(self.tile, self.positions, ghost_width())
+        )
+        open_flowers = np.append(open_flowers, False)
+        personal = open_flowers[self.personal_best_flower[nearby]]
+        global_ = open_flowers[self.global_best_flower[nearby]]
+        use_global = ~personal & global_
+        scores = config.SOCIAL_SCENT_COEFFICIENT * np.where(
+            personal,
+            self.personal_best[nearby],
+            np.where(use_global, self.global_best[nearby], np.inf),
+        )
+        flowers = np.where(
+            personal,
+            self.personal_best_flower[nearby],
+            np.where(use_global, self.global_best_flower[nearby], NO_FLOWER),
+        )
+
+        # Lowest advertised score around each bee, with bees numbered by
+        # their place in the nearby list
+        heard, checks = lowest_score_within(
+            np.searchsorted(nearby, bees),
+            np.flatnonzero(np.isfinite(scores)),
+            self.positions[nearby],
+            scores,
+            config.SOCIAL_RANGE,
+        )
+        self.tile_neighbor_checks[self.tile] = checks
+        sources, targets = bees[heard >= 0], heard[heard >= 0]
+
+        # Update global best if necessary
+        improved = scores[targets] < self.next_global_best[sources]
+        self.next_global_best[sources[improved]] = scores[targets[improved]]
+        self.next_global_best_flower[sources[improved]] = flowers[targets[improved]]
+
+        # Reset the global best if its flower is pollinated or full
+        best = self.next_global_best_flower[bees]
+        counts = np.append(self.nearby_bees_counts, 0)[best]
+        resetting = (best != NO_FLOWER) & (
+            np.append(self.pollinated, False)[best]
+            | ((counts >= max_bees) & ~self.next_attached[bees])
+        )
+        self.next_global_best[bees[resetting]] = np.inf
+        self.next_global_best_flower[bees[resetting]] = NO_FLOWER
+        self.next_attached[bees[resetting]] = False
+
+    # Settle the requests made to the flowers the tile owns, by bees of any
+    # tile. Bees that let go of a flower free their spots first. Attached
+    # bees keep theirs, and the other bees take the free spots around their
+    # flower in order of their index
+    def arbitrate(self):
+        max_bees = config.MAX_NEARBY_BEES
+        detaching = np.flatnonzero(self.detached_flowers != NO_FLOWER)
+        detached = self.detached_flowers[detaching]
+        np.subtract.at(
+            self.nearby_bees_counts, detached[self.owned_flowers[detached]], 1
+        )
+
+        wanting = np.flatnonzero(self.wanted_flowers != NO_FLOWER)
+        wanting = wanting[self.owned_flowers[self.wanted_flowers[wanting]]]
+        attached = self.next_attached[wanting]
+
+        joining = wanting[~attached]
+        joining = joining[np.argsort(self.wanted_flowers[joining], kind="stable")]
+        joining_flowers = self.wanted_flowers[joining]
+        group_starts = np.searchsorted(joining_flowers, joining_flowers, "left")
+        ranks = np.arange(len(joining)) - group_starts
+        admitted = ranks < (max_bees - self.nearby_bees_counts[joining_flowers])
+        np.add.at(self.nearby_bees_counts, joining_flowers[admitted], 1)
+        self.admitted[joining[admitted]] = True
+        self.rejected[joining[~admitted]] = True
+
+        pollinating = np.concatenate((wanting[attached], joining[admitted]))
+        np.add.at(self.pollination_counts, self.wanted_flowers[pollinating], 1)
+        self.pollinated[self.owned_flowers] |= (
+            self.pollination_counts[self.owned_flowers] >= config.POLLINATION_THRESHOLD
+        )
+
+    # Copy the back buffer of the bees the tile owns to the front, and
+    # reset the motive of swarming bees that were turned away, or whose
+    # flower became pollinated or full
+    def commit(self, owned: np.ndarray):
+        self.personal_best[owned] = self.next_personal_best[owned]
+        self.personal_best_flower[owned] = self.next_personal_best_flower[owned]
+        self.global_best[owned] = self.next_global_best[owned]
+        self.global_best_flower[owned] = self.next_global_best_flower[owned]
+        self.is_attached[owned] = self.next_attached[owned] | self.admitted[owned]
+
+        bees = owned[self.actions[owned] == SWARMING]
+        best = self.personal_best_flower[bees]
+        counts = np.append(self.nearby_bees_counts, 0)[best]
+        resetting = self.rejected[bees] | (
+            (best != NO_FLOWER)
+            & (
+                np.append(self.pollinated, False)[best]
+                | (~self.is_attached[bees] & (counts >= config.MAX_NEARBY_BEES))
+            )
+        )
+        self.reset_motive(bees[resetting])
+
+    # Update the location and rotation of the bees the tile owns
+    def move(self, owned: np.ndarray):
+
+        # Returning bees stop once they reach their hive
+        returning = self.actions[owned] == RETURNING_TO_HIVE
+        active = ~(returning & self.is_returned_to_hive[owned])
+        arrived = owned[returning & active]
+        self.is_returned_to_hive[arrived] = (
+            np.linalg.norm(self.positions[arrived] - self.homes[arrived], axis=1)
+            < config.HIVE_ARRIVAL_DISTANCE
+        )
+
+        movers = owned[active]
+        self.calculate_positions(movers)
+        self.handle_boundaries(movers)
+        self.moved[owned] = active
+        self.turned[owned] = active & (
+            np.linalg.norm(self.velocities[owned], axis=1) > 0
+        )
+        turned = owned[self.turned[owned]]
+        self.rotations[turned] = forward_rotations(self.velocities[turned])
+
+    def transition_actions(self, frame: int, owned: np.ndarray):
+        actions = self.actions[owned]
+        start = (frame >= config.START_SWARMING_FRAME) & (actions != SWARMING)
+        finish = (
+            ~start
+            & (config.FRAME_COUNT - frame <= config.RETURN_TO_HIVE_FRAME_REMAINDER)
+            & (actions != RETURNING_TO_HIVE)
+        )
+        transitioning = start | finish
+        leaving = owned[transitioning & (actions == LEAVING_HIVE)]
+        returning = owned[transitioning & (actions == SWARMING)]
+
+        self.reset_motive(leaving)
+        self.actions[leaving] = SWARMING
+
+        self.reset_personal_best(returning)
+        self.reset_global_best(returning)
+        self.velocities[returning] = normalize_rows(
+            self.homes[returning] - self.positions[returning]
+        )[0]
+        self.actions[returning] = RETURNING_TO_HIVE
@@ -0,0 +1,105 @@
+import math
+
+
+# Minimal stand-in for mathutils.Vector so the simulation can run without
+# Blender. Only the operations used by the swarm rules are implemented
+class Vector:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        self.x, self.y, self.z = (float(v) for v in values)
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+        yield self.z
+
+    def __getitem__(self, index: int) -> float:
+        return (self.x, self.y, self.z)[index]
+
+    def __len__(self) -> int:
+        return 3
+
+    def __repr__(self) -> str:
+        return f"Vector(({self.x:.4f}, {self.y:.4f}, {self.z:.4f}))"
+
+    def __eq__(self, other) -> bool:
+        return tuple(self) == tuple(other)
+
+    def __add__(self, other) -> "Vector":
+        return Vector((self.x + other[0], self.y + other[1], self.z + other[2]))
+
+    def __sub__(self, other) -> "Vector":
+        return Vector((self.x - other[0], self.y - other[1], self.z - other[2]))
+
+    def __rsub__(self, other) -> "Vector":
+        return Vector((other[0] - self.x, other[1] - self.y, other[2] - self.z))
+
+    def __iadd__(self, other) -> "Vector":
+        self.x += other[0]
+        self.y += other[1]
+        self.z += other[2]
+        return self
+
+    def __mul__(self, scalar: float) -> "Vector":
+        return Vector((self.x * scalar, self.y * scalar, self.z * scalar))
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> "Vector":
+        return Vector((-self.x, -self.y, -self.z))
+
+    def copy(self) -> "Vector":
+        return Vector((self.x, self.y, self.z))
+
+    @property
+    def magnitude(self) -> float:
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    length = magnitude
+
+    def normalized(self) -> "Vector":
+        magnitude = self.magnitude
+        if magnitude == 0:
+            return Vector()
+        return self * (1 / magnitude)
+
+    def dot(self, other) -> float:
+        return self.x * other[0] + self.y * other[1] + self.z * other[2]
+
+    def cross(self, other) -> "Vector":
+        return Vector(
+            (
+                self.y * other[2] - self.z * other[1],
+                self.z * other[0] - self.x * other[2],
+                self.x * other[1] - self.y * other[0],
+            )
+        )
+
+    # Rotate around a unit axis by an angle in radians (Rodrigues' formula)
+    def rotated(self, axis: "Vector", angle: float) -> "Vector":
+        cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+        return (
+            self * cos_angle
+            + axis.cross(self) * sin_angle
+            + axis * (axis.dot(self) * (1 - cos_angle))
+        )
+
+    # Quaternion (w, x, y, z) rotating this vector onto another one, matching
+    # mathutils.Vector.rotation_difference
+    def rotation_difference(self, other) -> tuple[float, float, float, float]:
+        a, b = self.normalized(), Vector(other).normalized()
+        w = 1 + a.dot(b)
+
+        # Opposite vectors have no unique axis, so turn half way around any
+        # axis perpendicular to this one
+        if w < 1e-6:
+            axis = a.cross((0, 0, 1))
+            if axis.magnitude < 1e-6:
+                axis = a.cross((0, 1, 0))
+            axis = axis.normalized()
+            return (0.0, axis.x, axis.y, axis.z)
+
+        axis = a.cross(b)
+        norm = math.sqrt(w * w + axis.dot(axis))
+        return (w / norm, axis.x / norm, axis.y / norm, axis.z / norm)
@@ -0,0 +1,510 @@
+import math
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from . import config
+from .state import LEAVING_HIVE, RETURNING_TO_HIVE, SWARMING
+
+# Index used when a bee has no flower
+NO_FLOWER = -1
+
+# Number of bees whose flower distances are computed at once, which bounds
+# the size of the temporary bees x flowers distance matrix
+FLOWER_QUERY_CHUNK = 4096
+
+
+# Normalize each row of an N x 3 array, leaving zero rows at zero
+def normalize_rows(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    norms = np.linalg.norm(vectors, axis=1)
+    safe = np.where(norms > 0, norms, 1.0)
+    return vectors / safe[:, None], norms
+
+
+# Quaternions (w, x, y, z) rotating the +X axis onto each row of directions
+def forward_rotations(directions: np.ndarray) -> np.ndarray:
+    unit, _ = normalize_rows(directions)
+    quats = np.empty((len(unit), 4))
+    quats[:, 0] = 1 + unit[:, 0]
+    quats[:, 1] = 0
+    quats[:, 2] = -unit[:, 2]
+    quats[:, 3] = unit[:, 1]
+
+    # Bees flying straight backwards turn half way around the Y axis
+    opposite = quats[:, 0] < 1e-6
+    quats[opposite] = (0.0, 0.0, -1.0, 0.0)
+    return quats / np.linalg.norm(quats, axis=1)[:, None]
+
+
+# For each listener, the advertiser with the lowest score within radius of
+# it, or -1 if there is none, and the number of distance checks made.
+# Advertisers are bucketed into a grid of radius-sized cells and sorted by
+# score within each cell, so each listener only walks the adjacent cells
+# until it meets the first one in range, rather than comparing every pair
+# of bees
+def lowest_score_within(
+    listeners: np.ndarray,
+    advertisers: np.ndarray,
+    positions: np.ndarray,
+    scores: np.ndarray,
+    radius: float,
+) -> tuple[np.ndarray, int]:
+    best = np.full(len(listeners), -1, dtype=np.int64)
+    checks = 0
+    if len(listeners) == 0 or len(advertisers) == 0:
+        return best, checks
+
+    cells = np.floor(positions / radius).astype(np.int64)
+    low = cells.min(axis=0) - 1
+    extent = cells.max(axis=0) - low + 2
+
+    def cell_keys(c):
+        c = c - low
+        return (c[:, 0] * extent[1] + c[:, 1]) * extent[2] + c[:, 2]
+
+    advertiser_keys = cell_keys(cells[advertisers])
+    order = np.lexsort((scores[advertisers], advertiser_keys))
+    advertisers, advertiser_keys = advertisers[order], advertiser_keys[order]
+    best_scores = np.full(len(listeners), np.inf)
+    radius_squared = radius * radius
+    listener_cells = cells[listeners]
+
+    for offset in np.ndindex(3, 3, 3):
+        keys = cell_keys(listener_cells + (np.array(offset) - 1))
+        cursor = np.searchsorted(advertiser_keys, keys, "left")
+        end = np.searchsorted(advertiser_keys, keys, "right")
+        waiting = np.flatnonzero(cursor < end)
+
+        # Walk through each cell in score order, a growing block of bees at a
+        # time, until a bee in range is found or the remaining scores can't
+        # beat the best one so far
+        block = 4
+        while len(waiting):
+            steps = np.arange(block)
+            slots = cursor[waiting, None] + steps
+            inside = slots < end[waiting, None]
+            candidates = advertisers[np.where(inside, slots, cursor[waiting, None])]
+            candidate_scores = scores[candidates]
+            beaten = candidate_scores >= best_scores[waiting, None]
+            offsets = positions[candidates] - positions[listeners[waiting], None]
+            valid = (
+                inside
+                & ~beaten
+                & (np.einsum("ijk,ijk->ij", offsets, offsets) <= radius_squared)
+                & (candidates != listeners[waiting, None])
+            )
+            checks += int(inside.sum())
+            found = valid.any(axis=1)
+            first = np.argmax(valid, axis=1)[found]
+            best[waiting[found]] = candidates[found, first]
+            best_scores[waiting[found]] = candidate_scores[found, first]
+
+            cursor[waiting] += block
+            done = (
+                found
+                | (beaten & inside).any(axis=1)
+                | (cursor[waiting] >= end[waiting])
+            )
+            waiting = waiting[~done]
+            block = min(block * 2, 64)
+
+    return best, checks
+
+
+# Batched bee swarm simulation. Bees are stored as struct-of-arrays and every
+# PSO rule is applied to the whole swarm with NumPy operations. All bees read
+# the state of the swarm at the start of the frame, and bees competing for
+# the last free spots around a flower are admitted in order of their index.
+# Results match Simulation statistically rather than bee for bee
+class VectorizedSimulation:
+    def __init__(
+        self,
+        hive_location: Iterable[float],
+        pod_positions: Iterable[Iterable[float]],
+        bee_count: int,
+        rng: Optional[Union[np.random.Generator, int]] = None,
+    ):
+        self.rng = np.random.default_rng(rng)
+        self.hive = np.asarray(hive_location, dtype=float)
+        self.follow_constants()
+        self.frame = 0
+
+        # Flower state
+        self.pods = np.asarray(pod_positions, dtype=float).reshape(-1, 3)
+        flower_count = len(self.pods)
+        self.pollinated = np.zeros(flower_count, dtype=bool)
+        self.pollination_counts = np.zeros(flower_count, dtype=np.int64)
+        self.nearby_bees_counts = np.zeros(flower_count, dtype=np.int64)
+        self.reported_pollination = self.pollinated.copy()
+        self.events: list[tuple[int, bool]] = []
+
+        # Bee state
+        self.positions = self.hive + self.random_velocities(bee_count)
+        velocities = self.rng.uniform(
+            (-0.5, -0.5, -1), (0.5, 0.5, -0.5), size=(bee_count, 3)
+        )
+        self.velocities, _ = normalize_rows(velocities)
+        self.rotations = np.tile((1.0, 0.0, 0.0, 0.0), (bee_count, 1))
+        self.actions = np.full(bee_count, LEAVING_HIVE, dtype=np.int8)
+        self.is_attached = np.zeros(bee_count, dtype=bool)
+        self.is_returned_to_hive = np.zeros(bee_count, dtype=bool)
+        self.personal_best = np.full(bee_count, np.inf)
+        self.personal_best_flower = np.full(bee_count, NO_FLOWER, dtype=np.int64)
+        self.global_best = np.full(bee_count, np.inf)
+        self.global_best_flower = np.full(bee_count, NO_FLOWER, dtype=np.int64)
+
+        # Whether the last step moved or turned each bee
+        self.moved = np.zeros(bee_count, dtype=bool)
+        self.turned = np.zeros(bee_count, dtype=bool)
+
+        # Number of bee to bee distance checks made in the current step
+        self.neighbor_checks = 0
+
+    # Recompute the bounds from the constants, so that changes to them, e.g.
+    # in a live preview, apply from the next frame. Ranges are read from
+    # config whenever they are used
+    def follow_constants(self):
+        bounds = config.bee_position_bounds(self.hive[2])
+        self.lower = np.array([bounds[axis][0] for axis in "xyz"], dtype=float)
+        self.upper = np.array([bounds[axis][1] for axis in "xyz"], dtype=float)
+
+    @property
+    def bee_count(self) -> int:
+        return len(self.positions)
+
+    # Random unit vectors, one per row
+    def random_velocities(self, count: int) -> np.ndarray:
+        return normalize_rows(self.rng.uniform(-1, 1, size=(count, 3)))[0]
+
+    # Advance the swarm to the given frame. Returns False while the swarm is
+    # still in its initial pause and nothing changed
+    def step(self, frame: int) -> bool:
+        self.frame = frame
+        self.neighbor_checks = 0
+
+        # Don't do anything if within the initial pause
+        if frame <= config.INITIAL_PAUSE_FRAMES:
+            return False
+
+        self.follow_constants()
+
+        # Returning bees stop once they reach the hive
+        returning = self.actions == RETURNING_TO_HIVE
+        active = ~(returning & self.is_returned_to_hive)
+        arrived = returning & active
+        arrived[arrived] = (
+            np.linalg.norm(self.positions[arrived] - self.hive, axis=1)
+            < config.HIVE_ARRIVAL_DISTANCE
+        )
+        self.is_returned_to_hive |= arrived
+
+        # If swarming, detect nearby flowers and bees
+        swarming = np.flatnonzero(self.actions == SWARMING)
+        if len(swarming):
+            self.pollinate_nearby_flowers(swarming)
+            self.detect_nearby_bees(swarming)
+
+        # Update location and rotation
+        movers = np.flatnonzero(active)
+        self.calculate_positions(movers)
+        self.handle_boundaries(movers)
+        self.moved[:] = active
+        self.turned[:] = active & (np.linalg.norm(self.velocities, axis=1) > 0)
+        self.rotations[self.turned] = forward_rotations(self.velocities[self.turned])
+
+        self.transition_actions(frame)
+        self.collect_flower_events()
+        return True
+
+    # Step through every frame of the animation, yielding each frame in which
+    # the swarm changed
+    def run(self, start: int = 1, stop: int = None):
+        stop = config.FRAME_COUNT if stop is None else stop
+        for frame in range(start, stop, config.FRAME_STEP):
+            if self.step(frame):
+                yield frame
+
+    # Frames that run() will yield, i.e. every frame after the initial pause
+    def frames(self, start: int = 1, stop: int = None) -> list[int]:
+        stop = config.FRAME_COUNT if stop is None else stop
+        return [
+            frame
+            for frame in range(start, stop, config.FRAME_STEP)
+            if frame > config.INITIAL_PAUSE_FRAMES
+        ]
+
+    # Current location of every bee
+    def bee_locations(self) -> np.ndarray:
+        return self.positions
+
+    # Current rotation of every bee
+    def bee_rotations(self) -> np.ndarray:
+        return self.rotations
+
+    # Location and rotation to keyframe for every bee in the last step, None
+    # where the bee did not move or turn
+    def bee_transforms(self):
+        for index in range(self.bee_count):
+            yield (
+                self.positions[index] if self.moved[index] else None,
+                self.rotations[index] if self.turned[index] else None,
+            )
+
+    # Pollination state of every flower
+    def pollinated_flowers(self) -> list[bool]:
+        return self.pollinated.tolist()
+
+    # Counts describing the state of the swarm after the last step
+    def counters(self) -> dict[str, int]:
+        return {
+            "bees_swarming": int((self.actions == SWARMING).sum()),
+            "bees_attached": int(self.is_attached.sum()),
+            "bees_returned": int(self.is_returned_to_hive.sum()),
+            "flowers_pollinated": int(self.pollinated.sum()),
+            "neighbor_checks": self.neighbor_checks,
+        }
+
+    # Flowers whose pollination state flipped in the last step, as
+    # (flower id, is_pollinated) pairs in flower order
+    def flower_events(self) -> list[tuple[int, bool]]:
+        return self.events
+
+    def collect_flower_events(self):
+        changed = np.flatnonzero(self.pollinated != self.reported_pollination)
+        self.reported_pollination[changed] = self.pollinated[changed]
+        self.events = [(int(id), bool(self.pollinated[id])) for id in changed]
+
+    def transition_actions(self, frame: int):
+        start = (frame >= config.START_SWARMING_FRAME) & (self.actions != SWARMING)
+        finish = (
+            ~start
+            & (config.FRAME_COUNT - frame <= config.RETURN_TO_HIVE_FRAME_REMAINDER)
+            & (self.actions != RETURNING_TO_HIVE)
+        )
+        transitioning = start | finish
+
+        leaving = np.flatnonzero(transitioning & (self.actions == LEAVING_HIVE))
+        self.reset_motive(leaving)
+        self.actions[leaving] = SWARMING
+
+        returning = np.flatnonzero(transitioning & (self.actions == SWARMING))
+        returning = returning[~np.isin(returning, leaving)]
+        self.reset_personal_best(returning)
+        self.reset_global_best(returning)
+        self.velocities[returning] = normalize_rows(
+            self.hive - self.positions[returning]
+        )[0]
+        self.actions[returning] = RETURNING_TO_HIVE
+
+    # Set personal best to default value
+    def reset_personal_best(self, bees: np.ndarray):
+        self.is_attached[bees] = False
+        self.personal_best[bees] = np.inf
+        self.personal_best_flower[bees] = NO_FLOWER
+
+    # Set global best to default value
+    def reset_global_best(self, bees: np.ndarray):
+        self.is_attached[bees] = False
+        self.global_best[bees] = np.inf
+        self.global_best_flower[bees] = NO_FLOWER
+
+    # Reset the current target of the bees
+    def reset_motive(self, bees: np.ndarray):
+        self.reset_personal_best(bees)
+        self.velocities[bees] = self.random_velocities(len(bees))
+
+    # Nearest available flower within COGNITION_RANGE of each position, and
+    # its distance. Bees without one get NO_FLOWER and infinity
+    def nearest_flowers(
+        self, positions: np.ndarray, available: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        nearest = np.full(len(positions), NO_FLOWER, dtype=np.int64)
+        distances = np.full(len(positions), np.inf)
+        candidates = np.flatnonzero(available)
+        if len(candidates) == 0:
+            return nearest, distances
+
+        pods = self.pods[candidates]
+        for start in range(0, len(positions), FLOWER_QUERY_CHUNK):
+            chunk = slice(start, start + FLOWER_QUERY_CHUNK)
+            offsets = positions[chunk, None, :] - pods[None, :, :]
+            chunk_distances = np.linalg.norm(offsets, axis=2)
+            closest = np.argmin(chunk_distances, axis=1)
+            closest_distances = chunk_distances[np.arange(len(closest)), closest]
+            in_range = closest_distances <= config.COGNITION_RANGE
+            nearest[chunk] = np.where(in_range, candidates[closest], NO_FLOWER)
+            distances[chunk] = np.where(in_range, closest_distances, np.inf)
+        return nearest, distances
+
+    # Attempt to pollinate nearby flowers
+    def pollinate_nearby_flowers(self, bees: np.ndarray):
+        max_bees = config.MAX_NEARBY_BEES
+
+        # Search for the nearest flower and update personal bests
+        previous = self.personal_best_flower[bees]
+        available = ~self.pollinated & (self.nearby_bees_counts < max_bees)
+        cognition_flower, cognition = self.nearest_flowers(
+            self.positions[bees], available
+        )
+        improved = cognition < self.personal_best[bees]
+        self.personal_best[bees[improved]] = cognition[improved]
+        self.personal_best_flower[bees[improved]] = cognition_flower[improved]
+
+        # No need to continue for bees without a personal best
+        has_best = self.personal_best_flower[bees] != NO_FLOWER
+        bees, previous = bees[has_best], previous[has_best]
+        best = self.personal_best_flower[bees]
+
+        # If a new best flower has been found, detach from the previous one
+        detaching = (
+            (previous != NO_FLOWER) & (best != previous) & self.is_attached[bees]
+        )
+        self.is_attached[bees[detaching]] = False
+        np.subtract.at(self.nearby_bees_counts, previous[detaching], 1)
+
+        # Handle pollinating a personal best
+        close = (self.personal_best[bees] <= config.FLOWER_POLLINATION_PROXIMITY) & (
+            ~self.pollinated[best]
+        )
+        attached = close & self.is_attached[bees]
+
+        # Bees that aren't attached yet take the free spots around their
+        # flower in order of their index. The rest must find a new flower
+        joining = np.flatnonzero(close & ~self.is_attached[bees])
+        joining = joining[np.argsort(best[joining], kind="stable")]
+        joining_flowers = best[joining]
+        group_starts = np.searchsorted(joining_flowers, joining_flowers, "left")
+        ranks = np.arange(len(joining)) - group_starts
+        admitted = ranks < (max_bees - self.nearby_bees_counts[joining_flowers])
+        np.add.at(self.nearby_bees_counts, joining_flowers[admitted], 1)
+        self.is_attached[bees[joining[admitted]]] = True
+
+        pollinating = attached.copy()
+        pollinating[joining[admitted]] = True
+        np.add.at(self.pollination_counts, best[pollinating], 1)
+        self.pollinated |= self.pollination_counts >= config.POLLINATION_THRESHOLD
+
+        # Reset the bee's motive if it was turned away, the flower becomes
+        # pollinated or its personal best flower is full
+        rejected = np.zeros(len(bees), dtype=bool)
+        rejected[joining[~admitted]] = True
+        resetting = (
+            rejected
+            | self.pollinated[best]
+            | (~self.is_attached[bees] & (self.nearby_bees_counts[best] >= max_bees))
+        )
+        self.reset_motive(bees[resetting])
+
+    # Process communication from nearby bees. Each bee adopts the lowest
+    # score advertised by the bees within SOCIAL_RANGE of it, where a bee
+    # advertises its personal best, or its global best if it has none
+    def detect_nearby_bees(self, bees: np.ndarray):
+        max_bees = config.MAX_NEARBY_BEES
+        open_flowers = np.append(
+            ~self.pollinated & (self.nearby_bees_counts < max_bees), False
+        )
+
+        # Score and flower each bee advertises, infinity for none
+        personal = open_flowers[self.personal_best_flower]
+        global_ = open_flowers[self.global_best_flower]
+        use_global = ~personal & global_
+        scores = np.where(
+            personal,
+            self.personal_best,
+            np.where(use_global, self.global_best, np.inf),
+        )
+        flowers = np.where(
+            personal,
+            self.personal_best_flower,
+            np.where(use_global, self.global_best_flower, NO_FLOWER),
+        )
+        scores = config.SOCIAL_SCENT_COEFFICIENT * scores
+
+        # Lowest advertised score around each bee
+        advertisers = np.flatnonzero(np.isfinite(scores))
+        best, checks = lowest_score_within(
+            bees, advertisers, self.positions, scores, config.SOCIAL_RANGE
+        )
+        self.neighbor_checks += checks
+        sources, targets = bees[best >= 0], best[best >= 0]
+
+        # Update global best if necessary
+        improved = scores[targets] < self.global_best[sources]
+        self.global_best[sources[improved]] = scores[targets[improved]]
+        self.global_best_flower[sources[improved]] = flowers[targets[improved]]
+
+        # Reset the global best if its flower becomes pollinated or full
+        best = self.global_best_flower[bees]
+        has_best = best != NO_FLOWER
+        resetting = has_best & (
+            self.pollinated[best]
+            | ((self.nearby_bees_counts[best] >= max_bees) & ~self.is_attached[bees])
+        )
+        self.reset_global_best(bees[resetting])
+
+    # Set positions based on PSO behavior
+    def calculate_positions(self, bees: np.ndarray):
+        velocities = self.velocities[bees]
+        current_direction, speeds = normalize_rows(velocities)
+        moving = speeds > 0
+        bees, velocities = bees[moving], velocities[moving]
+        current_direction = current_direction[moving]
+        positions = self.positions[bees]
+
+        r = self.rng.random((len(bees), 2))
+        new_velocities = velocities * config.INERTIA
+
+        # Add cognitive component
+        personal = self.personal_best_flower[bees]
+        has_personal = personal != NO_FLOWER
+        new_velocities[has_personal] += (
+            config.COGNITION
+            * r[has_personal, :1]
+            * (self.pods[personal[has_personal]] - positions[has_personal])
+        )
+
+        # Add social component
+        global_ = self.global_best_flower[bees]
+        has_global = global_ != NO_FLOWER
+        new_velocities[has_global] += (
+            config.SOCIAL
+            * r[has_global, 1:]
+            * (self.pods[global_[has_global]] - positions[has_global])
+        )
+
+        # Limit the turning radius with a Rodrigues rotation of the current
+        # direction towards the desired one
+        if config.MAX_TURNING_RADIUS is not None:
+            limit = math.radians(config.MAX_TURNING_RADIUS)
+            desired_direction, new_speeds = normalize_rows(new_velocities)
+            cosines = np.clip(
+                np.einsum("ij,ij->i", current_direction, desired_direction), -1, 1
+            )
+            turning = np.arccos(cosines) > limit
+            if turning.any():
+                current = current_direction[turning]
+                axes, _ = normalize_rows(np.cross(current, desired_direction[turning]))
+                limited = (
+                    current * math.cos(limit)
+                    + np.cross(axes, current) * math.sin(limit)
+                    + axes
+                    * np.einsum("ij,ij->i", axes, current)[:, None]
+                    * (1 - math.cos(limit))
+                )
+                new_velocities[turning] = (
+                    limited * np.minimum(new_speeds[turning], config.BEE_SPEED)[:, None]
+                )
+
+        self.velocities[bees] = normalize_rows(new_velocities)[0]
+        self.positions[bees] += self.velocities[bees] * config.BEE_SPEED
+
+    # Bounce off of walls based on Bee position bounds
+    def handle_boundaries(self, bees: np.ndarray):
+        positions = self.positions[bees]
+        below = positions <= self.lower
+        above = ~below & (positions >= self.upper)
+        positions = np.clip(positions, self.lower, self.upper)
+        self.positions[bees] = positions
+        self.velocities[bees] = np.where(
+            below | above, -self.velocities[bees], self.velocities[bees]
+        )
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+# Make the swarm and benchmarks packages importable wherever pytest is run
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fake_bpy  # noqa: E402
+from swarm import config  # noqa: E402
+
+# Modules that import bpy keep the module they got, so the stand-in is
+# installed once and emptied before every test
+fake_bpy.install()
+
+from swarm.blender.fcurves import read_keyframes  # noqa: E402
+
+# Frames simulated by the bakes in the tests after the initial pause, enough
+# for the bees to swarm and head back to the hive
+FRAME_COUNT = 400
+
+
+@pytest.fixture(autouse=True)
+def bpy():
+    return fake_bpy.install()
+
+
+# A small scene of bees and flowers, with a short animation
+@pytest.fixture
+def scene(bpy):
+    with config.overridden(MINIMUM_FRAME_COUNT=FRAME_COUNT):
+        fake_bpy.build_scene(12, 5, 0)
+        yield bpy.context.scene
+
+
+# Reads the frames and values of every F-curve in the file, by the name of
+# the object or material animated, data path and index
+@pytest.fixture
+def keyframes(bpy):
+    def read() -> dict:
+        datablocks = [(obj.name, obj) for obj in bpy.data.objects] + [
+            (material.name, material.node_tree)
+            for material in bpy.data.materials
+            if material.node_tree is not None
+        ]
+        curves = {}
+        for name, id_data in datablocks:
+            if id_data.animation_data is None or id_data.animation_data.action is None:
+                continue
+            for fcurve in id_data.animation_data.action.fcurves:
+                frames, values = read_keyframes(fcurve)
+                curves[name, fcurve.data_path, fcurve.array_index] = (
+                    list(frames),
+                    list(values),
+                )
+        return curves
+
+    return read
@@ -0,0 +1,70 @@
+import os
+import time
+
+from swarm import config
+from swarm.blender import bake, bake_cached, clear_all_animation_data
+from swarm.cache import CACHE_EXTENSION, BakeCache
+
+
+def cached_bakes(directory) -> list[str]:
+    return sorted(
+        name for name in os.listdir(directory) if name.endswith(CACHE_EXTENSION)
+    )
+
+
+def write_bytes(size: int):
+    def write(path: str):
+        with open(path, "wb") as file:
+            file.write(bytes(size))
+
+    return write
+
+
+def test_cached_bake_matches_bake(scene, keyframes, tmp_path, capsys):
+    bake(5)
+    baked = keyframes()
+
+    for _ in range(2):
+        clear_all_animation_data()
+        bake_cached(str(tmp_path), 5)
+        assert keyframes() == baked
+    assert "Reusing the cached bake" in capsys.readouterr().out
+    assert len(cached_bakes(tmp_path)) == 1
+
+
+def test_changed_constant_misses_the_cache(scene, tmp_path, capsys):
+    bake_cached(str(tmp_path), 5)
+    with config.overridden(COGNITION=3):
+        bake_cached(str(tmp_path), 5)
+    assert "Reusing" not in capsys.readouterr().out
+    assert len(cached_bakes(tmp_path)) == 2
+
+
+def test_changed_scene_misses_the_cache(scene, bpy, tmp_path, capsys):
+    bake_cached(str(tmp_path), 5)
+    bpy.data.objects["Flower.002"].location.x += 1
+    bake_cached(str(tmp_path), 5)
+    bpy.data.objects["Bee.003"].name = "Drone"
+    bake_cached(str(tmp_path), 5)
+    assert "Reusing" not in capsys.readouterr().out
+    assert len(cached_bakes(tmp_path)) == 3
+
+
+def test_least_recently_used_bakes_are_evicted(tmp_path):
+    cache = BakeCache(str(tmp_path), max_size=2500)
+    for age, key in ((30, "first"), (20, "second")):
+        path = cache.put(key, write_bytes(1000))
+        os.utime(path, (time.time() - age,) * 2)
+
+    # Reading the first bake makes the second the least recently used
+    assert cache.get("first") == cache.path("first")
+    cache.put("third", write_bytes(1000))
+    assert cached_bakes(tmp_path) == [
+        "first" + CACHE_EXTENSION,
+        "third" + CACHE_EXTENSION,
+    ]
+    assert cache.get("second") is None
+
+    # A new bake is kept even when it doesn't fit on its own
+    cache.put("fourth", write_bytes(3000))
+    assert cached_bakes(tmp_path) == ["fourth" + CACHE_EXTENSION]
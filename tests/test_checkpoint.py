@@ -0,0 +1,91 @@
+import sys
+
+import pytest
+
+from swarm.blender import SwarmScene, bake, bake_chunked, clear_all_animation_data
+from swarm.checkpoint import load_checkpoint
+from swarm.simulation import Simulation
+
+bake_module = sys.modules["swarm.blender.bake"]
+
+
+# Run a chunked bake that is interrupted when its third checkpoint is about
+# to be saved, after the keys of that chunk were written
+def interrupted_bake(directory: str, seed: int, monkeypatch):
+    save_checkpoint = bake_module.save_checkpoint
+    saved = []
+
+    def interrupted_save_checkpoint(*args):
+        if len(saved) == 2:
+            raise KeyboardInterrupt
+        saved.append(args[1])
+        save_checkpoint(*args)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(bake_module, "save_checkpoint", interrupted_save_checkpoint)
+        with pytest.raises(KeyboardInterrupt):
+            bake_chunked(directory, 40, seed)
+    return saved
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_chunked_bake_matches_bake(scene, keyframes, tmp_path, engine):
+    bake(5, engine)
+    baked = keyframes()
+    clear_all_animation_data()
+
+    bake_chunked(str(tmp_path), 40, 5, engine)
+    assert keyframes() == baked
+
+
+def test_resumed_bake_matches_bake(scene, keyframes, tmp_path, monkeypatch, capsys):
+    bake(5)
+    baked = keyframes()
+    clear_all_animation_data()
+
+    saved = interrupted_bake(str(tmp_path), 5, monkeypatch)
+    assert keyframes() != baked
+    capsys.readouterr()
+
+    bake_chunked(str(tmp_path), 40, 5)
+    assert f"Resuming the bake after frame {saved[-1]}" in capsys.readouterr().out
+    assert keyframes() == baked
+
+
+def test_checkpoint_of_another_seed_is_not_resumed(
+    scene, keyframes, tmp_path, monkeypatch, capsys
+):
+    bake(6)
+    baked = keyframes()
+    clear_all_animation_data()
+
+    interrupted_bake(str(tmp_path), 5, monkeypatch)
+    capsys.readouterr()
+    bake_chunked(str(tmp_path), 40, 6)
+    assert "Resuming" not in capsys.readouterr().out
+    assert keyframes() == baked
+
+
+def test_checkpoint_of_another_scene_is_not_resumed(
+    scene, bpy, tmp_path, monkeypatch, capsys
+):
+    interrupted_bake(str(tmp_path), 5, monkeypatch)
+    swarm_scene = SwarmScene()
+    metadata = {
+        "seed": 5,
+        "bee_names": [obj.name for obj in swarm_scene.bees],
+        "flower_names": [obj.name for obj in swarm_scene.flowers],
+    }
+    assert load_checkpoint(str(tmp_path), Simulation, metadata) is not None
+
+    for changed in (
+        {"seed": 6},
+        {"bee_names": metadata["bee_names"][:-1]},
+        {"flower_names": metadata["flower_names"][::-1]},
+    ):
+        assert load_checkpoint(str(tmp_path), Simulation, metadata | changed) is None
+
+    capsys.readouterr()
+    bpy.data.objects.remove(bpy.data.objects["Bee.011"])
+    bake_chunked(str(tmp_path), 40, 5)
+    assert "Resuming" not in capsys.readouterr().out
@@ -0,0 +1,106 @@
+import bisect
+import math
+
+import pytest
+
+from swarm.blender import (
+    SwarmScene,
+    bake,
+    bake_chunked,
+    clear_all_animation_data,
+    decimate_transforms,
+)
+
+LOCATION_TOLERANCE = 0.05
+ROTATION_TOLERANCE = math.radians(1)
+
+
+# Values of the components of a linearly interpolated track at a frame,
+# holding the first and last keys before and after them
+def sample(frames: list, components: list, frame: float) -> list:
+    index = bisect.bisect_right(frames, frame) - 1
+    if index < 0:
+        return [values[0] for values in components]
+    if index == len(frames) - 1:
+        return [values[-1] for values in components]
+    t = (frame - frames[index]) / (frames[index + 1] - frames[index])
+    return [
+        values[index] + t * (values[index + 1] - values[index]) for values in components
+    ]
+
+
+# Tracks of the bee locations and rotations, as frames and the values of
+# each component
+def bee_tracks(curves: dict) -> dict:
+    tracks = {}
+    for obj in SwarmScene().bees:
+        for data_path, size in (("location", 3), ("rotation_quaternion", 4)):
+            channels = [
+                curves.get((obj.name, data_path, index)) for index in range(size)
+            ]
+            if channels[0] is not None:
+                tracks[obj.name, data_path] = (
+                    channels[0][0],
+                    [values for _, values in channels],
+                )
+    return tracks
+
+
+# Largest location and rotation errors of decimated tracks at every baked
+# frame
+def worst_errors(baked: dict, decimated: dict) -> tuple[float, float]:
+    location_error = rotation_error = 0.0
+    for (name, data_path), (frames, components) in baked.items():
+        kept_frames, kept_components = decimated[name, data_path]
+        for index, frame in enumerate(frames):
+            expected = [values[index] for values in components]
+            shown = sample(kept_frames, kept_components, frame)
+            if data_path == "location":
+                location_error = max(location_error, math.dist(expected, shown))
+            else:
+                dot = sum(a * b for a, b in zip(expected, shown))
+                cosine = min(abs(dot) / math.hypot(*shown), 1.0)
+                rotation_error = max(rotation_error, 2 * math.acos(cosine))
+    return location_error, rotation_error
+
+
+def count_keys(tracks: dict) -> int:
+    return sum(len(frames) for frames, _ in tracks.values())
+
+
+@pytest.mark.parametrize("chunk_size", [None, 40])
+def test_decimated_keys_stay_within_tolerance(scene, keyframes, tmp_path, chunk_size):
+    bake(5)
+    baked = bee_tracks(keyframes())
+    clear_all_animation_data()
+
+    if chunk_size is None:
+        bake(5)
+        decimate_transforms(SwarmScene().bees, LOCATION_TOLERANCE, ROTATION_TOLERANCE)
+    else:
+        bake_chunked(
+            str(tmp_path),
+            chunk_size,
+            5,
+            "python",
+            LOCATION_TOLERANCE,
+            ROTATION_TOLERANCE,
+        )
+    decimated = bee_tracks(keyframes())
+
+    assert count_keys(decimated) < count_keys(baked) / 2
+    location_error, rotation_error = worst_errors(baked, decimated)
+    # Keys are stored as 32-bit floats, and the angle between quaternions
+    # close together is sensitive to rounding
+    assert location_error <= LOCATION_TOLERANCE + 1e-5
+    assert rotation_error <= ROTATION_TOLERANCE + 1e-4
+
+
+# Running a finished chunked bake again has nothing to simulate, and must
+# not decimate its keys a second time
+def test_finished_chunked_bake_is_not_decimated_again(scene, keyframes, tmp_path):
+    tolerances = (LOCATION_TOLERANCE, ROTATION_TOLERANCE)
+    bake_chunked(str(tmp_path), 40, 5, "python", *tolerances)
+    decimated = keyframes()
+    bake_chunked(str(tmp_path), 40, 5, "python", *tolerances)
+    assert keyframes() == decimated
@@ -0,0 +1,46 @@
+import numpy as np
+
+from benchmarks import fake_bpy
+from swarm.blender import bake_instanced
+from swarm.blender.instances import ROTATION_ATTRIBUTE, SWARM_OBJECT_NAME, stores
+
+
+def shown_points(obj) -> tuple[np.ndarray, np.ndarray]:
+    mesh = obj.data
+    positions = np.zeros(3 * len(mesh.vertices))
+    rotations = np.zeros(4 * len(mesh.vertices))
+    mesh.vertices.foreach_get("co", positions)
+    mesh.attributes[ROTATION_ATTRIBUTE].data.foreach_get("value", rotations)
+    return positions.reshape(-1, 3), rotations.reshape(-1, 4)
+
+
+def test_swarm_object_follows_the_store(scene, bpy, tmp_path):
+    path = str(tmp_path / "swarm.trajectories")
+    bake_instanced(path, 40, seed=3, engine="numpy")
+    store = stores[SWARM_OBJECT_NAME]
+    obj = bpy.data.objects[SWARM_OBJECT_NAME]
+    assert len(obj.data.vertices) == 40
+    bee_info = obj.modifiers[0].node_group.nodes["Object Info"]
+    assert bee_info.inputs["Object"].default_value is bpy.data.objects["Bee"]
+
+    first, last = int(store.frames[0]), int(store.frames[-1])
+    middle = int(store.frames[store.frame_count // 2])
+    cases = [
+        (1, 0),
+        (first, 0),
+        (middle, store.frame_count // 2),
+        (last + 10, store.frame_count - 1),
+    ]
+    for frame, row in cases:
+        scene.frame_set(frame)
+        positions, rotations = shown_points(obj)
+        np.testing.assert_allclose(positions, store.positions[row], rtol=1e-6)
+        np.testing.assert_allclose(rotations, store.rotations[row], rtol=1e-6)
+
+
+def test_swarm_stores_are_let_go_of_on_file_load(scene, bpy, tmp_path):
+    bake_instanced(str(tmp_path / "swarm.trajectories"), 10, seed=3, engine="numpy")
+    assert SWARM_OBJECT_NAME in stores
+
+    fake_bpy.load_file()
+    assert not stores
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from swarm.blender import apply_trajectories, bake, bake_to_store
+from swarm.blender.bake import prepare
+from swarm.blender.scene import SwarmScene, clear_all_animation_data
+from swarm.store import TrajectoryStore, TrajectoryWriter
+
+
+# Keys of a bake on frames before stop
+def keys_before(curves: dict, stop: int) -> dict:
+    kept = {}
+    for channel, (frames, values) in curves.items():
+        count = sum(frame < stop for frame in frames)
+        if count:
+            kept[channel] = (frames[:count], values[:count])
+    return kept
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+@pytest.mark.parametrize("chunk_size", [None, 7])
+def test_replay_matches_bake(scene, keyframes, tmp_path, engine, chunk_size):
+    bake(5, engine)
+    baked = keyframes()
+    assert any(frames[0] == 1 for frames, _ in baked.values())
+
+    path = str(tmp_path / "swarm.trajectories")
+    clear_all_animation_data()
+    bake_to_store(path, 5, engine)
+    apply_trajectories(path, chunk_size=chunk_size)
+    assert keyframes() == baked
+
+
+# A bake interrupted while writing a frame keeps the frames before it
+def test_interrupted_store_replays_complete_frames(
+    scene, keyframes, tmp_path, monkeypatch
+):
+    bake(5)
+    baked = keyframes()
+    clear_all_animation_data()
+
+    stop = 120
+    write_frame = TrajectoryWriter.write_frame
+
+    def interrupted_write_frame(writer, frame, simulation):
+        if frame == stop:
+            writer.arrays["frames"][writer.frame_count] = frame
+            raise KeyboardInterrupt
+        write_frame(writer, frame, simulation)
+
+    path = str(tmp_path / "swarm.trajectories")
+    monkeypatch.setattr(TrajectoryWriter, "write_frame", interrupted_write_frame)
+    with pytest.raises(KeyboardInterrupt):
+        bake_to_store(path, 5)
+
+    store = apply_trajectories(path)
+    assert store.frames[-1] == stop - 1
+    assert keyframes() == keys_before(baked, stop)
+
+
+# A store whose writer was never closed holds no frames
+def test_unclosed_store_is_empty(scene, keyframes, tmp_path):
+    path = str(tmp_path / "swarm.trajectories")
+    simulation = prepare(SwarmScene(), random.Random(5), "python")
+    writer = TrajectoryWriter.for_simulation(path, simulation)
+    for frame in simulation.run(stop=100):
+        writer.write_frame(frame, simulation)
+
+    assert TrajectoryStore(path).frame_count == 0
+    apply_trajectories(path)
+    curves = keyframes()
+    assert curves and all(frames == [1.0] for frames, _ in curves.values())
+    assert all(data_path.endswith("default_value") for _, data_path, _ in curves)